@@ -5,6 +5,8 @@ from app.services.deepseek_service import DeepSeekService
 from app.services.pinecone_service import PineconeService
 from app.core.config import get_settings, Settings
 from app.services.openai_service import OpenAIService
+from app.services.database_service import DatabaseService, database_service
+from app.services.llm_router import LLMRouter, llm_router
 
 def get_openai_service(settings: Settings = Depends(get_settings)) -> OpenAIService:
     """Dependency for getting the OpenAI service instance."""
@@ -26,7 +28,17 @@ def get_pinecone_service(
         dimension=3072,  # Set to match your llama-text-embed-v2 model
     )
 
+def get_database_service() -> DatabaseService:
+    """Dependency for the shared, lifespan-managed DatabaseService of this worker."""
+    return database_service
+
+def get_llm_router() -> LLMRouter:
+    """Dependency for the shared LLM router, which keeps per-provider latency and error statistics."""
+    return llm_router
+
 
 OpenAIServiceDep = Annotated[OpenAIService, Depends(get_openai_service)]
 DeepSeekServiceDep = Annotated[DeepSeekService, Depends(get_deepseek_service)]
 PineconeServiceDep = Annotated[PineconeService, Depends(get_pinecone_service)]
+DatabaseServiceDep = Annotated[DatabaseService, Depends(get_database_service)]
+LLMRouterDep = Annotated[LLMRouter, Depends(get_llm_router)]
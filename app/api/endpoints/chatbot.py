@@ -11,9 +11,9 @@ def chat_endpoint():
     return {"message": "This is the chat endpoint. Use POST /chat/completion or /generate for AI responses."}
 
 @router.post("/generate", response_model=GenerateContentResponse)
-def generate_content(request: GenerateContentRequest, openai_service: DeepSeekServiceDep):
+def generate_content(request: GenerateContentRequest, deepseek_service: DeepSeekServiceDep):
     try:
-        response = openai_service.generate_content(
+        response = deepseek_service.generate_content(
             prompt=request.prompt,
             model=request.model if request.model else "deepseek-chat"
         )
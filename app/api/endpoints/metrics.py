@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from app.services.database_service import resource_cache, database_service
+from app.services.session_writer import session_writer
+from app.services.user_writer import user_writer
+from app.services.training_worker import training_worker_pool
+from app.services.outbound_governor import outbound_governor
+from app.services.llm_router import llm_router
+
+router = APIRouter()
+
+@router.get("/metrics")
+def get_metrics():
+    """In-process runtime metrics for this worker."""
+    return {
+        "session_writer": session_writer.stats(),
+        "user_writer": user_writer.stats(),
+        "resource_cache": resource_cache.stats(),
+        "database_pool": database_service.pool_stats(),
+        "training_workers": training_worker_pool.stats(),
+        "outbound": outbound_governor.stats(),
+        "llm_router": llm_router.stats(),
+    }
@@ -1,14 +1,19 @@
 from fastapi import APIRouter, HTTPException, status, Header, Depends
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from typing import Optional, Dict, Any, List
 import json
+import asyncio
 from app.services.gemini_service import ChatMessage
-from app.api.dependencies import PineconeServiceDep, OpenAIServiceDep, DeepSeekServiceDep
+from app.api.dependencies import PineconeServiceDep, OpenAIServiceDep, DeepSeekServiceDep, DatabaseServiceDep, LLMRouterDep
 from app.lib.constants.model_config import SYSTEM_PROMPTS
 from app.models.context import Context
 from app.models.component import FileNode, InternalComponent
-from app.services.database_service import DatabaseService
+from app.services.session_writer import session_writer
+from app.services.codebase_store import codebase_store, CodebaseVersionMismatch
+from app.services.llm_router import POLICIES
 import app.utils.llm_parser as Utils
+from app.utils.codebase_selector import select_codebase_context
+from app.utils.task_graph import TaskGraph
 from app.models.builder_steps import ReactResponse, get_dummy_response, FileStep
 
 
@@ -32,7 +37,9 @@ async def query_components(
     that match the search criteria.
     """
     try:
-        results = pinecone_service.query(
+        # Embedding and Pinecone calls block while rate limited or backing off
+        results = await asyncio.to_thread(
+            pinecone_service.query,
             query_text=request.query_text,
             top_k=request.top_k,
             namespace=request.namespace,
@@ -62,10 +69,25 @@ class GenerateComponentRequest(BaseModel):
     query_text: str
     conversation: list[ChatMessage] = []
     codebase: list[FileNode] = []
+    # Incremental upload: changes relative to a codebase version previously returned by the server,
+    # which is the codebase sent with that request, before the generated steps were applied
+    codebase_version: Optional[str] = None
+    codebase_patch: list[FileNode] = []
+    deleted_paths: list[str] = []
     forcedComponents: list[str] = []
     internalComponents: list[str] = []
     enableAISelection: bool = True
     session_id: Optional[str] = ""
+    # LLM routing policy for this request: "fastest", "cheapest" or "primary_with_hedge"
+    llm_policy: Optional[str] = None
+    # Stream the completion and hedge on a slow first token, defaults to LLM_ROUTER_STREAM_HEDGING
+    hedge: Optional[bool] = None
+
+    @validator('llm_policy')
+    def validate_llm_policy(cls, v):
+        if v is not None and v not in POLICIES:
+            raise ValueError(f"Must be one of {', '.join(POLICIES)}")
+        return v
 
 class GenerateComponentResponse(BaseModel):
     status: str
@@ -80,54 +102,82 @@ class GenerateComponentResponse(BaseModel):
 async def generate_with_rag(
     request: GenerateComponentRequest,
     pinecone_service: PineconeServiceDep,
-    openai_service: OpenAIServiceDep,
-    userId: str = Header(None),
-    database_service: DatabaseService = Depends(DatabaseService)
+    llm_router: LLMRouterDep,
+    database_service: DatabaseServiceDep,
+    userId: str = Header(None)
 ):
     try:
-        if request.session_id:
-            session_id = request.session_id
-        else:   
-            session_id = await database_service.get_or_create_session(userId)
-        
+        # Rebuild the codebase from the server-held version when the client only sent a patch
+        codebase = request.codebase
+        if not codebase and request.codebase_version is not None:
+            codebase = await codebase_store.resolve(
+                session_id=request.session_id,
+                base_version=request.codebase_version,
+                patch=request.codebase_patch,
+                deleted_paths=request.deleted_paths
+            )
+
         # Filter out internal components from codebase
-        existing_internal_components, filtered_codebase, package_json_file = Utils.filter_internal_components(request.codebase)
-        
-        # Get components from vector search
-        query_results = {}
-        if request.enableAISelection:
-            query_results = pinecone_service.query(
+        existing_internal_components, filtered_codebase, package_json_file = Utils.filter_internal_components(codebase)
+
+        async def load_session():
+            if request.session_id:
+                return request.session_id
+            return await database_service.get_or_create_session(userId)
+
+        async def search_components():
+            # Get components from vector search
+            if not request.enableAISelection:
+                return {}
+            return await asyncio.to_thread(
+                pinecone_service.query,
                 query_text=request.query_text,
                 namespace=userId,
             )
-        
-        # Get paths from both vector search and forced components
-        component_paths = [match['id'] for match in query_results.get('matches', [])]
-        component_paths.extend(request.forcedComponents)
-        
-        # Fetch component details and GitHub resources
-        internal_components: list[InternalComponent] = []
 
-        if component_paths:
-            # Fetch components using the components function
-            internal_components: list[InternalComponent] = await database_service.fetch_components_by_paths(
+        async def load_components(vector_search):
+            # Get paths from both vector search and forced components
+            component_paths = [match['id'] for match in vector_search.get('matches', [])]
+            component_paths.extend(request.forcedComponents)
+            if not component_paths:
+                return []
+            return await database_service.fetch_components_by_paths(
                 component_paths=component_paths,
                 userId=userId
             )
 
-        css_files = []
-        dependencies = {}  
-        css_files, dependencies = await database_service.get_github_resources(userId)
+        async def load_github_resources():
+            return await database_service.get_github_resources(userId)
+
+        # Only the component fetch depends on the vector search, everything else runs concurrently
+        retrieval = TaskGraph()
+        retrieval.add("session", load_session)
+        retrieval.add("vector_search", search_components)
+        retrieval.add("components", load_components, depends_on=["vector_search"])
+        retrieval.add("github_resources", load_github_resources)
+        results = await retrieval.run()
+
+        session_id = results["session"]
+        internal_components: list[InternalComponent] = results["components"]
+        css_files, dependencies, design_tokens = results["github_resources"]
         
+        # Keep only the files relevant to this query verbatim, summarize the rest
+        relevant_codebase, codebase_summary = select_codebase_context(
+            query=request.query_text,
+            codebase=filtered_codebase,
+            conversation=request.conversation
+        )
+
         # Create context object with filtered codebase
         context = Context(
             user_query=request.query_text,
-            codebase=filtered_codebase, 
+            codebase=relevant_codebase,
+            codebase_summary=codebase_summary,
             system_prompt=SYSTEM_PROMPTS["react_generator"],
             internal_components=internal_components,
             conversation=request.conversation,
             additional_user_prompt=SYSTEM_PROMPTS["DESIGN"] if not request.conversation else None,
-            css_tokens={"files": css_files},
+            css_tokens={"digest": design_tokens} if design_tokens else {"files": css_files},
             dependencies=dependencies
         )
         
@@ -135,7 +185,7 @@ async def generate_with_rag(
         messages = context.construct_messages()
         
         # react_response = get_dummy_response();
-        response = openai_service.chat_completion(messages=messages)
+        response = await llm_router.chat_completion(messages=messages, policy=request.llm_policy, hedge=request.hedge)
         react_response = Utils.parse_llm_response_to_react_steps(response.get("text", ""))
 
         # Process React steps for internal components
@@ -150,24 +200,41 @@ async def generate_with_rag(
         request.conversation.extend([ChatMessage(role="user",content=request.query_text)])
         request.conversation.extend([ChatMessage(role="assistant",content=react_response)])
 
-        session_updates = {
-            "userId": userId,
-            "messages": [msg.model_dump() for msg in request.conversation],
-            "codebase": [file.model_dump() for file in request.codebase],
-        }
-        await database_service.update_session(session_id, session_updates)
+        # Persist only what changed in the session, in the background so the response does not wait on the write
+        session_delta = await database_service.build_session_delta(
+            session_id=session_id,
+            userId=userId,
+            messages=[msg.model_dump() for msg in request.conversation],
+            codebase=[file.model_dump() for file in codebase],
+        )
+        if session_delta:
+            await session_writer.enqueue(session_delta)
+        codebase_version = codebase_store.put(session_id, codebase)
 
         return {
             "status": "success",
             "session_id": session_id,
+            "codebase_version": codebase_version,
             "generated_code": react_response,
             "conversation": request.conversation,
             "context": {
                 "components_used": len(internal_components),
-                "query": request.query_text
+                "query": request.query_text,
+                "timings": retrieval.timings,
+                "llm": {"provider": response["provider"], "model": response["model"], "latency": round(response["latency"], 3)}
             }
         }
         
+    except CodebaseVersionMismatch as e:
+        # The client must resend its full codebase
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "status": "resync_required",
+                "session_id": e.session_id,
+                "codebase_version": e.server_version
+            }
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
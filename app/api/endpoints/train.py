@@ -1,17 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
 import os
+import json
+import time
+import asyncio
 from typing import Optional, Dict, Any
 from app.services.gemini_service import GeminiService
-from app.api.dependencies import get_settings, PineconeServiceDep
-import asyncio
-from app.services.database_service import DatabaseService
+from app.api.dependencies import get_settings
+from app.services.job_queue import training_job_queue, TrainingJob, COMPLETED, FAILED
+from app.services.training_progress import TrainingProgress
 
 router = APIRouter()
 
 class TrainGitHubRequest(BaseModel):
     github_url: str
     access_token: Optional[str] = None
+    # Continue from the checkpoint of the last failed training of this repository
+    resume: bool = True
     
     @validator('github_url')
     def validate_github_url(cls, v):
@@ -22,10 +28,8 @@ class TrainGitHubRequest(BaseModel):
 @router.post("/github", status_code=status.HTTP_200_OK, response_model=Dict[str, Any])
 async def train_github_components(
     request: TrainGitHubRequest,
-    pinecone_service: PineconeServiceDep,
     userid: str = Header(None, convert_underscores=False),
-    settings = Depends(get_settings),
-    database_service: DatabaseService = Depends()
+    settings = Depends(get_settings)
 ):
     """
     Trains the RAG system on a GitHub repository, extracting UI components
@@ -43,55 +47,109 @@ async def train_github_components(
                 detail="Pinecone configuration not found"
             )
         
-        # Start training as a background asyncio task
-        
-        async def train_in_background():
-            try:
-                # Update user status to IN_PROGRESS
-                github_id = await database_service.insert_one("github", {"userId": userid, "indexingStatus": "IN_PROGRESS", "githubUrl": request.github_url})
-
-                # Train on GitHub repository
-                result = await pinecone_service.train_github_url(
-                    github_url=request.github_url,
-                    access_token=request.access_token,
-                    namespace=userid
-                )
-                print(f"Training completed: {result['total_components']} components indexed")
-
-                # Update user status to COMPLETED
-                await database_service.update_one(
-                    "github",
-                    {"userId": userid},
-                    {"$set": {
-                        "indexingStatus": "COMPLETED",
-                    }}
-                )
-            except Exception as e:
-                print(f"Error in background training: {str(e)}")
-                # Update user status to ERROR
-                await database_service.update_one(
-                    "github",
-                    {"userId": userid},
-                    {"$set": {
-                        "indexingStatus": "ERROR",
-                    }}
-                )
-        
-        # Create and launch a background task
-        asyncio.create_task(train_in_background())
-        
+        # Queue training for the worker processes, an identical active job is reused
+        job, created = await training_job_queue.enqueue_async(
+            user_id=userid,
+            github_url=request.github_url,
+            access_token=request.access_token,
+            resume=request.resume
+        )
         
         return {
             "status": "success",
-            "message": "Training in progress",
+            "message": "Training queued" if created else "Training already in progress",
             "details": {
                 "github_url": request.github_url,
-                "namespace": userid
+                "namespace": userid,
+                "job_id": job.id,
+                "job_status": job.status,
+                "resumed": bool(job.checkpoint)
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing GitHub repository: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+def job_report(job: TrainingJob) -> Dict[str, Any]:
+    """Public view of a training job, with its progress report."""
+    return {
+        "job_id": job.id,
+        "github_url": job.github_url,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": job.result,
+        "progress": TrainingProgress.report(job.progress),
+    }
+
+
+async def get_user_job(job_id: str, userid: Optional[str]) -> TrainingJob:
+    """Fetch a job, only if it belongs to the requesting user."""
+    job = await training_job_queue.get_async(job_id)
+    if job is None or job.user_id != userid:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Training job {job_id} not found"
+        )
+    return job
+
+
+@router.get("/jobs/{job_id}", status_code=status.HTTP_200_OK, response_model=Dict[str, Any])
+async def get_training_job(
+    job_id: str,
+    userid: str = Header(None, convert_underscores=False),
+):
+    """
+    Status of a training job with per-stage counts, throughput, ETA and token usage.
+    """
+    job = await get_user_job(job_id, userid)
+    return job_report(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_training_job(
+    job_id: str,
+    userid: str = Header(None, convert_underscores=False),
+    settings = Depends(get_settings)
+):
+    """
+    Server-sent events feed of a training job's progress. An event is sent
+    whenever the job's state changes, and the stream ends once the job has
+    completed or failed.
+    """
+    job = await get_user_job(job_id, userid)
+
+    async def events():
+        current = job
+        last_sent = None
+        last_event_at = time.monotonic()
+        while True:
+            report = job_report(current)
+            # Elapsed time changes on every poll, only send when the job itself changed
+            state = (current.status, current.attempts, json.dumps(current.progress, sort_keys=True))
+            if state != last_sent:
+                yield f"event: progress\ndata: {json.dumps(report)}\n\n"
+                last_sent = state
+                last_event_at = time.monotonic()
+            elif time.monotonic() - last_event_at > 15:
+                # Keep idle connections open through proxies
+                yield ": keep-alive\n\n"
+                last_event_at = time.monotonic()
+            if current.status in (COMPLETED, FAILED):
+                return
+            await asyncio.sleep(settings.TRAINING_POLL_INTERVAL)
+            current = await training_job_queue.get_async(job_id) or current
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,50 @@
+from typing import List
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import get_settings
+from app.services.user_writer import user_writer
+
+settings = get_settings()
+
+
+class UserIdMiddleware:
+    """
+    Pure ASGI middleware giving anonymous requests to user routes a user ID.
+
+    The ID is added to the request scope as the `userid` header and returned
+    to the client in the `x-user-id` response header. Response bodies pass
+    through untouched, so streaming responses are not buffered.
+    """
+
+    def __init__(self, app: ASGIApp, routes: List[str] = settings.USER_ROUTES):
+        self.app = app
+        self.routes = frozenset(routes)
+
+    def needs_user(self, scope: Scope) -> bool:
+        """Only requests to routes that create per-user state get an anonymous user created.
+
+        Matching is on the exact method and path, so polling a job or
+        reconnecting to its event stream never mints a user.
+        """
+        return f"{scope['method']} {scope['path'].rstrip('/')}" in self.routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.needs_user(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # Header names are lowercase in the ASGI scope
+        if any(name == b"userid" for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        # Minted in-process, the user document is written in the background
+        user_id = (await user_writer.create_user()).encode()
+        scope = dict(scope)
+        scope["headers"] = [*scope["headers"], (b"userid", user_id)]
+
+        async def send_with_user_id(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-user-id", user_id)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_user_id)
@@ -6,6 +6,7 @@ from .endpoints.template import router as template_router
 from .endpoints.train import router as train_router
 from .endpoints.query import router as query_router
 from .endpoints.users import router as users_router
+from .endpoints.metrics import router as metrics_router
 
 router = APIRouter()
 
@@ -14,3 +15,4 @@ router.include_router(template_router)
 router.include_router(train_router, prefix="/train", tags=["train"])
 router.include_router(query_router, prefix="/query", tags=["query"])
 router.include_router(users_router, prefix="/users", tags=["users"])
+router.include_router(metrics_router, tags=["metrics"])
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Optional, Dict, List
 from functools import lru_cache
 import os
 from dotenv import load_dotenv
@@ -24,7 +24,107 @@ class Settings(BaseSettings):
     MONGODB_DB_NAME: str = "zencode_db"
     MONGODB_USER: Optional[str] = None
     MONGODB_PASSWORD: Optional[str] = None
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+
+    # "METHOD path" of the routes that create per-user state; anonymous requests to them get a user ID minted by the middleware
+    USER_ROUTES: List[str] = ["POST /api/query/generate", "POST /api/train/github"]
+
+    # Where DatabaseService reads and writes: "node" (REST data backend) or "mongodb" (direct, via motor)
+    DATABASE_BACKEND: str = "node"
     
+    # Node.js data backend connection pool
+    DATA_BACKEND_URL: str = "http://localhost:4000/api"
+    DATA_BACKEND_MAX_CONNECTIONS: int = 100
+    DATA_BACKEND_MAX_KEEPALIVE: int = 20
+    DATA_BACKEND_KEEPALIVE_EXPIRY: float = 30.0
+    DATA_BACKEND_HTTP2: bool = False
+    DATA_BACKEND_CONNECT_TIMEOUT: float = 2.0
+    DATA_BACKEND_POOL_TIMEOUT: float = 5.0
+    # Read timeouts in seconds per operation type
+    DATA_BACKEND_OPERATION_TIMEOUTS: Dict[str, float] = {
+        "default": 10.0,
+        "health": 2.0,
+        "find": 5.0,
+        "insert": 10.0,
+        "update": 10.0,
+        "delete": 5.0,
+        "parse": 15.0,
+        "batch": 20.0,
+    }
+
+    # In-process cache of per-user GitHub resources and component documents
+    RESOURCE_CACHE_MAX_ENTRIES: int = 4096
+
+    # Session storage: number of tracked sessions and deltas between compaction snapshots
+    SESSION_STATE_CACHE_SIZE: int = 10000
+    SESSION_COMPACTION_INTERVAL: int = 20
+    CODEBASE_STORE_MAX_SESSIONS: int = 2000
+
+    # Content-addressed blob store for file and component code: "database" or "local"
+    BLOB_BACKEND: str = "database"
+    BLOB_LOCAL_PATH: Optional[str] = None
+    BLOB_CACHE_MAX_ENTRIES: int = 1024
+
+    # LLM analyses of components shared across users, cached in memory in front of MongoDB
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 4096
+
+    # Local store of embeddings shared across namespaces, vectors kept as "float32" or "int8"
+    EMBEDDING_STORE_PATH: str = "embeddings.db"
+    EMBEDDING_STORE_DTYPE: str = "float32"
+
+    # Outbound provider calls: requests per second, burst, initial and maximum concurrency per provider
+    OUTBOUND_PROVIDER_LIMITS: Dict[str, Dict[str, float]] = {
+        "openai": {"rate": 50, "burst": 50, "concurrency": 8, "max_concurrency": 64},
+        "deepseek": {"rate": 10, "burst": 10, "concurrency": 4, "max_concurrency": 16},
+        "gemini": {"rate": 10, "burst": 10, "concurrency": 4, "max_concurrency": 16},
+        "github": {"rate": 10, "burst": 20, "concurrency": 8, "max_concurrency": 32},
+        "pinecone": {"rate": 50, "burst": 50, "concurrency": 8, "max_concurrency": 32},
+    }
+    OUTBOUND_MAX_ATTEMPTS: int = 5
+    OUTBOUND_BACKOFF_MAX: float = 30.0
+    OUTBOUND_BREAKER_FAILURES: int = 5
+    OUTBOUND_BREAKER_COOLDOWN: float = 30.0
+
+    # LLM router: targets in primary-first order with prices in USD per million tokens,
+    # default policy ("fastest", "cheapest" or "primary_with_hedge") and per-attempt timeout
+    LLM_ROUTER_TARGETS: List[Dict[str, Any]] = [
+        {"provider": "openai", "model": "gpt-4o-mini", "input_cost": 0.15, "output_cost": 0.60},
+        {"provider": "deepseek", "model": "deepseek-chat", "input_cost": 0.27, "output_cost": 1.10},
+        {"provider": "gemini", "model": "gemini-2.0-flash", "input_cost": 0.10, "output_cost": 0.40},
+    ]
+    LLM_ROUTER_POLICY: str = "primary_with_hedge"
+    LLM_ROUTER_TIMEOUT: float = 120.0
+    LLM_ROUTER_HEDGE_MIN_DELAY: float = 5.0
+    LLM_ROUTER_MAX_ERROR_RATE: float = 0.5
+    LLM_ROUTER_WINDOW: int = 200
+    # Streamed hedging (opt-in): when the first token is later than the primary's
+    # rolling p90 time-to-first-token, race a second stream and keep whichever
+    # streams first. Needs LLM_ROUTER_TTFT_MIN_SAMPLES samples before it hedges.
+    LLM_ROUTER_STREAM_HEDGING: bool = False
+    LLM_ROUTER_TTFT_HEDGE_MIN_DELAY: float = 1.0
+    LLM_ROUTER_TTFT_MIN_SAMPLES: int = 10
+
+    # Training job queue (SQLite) and worker processes. Set TRAINING_WORKER_PROCESSES
+    # to 0 when workers run separately via `python -m app.services.training_worker`
+    TRAINING_QUEUE_PATH: str = "training_jobs.db"
+    TRAINING_WORKER_PROCESSES: int = 2
+    TRAINING_MAX_JOBS_PER_USER: int = 1
+    TRAINING_MAX_ATTEMPTS: int = 3
+    TRAINING_JOB_STALE_SECONDS: float = 120.0
+    TRAINING_POLL_INTERVAL: float = 1.0
+    # Failed attempts are retried after TRAINING_RETRY_BACKOFF seconds, doubling per attempt
+    TRAINING_RETRY_BACKOFF: float = 30.0
+    TRAINING_RETRY_BACKOFF_MAX: float = 900.0
+    # Fernet key encrypting GitHub access tokens of queued jobs. When unset, a key is
+    # generated once into TRAINING_TOKEN_KEY_PATH, shared by workers on the same host
+    TRAINING_TOKEN_KEY: Optional[str] = None
+    TRAINING_TOKEN_KEY_PATH: str = "training_jobs.key"
+    # Training pipeline: batches waiting between stages, and concurrent batches per stage
+    TRAINING_PIPELINE_QUEUE_SIZE: int = 4
+    TRAINING_STAGE_CONCURRENCY: Dict[str, int] = {"fetch": 8, "analyze": 3, "store": 2, "embed": 2, "upsert": 2}
+
     # Application settings
     APP_NAME: str = "FastAPI Backend"
     DEBUG: bool = False
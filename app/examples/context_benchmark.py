@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+# Add the repository root to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.models.context import Context
+from app.models.component import FileNode
+
+FILE_COUNTS = [10, 100, 1000]
+FILE_SIZE = 4000  # characters per generated file
+REPEATS = 5
+
+
+def make_codebase(count: int) -> list[FileNode]:
+    """Generate a synthetic codebase of `count` files with distinct contents."""
+    return [
+        FileNode(
+            fileName=f"Component{i}.tsx",
+            filePath=f"src/components/Component{i}.tsx",
+            fileContent=(f"// component {i}\n" + "export const value = 1;\n" * (FILE_SIZE // 24))
+        )
+        for i in range(count)
+    ]
+
+
+def naive_codebase_context(codebase: list[FileNode]) -> str:
+    """The previous string-concatenation serializer, kept for comparison."""
+    codebase_context = "REPOSITORY CONTEXT - Current codebase structure and files that must be considered for maintaining consistency:\n"
+    for file_node in codebase:
+        codebase_context += f"{{ fileName: {file_node.fileName}, filePath: {file_node.filePath}, fileContent: {file_node.fileContent} }} \n\n"
+    return codebase_context
+
+
+def best_of(fn, repeats: int = REPEATS) -> float:
+    """Best wall-clock time of `repeats` runs, in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    print(f"{'files':>6} {'naive ms':>10} {'joined ms':>10} {'us/file':>9}")
+    for count in FILE_COUNTS:
+        codebase = make_codebase(count)
+        context = Context(user_query="Add a settings page", codebase=codebase)
+
+        naive_ms = best_of(lambda: naive_codebase_context(codebase))
+        joined_ms = best_of(context.construct_messages)
+
+        print(f"{count:>6} {naive_ms:>10.2f} {joined_ms:>10.2f} {joined_ms * 1000 / count:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Latency of the Node.js REST backend vs direct MongoDB access for the
+operations DatabaseService runs on every generation.
+
+Run a local mongod and point the Node.js backend at the same database, then:
+    python app/examples/database_backend_benchmark.py --mongodb-url mongodb://localhost:27017
+
+Benchmark documents are written under a random userId and removed afterwards.
+"""
+
+import os
+import sys
+import time
+import uuid
+import json
+import asyncio
+import argparse
+import statistics
+
+# Add the repository root to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import get_settings
+from app.services.database_service import DatabaseService
+from app.services.mongo_database_service import MongoDatabaseService
+
+settings = get_settings()
+COMPONENT_COUNT = 200
+
+
+def component_documents(user_id: str) -> list[dict]:
+    return [
+        {
+            "userId": user_id,
+            "githubUrl": "https://github.com/benchmark/repo",
+            "componentName": f"Component{i}",
+            "componentPath": f"src/components/ui/internal/Component{i}.tsx",
+            "inputProps": "{ title: string }",
+            "useCase": "Benchmark component",
+            "code": "export const Component = () => null;\n" * 100,
+            "indexingStatus": True,
+        }
+        for i in range(COMPONENT_COUNT)
+    ]
+
+
+def operations(db: DatabaseService, user_id: str) -> dict:
+    """Each benchmarked operation as a zero-argument coroutine factory."""
+    paths = [f"src/components/ui/internal/Component{i}.tsx" for i in range(0, COMPONENT_COUNT, 20)]
+
+    async def find_github():
+        db.invalidate_user_cache(user_id)
+        return await db.get_github_resources(user_id)
+
+    async def find_components():
+        db.invalidate_user_cache(user_id)
+        return await db.fetch_components_by_paths(paths, user_id)
+
+    async def insert_session():
+        return await db.insert_one("sessions", {"userId": user_id, "messages": [], "codebase": []})
+
+    async def update_github():
+        return await db.update_one("github", {"userId": user_id}, {"$set": {"indexingStatus": "COMPLETED"}})
+
+    async def update_components():
+        return await db.update_many("components", [
+            {"filter": {"userId": user_id, "componentPath": path}, "update": {"$set": {"useCase": "Updated"}}}
+            for path in paths
+        ])
+
+    return {
+        "get_github_resources": find_github,
+        "fetch_components_by_paths": find_components,
+        "insert_one session": insert_session,
+        "update_one github": update_github,
+        "update_many components": update_components,
+    }
+
+
+async def measure(fn, iterations: int, concurrency: int) -> list[float]:
+    """Run `fn` `iterations` times with at most `concurrency` in flight, returning latencies in ms."""
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with slots:
+            start = time.perf_counter()
+            await fn()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(timed() for _ in range(iterations)))
+    return latencies
+
+
+async def benchmark(name: str, db: DatabaseService, mongodb_url: str, iterations: int, concurrency: int):
+    user_id = f"benchmark-{uuid.uuid4()}"
+    await db.start()
+    await db.insert_many("components", component_documents(user_id))
+    await db.insert_one("github", {
+        "userId": user_id,
+        "githubUrl": "https://github.com/benchmark/repo",
+        "cssFiles": json.dumps([{"name": "index.css", "content": ":root { --primary: #000; }"}]),
+        "packageJson": json.dumps({"dependencies": "react,react-dom", "devDependencies": "vite"}),
+    })
+
+    try:
+        for operation, fn in operations(db, user_id).items():
+            await fn()  # warm up the connection pool
+            latencies = sorted(await measure(fn, iterations, concurrency))
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(f"{name:>8} {operation:>26} {statistics.median(latencies):>9.2f} {p95:>9.2f} {statistics.mean(latencies):>9.2f}")
+    finally:
+        await db.close()
+        cleanup = AsyncIOMotorClient(mongodb_url)[settings.MONGODB_DB_NAME]
+        for collection in ("components", "github", "sessions"):
+            await cleanup[collection].delete_many({"userId": user_id})
+        cleanup.client.close()
+
+
+async def main():
+    print(f"{'backend':>8} {'operation':>26} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    await benchmark("node", DatabaseService(), args.mongodb_url, args.iterations, args.concurrency)
+    mongo_client = AsyncIOMotorClient(args.mongodb_url, maxPoolSize=settings.MONGODB_MAX_POOL_SIZE)
+    await benchmark("mongodb", MongoDatabaseService(mongo_client=mongo_client), args.mongodb_url, args.iterations, args.concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Throughput of /api/template behind the previous BaseHTTPMiddleware-style user
+header hook vs the pure ASGI UserIdMiddleware.
+
+Requests are driven in-process through httpx's ASGI transport, so the numbers
+reflect framework and middleware overhead only:
+    python app/examples/middleware_benchmark.py --requests 5000 --concurrency 50
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# Add the repository root to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import httpx
+from fastapi import FastAPI, Request
+from app.api.endpoints.template import router as template_router
+from app.api.middleware import UserIdMiddleware
+from app.services.user_writer import user_writer
+
+
+def base_http_middleware_app() -> FastAPI:
+    """The app as it was wired before, with the hook registered through @app.middleware("http")."""
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def add_user_id_header(request: Request, call_next):
+        existing_user_id = request.headers.get("userid")
+        if not existing_user_id and request.method != "OPTIONS" and request.url.path.startswith(("/api/query/generate", "/api/train")):
+            _id = await user_writer.create_user()
+            request.scope["headers"] = [
+                (name, value) for name, value in request.scope["headers"]
+                if name.lower() != b"userid"
+            ] + [(b"userid", _id.encode())]
+            response = await call_next(request)
+            response.headers["x-user-id"] = _id
+            return response
+        return await call_next(request)
+
+    app.include_router(template_router, prefix="/api")
+    return app
+
+
+def asgi_middleware_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UserIdMiddleware)
+    app.include_router(template_router, prefix="/api")
+    return app
+
+
+async def requests_per_second(app: FastAPI, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await client.get("/api/template")  # warm up
+        slots = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with slots:
+                response = await client.get("/api/template")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(total)))
+        return total / (time.perf_counter() - start)
+
+
+async def main():
+    print(f"{'middleware':>16} {'req/s':>10}")
+    for name, app in (("BaseHTTP", base_http_middleware_app()), ("pure ASGI", asgi_middleware_app())):
+        rate = await requests_per_second(app, args.requests, args.concurrency)
+        print(f"{name:>16} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main())
@@ -5,6 +5,10 @@ DEFAULT_TEMPERATURE = 0.7
 DEFAULT_LLM_MODEL = "gemini-exp-1206"
 DEFAULT_EMBEDDING_MODEL = "text-embedding-3-large"
 
+# Codebase context selection (files sent verbatim to the generator)
+DEFAULT_CONTEXT_MAX_FILES = 8
+DEFAULT_CONTEXT_MAX_CHARS = 60000
+
 SYSTEM_PROMPTS: Dict[str, str] = {
     "react_generator": """You are ZenCode, an expert AI assistant specializing in generating React applications that strictly adhere to enterprise design standards and component libraries.
 
@@ -1,28 +1,36 @@
 import uvicorn
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import routers
+from app.api.middleware import UserIdMiddleware
 import uuid
 from app.services.database_service import database_service
-from datetime import datetime
+from app.services.session_writer import session_writer
+from app.services.user_writer import user_writer
+from app.services.training_worker import training_worker_pool
+from contextlib import asynccontextmanager
 
-app = FastAPI()
 
-@app.middleware("http")
-async def add_user_id_header(request: Request, call_next):
-    existing_user_id = request.headers.get("userid")  # FastAPI normalizes header names to lowercase
-    if not existing_user_id:
-        _id = await database_service.insert_one("users", { "created_at": str(datetime.utcnow())})
-        request.scope["headers"] = [
-            (name, value) for name, value in request.scope["headers"]
-            if name.lower() != b"userid"
-        ] + [(b"userid", str(_id).encode())]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled data backend client per worker
+    await database_service.start()
+    await session_writer.start()
+    await user_writer.start()
+    # Training runs in separate worker processes, fed by the durable job queue
+    training_worker_pool.start()
+    yield
+    await training_worker_pool.stop()
+    # Flush queued session and user writes before the worker exits
+    await user_writer.stop()
+    await session_writer.stop()
+    await database_service.close()
 
-        response = await call_next(request)
-        response.headers["x-user-id"] = str(_id)
-        return response
-    return await call_next(request)
 
+app = FastAPI(lifespan=lifespan)
+
+# Added before CORS so CORS stays the outermost middleware
+app.add_middleware(UserIdMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
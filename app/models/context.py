@@ -5,6 +5,59 @@ from app.lib.constants.model_config import SYSTEM_PROMPTS
 from app.models.component import FileNode, InternalComponent
 import app.utils.llm_parser as Utils
 
+# Fragments are rendered on every request and joined once: rendering is a
+# single pass over the content, which is no more than hashing it for a cache key.
+
+
+def file_fragment(file_node: FileNode) -> str:
+    """Serialized codebase entry for a single file."""
+    return f"{{ fileName: {file_node.fileName}, filePath: {file_node.filePath}, fileContent: {file_node.fileContent} }} \n\n"
+
+
+def css_fragment(css_file: Dict[str, Any]) -> str:
+    """Serialized design system entry for a single CSS file."""
+    return f"FILE: {css_file['path']}\nCONTENT:\n{css_file['content']}\n\n"
+
+
+def design_tokens_context(digest: Dict[str, Any]) -> str:
+    """Serialize a design token digest into the compact design system prompt section."""
+    parts = ["DESIGN SYSTEM - These are the design tokens, utility classes and breakpoints of the enterprise styles that MUST be used:\n\n"]
+    custom_properties = digest.get('custom_properties') or {}
+    if custom_properties:
+        parts.append("CSS CUSTOM PROPERTIES (use via var(--name)):\n")
+        parts.extend(f"--{name}: {' | '.join(values)}\n" for name, values in custom_properties.items())
+    if digest.get('utility_classes'):
+        parts.append(f"\nUTILITY CLASSES: {', '.join(digest['utility_classes'])}\n")
+    if digest.get('breakpoints'):
+        parts.append(f"\nBREAKPOINTS: {'; '.join(digest['breakpoints'])}\n")
+    if digest.get('animations'):
+        parts.append(f"\nANIMATIONS: {', '.join(digest['animations'])}\n")
+    return "".join(parts)
+
+
+def component_fragment(component: InternalComponent) -> str:
+    """Serialized enterprise component entry for a single internal component."""
+    parts = [
+        f"COMPONENT: {component.name}\n",
+        f"IMPORT PATH (MUST use exactly as shown): {Utils.transform_absolute_path(component.path)}\n",
+    ]
+    if component.description:
+        parts.append(f"DESCRIPTION: {component.description}\n")
+    if component.useCase:
+        parts.append(f"USE CASES: {component.useCase}\n")
+    if component.dependencies:
+        parts.append(f"REQUIRED DEPENDENCIES: {', '.join(component.dependencies)}\n")
+    if component.inputProps:
+        parts.append("PROPS SPECIFICATION (use these exact prop names and types):\n")
+        parts.append(f"{component.inputProps}\n")
+    if component.codeSamples:
+        parts.append("IMPLEMENTATION EXAMPLES:\n")
+        for i, sample in enumerate(component.codeSamples, 1):
+            parts.append(f"Example {i}:\n{sample}\n")
+    parts.append("\n---\n\n")
+    return "".join(parts)
+
+
 class Context(BaseModel):
     """
     A class that represents the context for generating responses, 
@@ -12,6 +65,7 @@ class Context(BaseModel):
     """
     user_query: str
     codebase: List[FileNode] = Field(default_factory=list)
+    codebase_summary: Optional[str] = None
     internal_components: List[InternalComponent] = Field(default_factory=list)
     system_prompt: str = SYSTEM_PROMPTS["react_generator"]
     additional_user_prompt: Optional[str] = None
@@ -38,10 +92,10 @@ class Context(BaseModel):
         
         # Add codebase context if available
         if self.codebase:
-            codebase_context = "REPOSITORY CONTEXT - Current codebase structure and files that must be considered for maintaining consistency:\n"
-            for file_node in self.codebase:
-                codebase_context += f"{{ fileName: {file_node.fileName}, filePath: {file_node.filePath}, fileContent: {file_node.fileContent} }} \n\n"
-            
+            codebase_parts = ["REPOSITORY CONTEXT - Current codebase structure and files that must be considered for maintaining consistency:\n"]
+            codebase_parts.extend(file_fragment(file_node) for file_node in self.codebase)
+            codebase_context = "".join(codebase_parts)
+
             messages.append(
                 ChatMessage(
                     role="user",
@@ -49,14 +103,28 @@ class Context(BaseModel):
                 )
             )
 
-        # Add CSS tokens context if available
-        if self.css_tokens and 'files' in self.css_tokens:
-            css_context = "DESIGN SYSTEM - These are the CSS files containing design tokens, styles, and classes that MUST be used:\n\n"
-            for css_file in self.css_tokens['files']:
-                css_context += f"FILE: {css_file['path']}\n"
-                css_context += "CONTENT:\n"
-                css_context += f"{css_file['content']}\n\n"
-            
+        # Add the file tree of files omitted from the codebase context
+        if self.codebase_summary:
+            messages.append(
+                ChatMessage(
+                    role="user",
+                    content="PROJECT FILE TREE - Other existing files (content omitted) with their exported signatures:\n" + self.codebase_summary
+                )
+            )
+
+        # Add CSS tokens context if available, preferring the precomputed digest over raw CSS
+        if self.css_tokens and self.css_tokens.get('digest'):
+            messages.append(
+                ChatMessage(
+                    role="user",
+                    content=design_tokens_context(self.css_tokens['digest'])
+                )
+            )
+        elif self.css_tokens and 'files' in self.css_tokens:
+            css_parts = ["DESIGN SYSTEM - These are the CSS files containing design tokens, styles, and classes that MUST be used:\n\n"]
+            css_parts.extend(css_fragment(css_file) for css_file in self.css_tokens['files'])
+            css_context = "".join(css_parts)
+
             messages.append(
                 ChatMessage(
                     role="user",
@@ -66,16 +134,15 @@ class Context(BaseModel):
 
         # Add dependencies context if available
         if self.dependencies:
-            deps_context = "APPROVED DEPENDENCIES - These are the approved packages that can be used:\n\n"
+            deps_parts = ["APPROVED DEPENDENCIES - These are the approved packages that can be used:\n\n"]
             if 'dependencies' in self.dependencies:
-                deps_context += "PRODUCTION DEPENDENCIES:\n"
-                for dep in self.dependencies['dependencies']:
-                    deps_context += f"- {dep}\n"
+                deps_parts.append("PRODUCTION DEPENDENCIES:\n")
+                deps_parts.extend(f"- {dep}\n" for dep in self.dependencies['dependencies'])
             if 'devDependencies' in self.dependencies:
-                deps_context += "\nDEVELOPMENT DEPENDENCIES:\n"
-                for dep in self.dependencies['devDependencies']:
-                    deps_context += f"- {dep}\n"
-            
+                deps_parts.append("\nDEVELOPMENT DEPENDENCIES:\n")
+                deps_parts.extend(f"- {dep}\n" for dep in self.dependencies['devDependencies'])
+            deps_context = "".join(deps_parts)
+
             messages.append(
                 ChatMessage(
                     role="user",
@@ -85,27 +152,10 @@ class Context(BaseModel):
         
         # Add internal components context if available
         if self.internal_components:
-            components_context = "ENTERPRISE COMPONENTS - These are the approved internal components that MUST be reused. DO NOT create new components if similar functionality exists here. CRITICAL: You MUST use the exact import path provided for each component:\n\n"
-            for component in self.internal_components:
-                absolute_path = Utils.transform_absolute_path(component.path)
-
-                components_context += f"COMPONENT: {component.name}\n"
-                components_context += f"IMPORT PATH (MUST use exactly as shown): {absolute_path}\n"
-                if component.description:
-                    components_context += f"DESCRIPTION: {component.description}\n"
-                if component.useCase:
-                    components_context += f"USE CASES: {component.useCase}\n"
-                if component.dependencies:
-                    components_context += f"REQUIRED DEPENDENCIES: {', '.join(component.dependencies)}\n"
-                if component.inputProps:
-                    components_context += "PROPS SPECIFICATION (use these exact prop names and types):\n"
-                    components_context += f"{component.inputProps}\n"
-                if component.codeSamples:
-                    components_context += "IMPLEMENTATION EXAMPLES:\n"
-                    for i, sample in enumerate(component.codeSamples, 1):
-                        components_context += f"Example {i}:\n{sample}\n"
-                components_context += "\n---\n\n"
-            
+            components_parts = ["ENTERPRISE COMPONENTS - These are the approved internal components that MUST be reused. DO NOT create new components if similar functionality exists here. CRITICAL: You MUST use the exact import path provided for each component:\n\n"]
+            components_parts.extend(component_fragment(component) for component in self.internal_components)
+            components_context = "".join(components_parts)
+
             messages.append(
                 ChatMessage(
                     role="user",
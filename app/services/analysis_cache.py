@@ -0,0 +1,92 @@
+from typing import Dict, Iterable, List, Optional
+from cachetools import LRUCache
+from app.core.config import get_settings
+from app.services.blob_service import blob_hash
+from app.services.database_service import database_service
+from app.services.ingestion_service import LLMComponent, COMPONENT_ANALYSIS_PROMPT_VERSION
+
+settings = get_settings()
+
+
+class AnalysisCache:
+    """
+    LLM analyses of React components shared by every user and repository.
+
+    Entries are keyed by the analysis prompt version, the model and the SHA-256
+    of the component's file content, so byte-identical components (e.g. in
+    forks of the same design system) are analyzed once. Changing the prompt or
+    the model starts a new set of entries.
+    """
+
+    COLLECTION_NAME = "componentAnalyses"
+
+    def __init__(self, cache: Optional[LRUCache] = None):
+        self.cache = cache if cache is not None else LRUCache(maxsize=settings.ANALYSIS_CACHE_MAX_ENTRIES)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, content: str, model: str) -> str:
+        return blob_hash(f"{COMPONENT_ANALYSIS_PROMPT_VERSION}\0{model}\0{blob_hash(content)}")
+
+    async def get_many(self, contents: Iterable[str], model: str) -> Dict[str, LLMComponent]:
+        """
+        Look up cached analyses.
+
+        Returns:
+            Dictionary mapping file contents to their cached analysis; misses are omitted
+        """
+        keys = {content: self.key(content, model) for content in contents}
+        missing = [key for key in keys.values() if key not in self.cache]
+        if missing:
+            try:
+                documents = await database_service.find_many(
+                    self.COLLECTION_NAME,
+                    {"_id": {"$in": missing}},
+                    projection={"_id": 1, "analysis": 1}
+                )
+                for document in documents:
+                    self.cache[document["_id"]] = LLMComponent(**document["analysis"])
+            except Exception as e:
+                # The cache only saves LLM calls, analyze everything rather than fail training
+                print(f"Error reading component analysis cache: {str(e)}")
+
+        found = {content: self.cache[key] for content, key in keys.items() if key in self.cache}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, analyses: Dict[str, LLMComponent], model: str):
+        """Store analyses keyed by the file content they were produced from."""
+        entries = {self.key(content, model): analysis for content, analysis in analyses.items()}
+        new_keys = [key for key in entries if key not in self.cache]
+        if not new_keys:
+            return
+        try:
+            existing = await database_service.find_many(
+                self.COLLECTION_NAME,
+                {"_id": {"$in": new_keys}},
+                projection={"_id": 1}
+            )
+            existing_keys = {document["_id"] for document in existing}
+            documents: List[Dict] = [
+                {
+                    "_id": key,
+                    "promptVersion": COMPONENT_ANALYSIS_PROMPT_VERSION,
+                    "model": model,
+                    "analysis": entries[key].model_dump()
+                }
+                for key in new_keys if key not in existing_keys
+            ]
+            if documents:
+                await database_service.insert_many(self.COLLECTION_NAME, documents)
+            for key in new_keys:
+                self.cache[key] = entries[key]
+        except Exception as e:
+            print(f"Error writing component analysis cache: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.cache), "hits": self.hits, "misses": self.misses}
+
+
+# Create a singleton instance
+analysis_cache = AnalysisCache()
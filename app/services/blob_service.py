@@ -0,0 +1,213 @@
+import os
+import base64
+import hashlib
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+import zstandard
+from cachetools import LRUCache
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def blob_hash(content: str) -> str:
+    """SHA-256 hex digest used as the address of a blob."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class BlobWriteError(RuntimeError):
+    """Raised when some blobs were not stored. `stored` holds the hashes that were."""
+
+    def __init__(self, missing: List[str], stored: Iterable[str] = ()):
+        super().__init__(f"{len(missing)} blobs were not stored")
+        self.missing = missing
+        self.stored = set(stored)
+
+
+class BlobBackend(ABC):
+    """Storage for compressed blobs addressed by their content hash."""
+
+    @abstractmethod
+    async def get_many(self, hashes: List[str]) -> Dict[str, bytes]:
+        """Return the stored blobs among `hashes`, by hash."""
+
+    @abstractmethod
+    async def put_many(self, blobs: Dict[str, bytes]) -> int:
+        """
+        Store blobs that are not stored yet. Returns the number of new blobs written.
+
+        Raises:
+            BlobWriteError: if any blob is not stored once the call returns
+        """
+
+
+class LocalBlobBackend(BlobBackend):
+    """
+    Blob backend kept in memory, or on the local filesystem when a directory is
+    given. Used for tests and single-process deployments.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.blobs: Dict[str, bytes] = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    async def get_many(self, hashes: List[str]) -> Dict[str, bytes]:
+        if not self.directory:
+            return {key: self.blobs[key] for key in hashes if key in self.blobs}
+        return await asyncio.to_thread(self._read_files, hashes)
+
+    async def put_many(self, blobs: Dict[str, bytes]) -> int:
+        if not self.directory:
+            new = {key: data for key, data in blobs.items() if key not in self.blobs}
+            self.blobs.update(new)
+            return len(new)
+        return await asyncio.to_thread(self._write_files, blobs)
+
+    def _read_files(self, hashes: List[str]) -> Dict[str, bytes]:
+        found = {}
+        for key in hashes:
+            try:
+                with open(self._path(key), "rb") as f:
+                    found[key] = f.read()
+            except FileNotFoundError:
+                continue
+        return found
+
+    def _write_files(self, blobs: Dict[str, bytes]) -> int:
+        written = 0
+        for key, data in blobs.items():
+            path = self._path(key)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            written += 1
+        return written
+
+
+class DatabaseBlobBackend(BlobBackend):
+    """Blob backend storing compressed blobs in the `blobs` collection, keyed by hash as `_id`."""
+
+    COLLECTION_NAME = "blobs"
+
+    def __init__(self, db: Any):
+        self.db = db
+
+    async def get_many(self, hashes: List[str]) -> Dict[str, bytes]:
+        if not hashes:
+            return {}
+        documents = await self.db.find_many(self.COLLECTION_NAME, {"_id": {"$in": hashes}}, projection={"_id": 1, "data": 1})
+        return {doc["_id"]: base64.b64decode(doc["data"]) for doc in documents}
+
+    async def put_many(self, blobs: Dict[str, bytes]) -> int:
+        if not blobs:
+            return 0
+        existing = await self.db.find_many(self.COLLECTION_NAME, {"_id": {"$in": list(blobs)}}, projection={"_id": 1})
+        existing_ids = {doc["_id"] for doc in existing}
+        documents = [
+            {"_id": key, "data": base64.b64encode(data).decode("ascii"), "size": len(data)}
+            for key, data in blobs.items() if key not in existing_ids
+        ]
+        if not documents:
+            return 0
+        inserted = await self.db.insert_many(self.COLLECTION_NAME, documents)
+        if inserted == len(documents):
+            return inserted
+        # A short insert may be another writer storing the same blob first, which is as good as ours
+        keys = [document["_id"] for document in documents]
+        stored = await self.db.find_many(self.COLLECTION_NAME, {"_id": {"$in": keys}}, projection={"_id": 1})
+        stored_ids = {doc["_id"] for doc in stored}
+        missing = [key for key in keys if key not in stored_ids]
+        if missing:
+            raise BlobWriteError(missing, stored=existing_ids | stored_ids)
+        return inserted
+
+
+class BlobStore:
+    """
+    Content-addressed store for large text contents (codebase files, component
+    code). Contents are keyed by SHA-256 and zstd-compressed, so identical
+    contents are stored and transferred once no matter how many sessions,
+    messages or components refer to them.
+    """
+
+    def __init__(self, backend: BlobBackend, cache: Optional[LRUCache] = None, level: int = 3):
+        self.backend = backend
+        self.cache = cache if cache is not None else LRUCache(maxsize=1024)
+        self.level = level
+
+    async def put_many(self, contents: Iterable[str]) -> List[str]:
+        """
+        Store contents and return their hashes, in the same order. Only contents
+        confirmed stored are cached, so a failed put is retried by the next one.
+
+        Raises:
+            BlobWriteError: if some contents were not stored
+        """
+        hashes = []
+        new_blobs: Dict[str, tuple[str, bytes]] = {}
+        compressor = zstandard.ZstdCompressor(level=self.level)
+        for content in contents:
+            key = blob_hash(content)
+            hashes.append(key)
+            if key in self.cache or key in new_blobs:
+                continue
+            new_blobs[key] = (content, compressor.compress(content.encode("utf-8")))
+        if new_blobs:
+            try:
+                await self.backend.put_many({key: data for key, (_, data) in new_blobs.items()})
+            except BlobWriteError as e:
+                for key in e.stored & new_blobs.keys():
+                    self.cache[key] = new_blobs[key][0]
+                raise
+            for key, (content, _) in new_blobs.items():
+                self.cache[key] = content
+        return hashes
+
+    async def put(self, content: str) -> str:
+        return (await self.put_many([content]))[0]
+
+    async def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Resolve hashes to contents. Unknown hashes are omitted from the result."""
+        contents: Dict[str, str] = {}
+        missing = []
+        for key in dict.fromkeys(hashes):
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(key)
+            else:
+                contents[key] = cached
+        if missing:
+            decompressor = zstandard.ZstdDecompressor()
+            for key, data in (await self.backend.get_many(missing)).items():
+                content = decompressor.decompress(data).decode("utf-8")
+                self.cache[key] = content
+                contents[key] = content
+        return contents
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_many([key])).get(key)
+
+
+# Decompressed blobs shared by every BlobStore in this process
+_blob_cache: LRUCache = LRUCache(maxsize=settings.BLOB_CACHE_MAX_ENTRIES)
+_local_backend: Optional[LocalBlobBackend] = None
+
+
+def create_blob_store(db: Any) -> BlobStore:
+    """Create the blob store configured by BLOB_BACKEND ("database" or "local")."""
+    global _local_backend
+    if settings.BLOB_BACKEND == "local":
+        if _local_backend is None:
+            _local_backend = LocalBlobBackend(settings.BLOB_LOCAL_PATH)
+        return BlobStore(_local_backend, cache=_blob_cache)
+    return BlobStore(DatabaseBlobBackend(db), cache=_blob_cache)
@@ -0,0 +1,106 @@
+import json
+from typing import Dict, Iterable, List, Optional
+from cachetools import LRUCache
+from app.core.config import get_settings
+from app.models.component import FileNode
+from app.services.database_service import database_service, DatabaseService, content_hash
+
+settings = get_settings()
+
+
+def codebase_version(files: Iterable[FileNode]) -> str:
+    """Content hash of a codebase, independent of file order, so every worker derives the same version."""
+    return content_hash(json.dumps(sorted((file.filePath, content_hash(file.fileContent)) for file in files)))
+
+
+class CodebaseVersionMismatch(Exception):
+    """Raised when a client patch targets a codebase version the server does not hold."""
+
+    def __init__(self, session_id: str, client_version: Optional[str], server_version: Optional[str]):
+        self.session_id = session_id
+        self.client_version = client_version
+        self.server_version = server_version
+        super().__init__(
+            f"Codebase version mismatch for session {session_id}: "
+            f"client has {client_version}, server has {server_version}"
+        )
+
+
+class CodebaseState:
+    """A session's codebase as held by the server, at a given version."""
+
+    def __init__(self, files: Dict[str, FileNode]):
+        self.version = codebase_version(files.values())
+        self.files = files
+
+    def apply_patch(self, patch: List[FileNode], deleted_paths: List[str]) -> List[FileNode]:
+        """Return the codebase with changed files replaced or added and deleted files removed."""
+        files = dict(self.files)
+        for path in deleted_paths:
+            files.pop(path, None)
+        for file in patch:
+            files[file.filePath] = file
+        return list(files.values())
+
+
+class CodebaseStore:
+    """
+    Server-side codebase of each session, so clients only upload the files
+    that changed since the version they last received.
+
+    The held codebase is the one the client sent with its last request,
+    before it applied the generated steps, so clients patch against their own
+    pre-generation state. Versions are content hashes of that codebase, so a
+    state evicted from memory (or held by another worker) is rebuilt from the
+    persisted session at the same version the client was given.
+    """
+
+    def __init__(self, db: DatabaseService = database_service, maxsize: int = settings.CODEBASE_STORE_MAX_SESSIONS):
+        self.db = db
+        self.states: LRUCache = LRUCache(maxsize=maxsize)
+
+    async def get(self, session_id: str) -> Optional[CodebaseState]:
+        """Return the held codebase for a session, loading it from storage if needed."""
+        state = self.states.get(session_id)
+        if state is not None:
+            return state
+        session = await self.db.load_session(session_id)
+        if session is None:
+            return None
+        state = CodebaseState(
+            files={
+                file.filePath: FileNode(fileName=file.fileName, filePath=file.filePath, fileContent=file.fileContent)
+                for file in session.codebase
+            }
+        )
+        self.states[session_id] = state
+        return state
+
+    async def resolve(
+        self,
+        session_id: Optional[str],
+        base_version: Optional[str],
+        patch: List[FileNode],
+        deleted_paths: List[str],
+    ) -> List[FileNode]:
+        """
+        Rebuild the client's current codebase from the held version plus its patch.
+
+        Raises:
+            CodebaseVersionMismatch: if the server does not hold `base_version`
+        """
+        state = await self.get(session_id) if session_id else None
+        server_version = state.version if state else None
+        if state is None or server_version != base_version:
+            raise CodebaseVersionMismatch(session_id, base_version, server_version)
+        return state.apply_patch(patch, deleted_paths)
+
+    def put(self, session_id: str, codebase: List[FileNode]) -> str:
+        """Record the codebase held for a session after a successful request, returning its version."""
+        state = CodebaseState(files={file.filePath: file for file in codebase})
+        self.states[session_id] = state
+        return state.version
+
+
+# Create a singleton instance
+codebase_store = CodebaseStore()
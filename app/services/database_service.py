@@ -1,10 +1,19 @@
-from httpx import AsyncClient
+import copy
+import time
+import uuid
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+from httpx import AsyncClient, AsyncBaseTransport, Limits, Timeout, Response
+from cachetools import LRUCache
 from app.core.config import get_settings
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Sequence, Union
 from pydantic import BaseModel, Field
 from app.models.component import FileNode, InternalComponent
 import json 
 import requests
+from bson import ObjectId
+from app.services.blob_service import create_blob_store, blob_hash
 
 settings = get_settings()
 
@@ -87,6 +96,7 @@ class GithubRepo(BaseModel):
     componentList: List[str] = Field(default_factory=list)
     packageJson: Optional[str] = None
     cssFiles: Optional[str] = None
+    designTokens: Optional[str] = None
     designConfigFiles: Optional[str] = None
     
     class Config:
@@ -128,20 +138,413 @@ class Session(BaseModel):
     codebase: List[FileNode] = Field(default_factory=list)
     internalComponents: List[str] = Field(default_factory=list)
     npmPackages: List[str] = Field(default_factory=list)
+    snapshotSeq: int = 0
     
     class Config:
         validate_assignment = True
         arbitrary_types_allowed = True
 
+class SessionFileDelta(BaseModel):
+    """A changed codebase file, identified by path and content hash.
+    The content itself lives in the blob store and is omitted once persisted."""
+    fileName: str
+    filePath: str
+    contentHash: str
+    fileContent: Optional[str] = None
+
+class SessionDelta(BaseModel):
+    """
+    Changes to a session since its previous write: messages from position
+    `messageStart` on, changed and deleted files. A delta carrying a `snapshot`
+    replaces the stored session state entirely (compaction).
+
+    Messages are positioned rather than appended, so applying overlapping or
+    repeated deltas never duplicates messages. `deltaId` identifies the write
+    attempt, to tell a retry of our own write from another worker's delta
+    with the same seq.
+    """
+    sessionId: str
+    userId: Optional[str] = None
+    seq: int
+    deltaId: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    # None for deltas written before positions were recorded, which are appended
+    messageStart: Optional[int] = None
+    messages: List[Dict[str, Any]] = Field(default_factory=list)
+    files: List[SessionFileDelta] = Field(default_factory=list)
+    deletedPaths: List[str] = Field(default_factory=list)
+    snapshot: Optional[Dict[str, Any]] = None
+
+    def merge(self, newer: "SessionDelta") -> "SessionDelta":
+        """Coalesce a newer delta of the same session into this one."""
+        if newer.snapshot is not None:
+            return newer
+        if self.snapshot is not None:
+            messages, codebase = apply_session_delta(
+                self.snapshot["messages"],
+                {file["filePath"]: file for file in self.snapshot["codebase"]},
+                newer
+            )
+            return SessionDelta(
+                sessionId=self.sessionId,
+                userId=newer.userId or self.userId,
+                seq=newer.seq,
+                snapshot={"messages": messages, "codebase": list(codebase.values())}
+            )
+        if self.messageStart is None or newer.messageStart is None:
+            message_start, messages = self.messageStart, self.messages + newer.messages
+        else:
+            message_start = min(self.messageStart, newer.messageStart)
+            messages = self.messages[:max(0, newer.messageStart - self.messageStart)] + newer.messages
+        files = {file.filePath: file for file in self.files}
+        deleted = [path for path in self.deletedPaths if path not in {f.filePath for f in newer.files}]
+        for path in newer.deletedPaths:
+            files.pop(path, None)
+            if path not in deleted:
+                deleted.append(path)
+        files.update({file.filePath: file for file in newer.files})
+        return SessionDelta(
+            sessionId=self.sessionId,
+            userId=newer.userId or self.userId,
+            seq=newer.seq,
+            messageStart=message_start,
+            messages=messages,
+            files=list(files.values()),
+            deletedPaths=deleted
+        )
+
+class DatabaseWriteError(RuntimeError):
+    """Raised when a write the caller relies on was not (completely) applied by the backend."""
+
+class SessionState:
+    """What this process knows was last written for a session, used to compute deltas.
+    Only advanced once a write succeeded, so a failed write is diffed and sent again."""
+    def __init__(self, seq: int = 0, message_count: int = 0, file_hashes: Optional[Dict[str, str]] = None, deltas_since_snapshot: int = 0):
+        self.seq = seq
+        self.message_count = message_count
+        self.file_hashes = file_hashes or {}
+        self.deltas_since_snapshot = deltas_since_snapshot
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of a text content, the same address used by the blob store."""
+    return blob_hash(content)
+
+def externalize_file(file: Dict[str, Any], contents: Dict[str, str]) -> Dict[str, Any]:
+    """Replace a codebase file's content by its blob hash, collecting the content to store."""
+    if file.get("fileContent") is None:
+        return file
+    key = file.get("contentHash") or content_hash(file["fileContent"])
+    contents[key] = file["fileContent"]
+    return {"fileName": file["fileName"], "filePath": file["filePath"], "contentHash": key}
+
+def externalize_message(message: Dict[str, Any], contents: Dict[str, str]) -> Dict[str, Any]:
+    """Replace the code of FileSteps in an assistant message by blob hashes."""
+    content = message.get("content")
+    if not isinstance(content, dict) or not isinstance(content.get("steps"), list):
+        return message
+    steps = []
+    for step in content["steps"]:
+        if isinstance(step, dict) and step.get("content"):
+            key = content_hash(step["content"])
+            contents[key] = step["content"]
+            step = {**step, "content": "", "contentHash": key}
+        steps.append(step)
+    return {**message, "content": {**content, "steps": steps}}
+
+def _message_steps(message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    content = message.get("content")
+    if isinstance(content, dict) and isinstance(content.get("steps"), list):
+        return [step for step in content["steps"] if isinstance(step, dict)]
+    return []
+
+def apply_session_delta(
+    messages: List[Dict[str, Any]],
+    codebase: Dict[str, Dict[str, Any]],
+    delta: SessionDelta
+) -> tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Apply a delta to a session's messages and path-keyed codebase, returning the new state."""
+    if delta.snapshot is not None:
+        return list(delta.snapshot["messages"]), {file["filePath"]: file for file in delta.snapshot["codebase"]}
+    if delta.messageStart is None:
+        messages = messages + delta.messages
+    else:
+        messages = messages[:delta.messageStart] + delta.messages
+    codebase = dict(codebase)
+    for path in delta.deletedPaths:
+        codebase.pop(path, None)
+    for file in delta.files:
+        codebase[file.filePath] = {
+            "fileName": file.fileName,
+            "filePath": file.filePath,
+            "contentHash": file.contentHash,
+            "fileContent": file.fileContent
+        }
+    return messages, codebase
+
+class ResourceCache:
+    """
+    In-process, per-user cache for data that only changes when training runs
+    (GitHub resources and component documents).
+
+    Entries are keyed by the user's current cache version, so invalidating a
+    user is a single version bump; stale entries are never read again and age
+    out of the bounded LRU. Values are copied in and out, so callers may
+    modify what they get without changing the cache.
+    """
+
+    MISSING = object()
+
+    def __init__(self, maxsize: int):
+        self.entries: LRUCache = LRUCache(maxsize=maxsize)
+        self.versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, user_id: str, kind: str, key: str) -> tuple:
+        return (user_id, self.versions.get(user_id, 0), kind, key)
+
+    def get(self, user_id: str, kind: str, key: str = "") -> Any:
+        """Return the cached value or ResourceCache.MISSING."""
+        value = self.entries.get(self._key(user_id, kind, key), self.MISSING)
+        if value is self.MISSING:
+            self.misses += 1
+            return value
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, user_id: str, kind: str, key: str, value: Any):
+        self.entries[self._key(user_id, kind, key)] = copy.deepcopy(value)
+
+    def invalidate(self, user_id: str):
+        """Invalidate everything cached for a user by bumping their version."""
+        self.versions[user_id] = self.versions.get(user_id, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.entries.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+# Shared by every DatabaseService instance in this process
+resource_cache = ResourceCache(maxsize=settings.RESOURCE_CACHE_MAX_ENTRIES)
+session_states: LRUCache = LRUCache(maxsize=settings.SESSION_STATE_CACHE_SIZE)
+
+class PoolMetrics:
+    """Occupancy and wait-time counters for requests to the data backend."""
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.waited = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "occupancy": round(self.in_flight / self.max_connections, 3) if self.max_connections else 0,
+            "requests": self.requests,
+            "waited": self.waited,
+            "avg_wait_ms": round(self.total_wait_ms / self.requests, 3) if self.requests else 0,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+        }
+
+def create_backend_client(transport: Optional[AsyncBaseTransport] = None) -> AsyncClient:
+    """Create the pooled HTTP client for the Node.js data backend from settings."""
+    http2 = settings.DATA_BACKEND_HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        print("DATA_BACKEND_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+        http2 = False
+    return AsyncClient(
+        base_url=settings.DATA_BACKEND_URL,
+        http2=http2,
+        transport=transport,
+        limits=Limits(
+            max_connections=settings.DATA_BACKEND_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DATA_BACKEND_MAX_KEEPALIVE,
+            keepalive_expiry=settings.DATA_BACKEND_KEEPALIVE_EXPIRY,
+        ),
+        timeout=Timeout(
+            settings.DATA_BACKEND_OPERATION_TIMEOUTS.get("default", 10.0),
+            connect=settings.DATA_BACKEND_CONNECT_TIMEOUT,
+            pool=settings.DATA_BACKEND_POOL_TIMEOUT,
+        ),
+    )
+
+# Projections for the fields each caller actually reads, so large fields such as
+# component code samples and the GitHub component list are not transferred
+COMPONENT_SUMMARY_FIELDS = {"_id": 0, "componentPath": 1, "componentName": 1, "inputProps": 1, "useCase": 1}
+COMPONENT_CODE_FIELDS = {"_id": 0, "componentPath": 1, "componentName": 1, "code": 1, "codeHash": 1}
+GITHUB_RESOURCE_FIELDS = {"_id": 0, "packageJson": 1, "designTokens": 1}
+# Raw CSS is only read for repositories trained before the design token digest existed
+GITHUB_CSS_FIELDS = {"_id": 0, "cssFiles": 1}
+
+# Fields identifying a component document, unique together
+COMPONENT_KEY_FIELDS = ("userId", "githubUrl", "componentPath")
+
+def _json_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON has no ObjectId type, an ObjectId `_id` is sent to the REST backend as its hex string."""
+    if isinstance(document.get("_id"), ObjectId):
+        return {**document, "_id": str(document["_id"])}
+    return document
+
+def _delete_params(query: Dict[str, Any]) -> Dict[str, str]:
+    """Query string of a delete, the backend parses the query as JSON."""
+    return {"query": json.dumps(query)}
+
+def _query_body(query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Request body for find operations. The projection is only sent when given."""
+    body: Dict[str, Any] = {"query": query}
+    if projection:
+        body["projection"] = projection
+    return body
+
+class BatchOperation:
+    """Result slot for one operation queued on a DatabaseBatch, filled when the batch is sent."""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        self.done = False
+        self.ok = False
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    def value(self) -> Any:
+        """Return the operation's result, raising if it failed or the batch was not sent."""
+        if not self.done:
+            raise RuntimeError(f"Batch operation {self.payload['op']} has not been executed")
+        if not self.ok:
+            raise RuntimeError(f"Batch operation {self.payload['op']} failed: {self.error}")
+        return self.result
+
+# Convert raw backend results to what the equivalent single-call DatabaseService method returns
+_BATCH_RESULTS = {
+    "insertOne": lambda result: str(result.get("insertedId")),
+    "insertMany": lambda result: result.get("insertedCount", 0),
+    "findOne": lambda result: result,
+    "find": lambda result: result or [],
+    "updateOne": lambda result: result.get("modifiedCount", 0) > 0,
+    "updateMany": lambda result: result.get("modifiedCount", 0),
+    "deleteOne": lambda result: result.get("deletedCount", 0) > 0,
+    "parse": lambda result: result,
+}
+
+def _upsert_operations(documents: List[Dict[str, Any]], keys: Sequence[str]) -> List[Dict[str, Any]]:
+    """updateMany operations that upsert each document on its key fields."""
+    return [
+        {
+            "filter": {key: document[key] for key in keys},
+            "update": {"$set": {field: value for field, value in document.items() if field not in keys}},
+            "upsert": True
+        }
+        for document in documents
+    ]
+
+class DatabaseBatch:
+    """
+    Operations collected inside `DatabaseService.batch()` and sent to the data
+    backend as a single POST /batch request when the block exits.
+
+    Each queueing method returns a BatchOperation whose result is available
+    after the block. Operations run in the order they were queued, and a
+    failing operation does not prevent the others from running.
+
+    Example:
+        async with database_service.batch() as batch:
+            session = batch.find_one("sessions", {"_id": session_id})
+            parsed = batch.parse_component_code(code)
+        print(session.value(), parsed.value())
+    """
+
+    def __init__(self, db: "DatabaseService"):
+        self.db = db
+        self.operations: List[BatchOperation] = []
+
+    def _add(self, payload: Dict[str, Any]) -> BatchOperation:
+        operation = BatchOperation(payload)
+        self.operations.append(operation)
+        return operation
+
+    def insert_one(self, collection: str, document: Dict[str, Any]) -> BatchOperation:
+        return self._add({"op": "insertOne", "collection": collection, "document": document})
+
+    def insert_many(self, collection: str, documents: List[Dict[str, Any]]) -> BatchOperation:
+        return self._add({"op": "insertMany", "collection": collection, "documents": documents})
+
+    def find_one(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> BatchOperation:
+        return self._add({"op": "findOne", "collection": collection, **_query_body(query, projection)})
+
+    def find_many(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> BatchOperation:
+        return self._add({"op": "find", "collection": collection, **_query_body(query, projection)})
+
+    def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any]) -> BatchOperation:
+        return self._add({"op": "updateOne", "collection": collection, "query": query, "update": update})
+
+    def update_many(self, collection: str, updates: List[Dict[str, Any]]) -> BatchOperation:
+        return self._add({"op": "updateMany", "collection": collection, "updates": updates})
+
+    def delete_one(self, collection: str, query: Dict[str, Any]) -> BatchOperation:
+        return self._add({"op": "deleteOne", "collection": collection, "query": query})
+
+    def parse_component_code(self, code: str) -> BatchOperation:
+        return self._add({"op": "parse", "code": code})
+
+    async def execute(self):
+        """Send all queued operations and fill in their results."""
+        pending = [operation for operation in self.operations if not operation.done]
+        if not pending:
+            return
+        try:
+            results = await self.db._send_batch([operation.payload for operation in pending])
+        except Exception as e:
+            print(f"Error executing batch of {len(pending)} operations: {str(e)}")
+            results = [{"ok": False, "error": str(e)}] * len(pending)
+
+        for operation, result in zip(pending, results):
+            operation.done = True
+            operation.ok = bool(result.get("ok"))
+            if operation.ok:
+                operation.result = _BATCH_RESULTS[operation.payload["op"]](result.get("result"))
+            else:
+                operation.error = result.get("error", "Unknown error")
+
 class DatabaseService:
-    def __init__(self):
-        self.base_url = "http://localhost:4000/api"  # Update this with your Node.js backend URL
-        self.client = AsyncClient()
+    def __init__(self, client: Optional[AsyncClient] = None):
+        self.base_url = settings.DATA_BACKEND_URL
+        self._client = client
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pool = PoolMetrics(settings.DATA_BACKEND_MAX_CONNECTIONS)
+        self.cache = resource_cache
+        self.session_states = session_states
+        self.blobs = create_blob_store(self)
+        # Unknown until the first batch is sent, False if the backend has no /batch endpoint
+        self._batch_supported: Optional[bool] = None
+
+    def invalidate_user_cache(self, userId: str):
+        """Drop cached GitHub resources and components for a user, e.g. after a retrain."""
+        self.cache.invalidate(userId)
+
+    @property
+    def client(self) -> AsyncClient:
+        """The shared pooled client, created on first use if the app lifespan has not started it."""
+        if self._client is None:
+            self._client = create_backend_client()
+        return self._client
+
+    async def start(self, transport: Optional[AsyncBaseTransport] = None):
+        """Create the pooled client for this worker. Called from the app lifespan."""
+        if self._client is None:
+            self._client = create_backend_client(transport)
 
     async def connect(self):
         """Test the backend connection."""
         try:
-            response = await self.client.get(f"{self.base_url}/health")
+            response = await self._request("health", "GET", "/health")
             return response.status_code == 200
         except Exception as e:
             print(f"Failed to connect to backend: {e}")
@@ -149,14 +552,108 @@ class DatabaseService:
 
     async def close(self):
         """Close the HTTP client."""
-        await self.client.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
+
+    async def _request(self, operation: str, method: str, path: str, **kwargs) -> Response:
+        """Send a request to the data backend with the operation's timeout, tracking pool occupancy.
+        
+        Requests are admitted through a semaphore sized like the connection pool, so
+        time spent waiting for a free connection is measured here.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool.max_connections)
+
+        wait_start = time.perf_counter()
+        async with self._slots:
+            wait_ms = (time.perf_counter() - wait_start) * 1000
+            self.pool.requests += 1
+            self.pool.total_wait_ms += wait_ms
+            self.pool.max_wait_ms = max(self.pool.max_wait_ms, wait_ms)
+            if wait_ms > 1:
+                self.pool.waited += 1
+            self.pool.in_flight += 1
+            self.pool.max_in_flight = max(self.pool.max_in_flight, self.pool.in_flight)
+            try:
+                timeouts = settings.DATA_BACKEND_OPERATION_TIMEOUTS
+                timeout = timeouts.get(operation, timeouts.get("default", 10.0))
+                return await self.client.request(
+                    method,
+                    path,
+                    timeout=Timeout(timeout, connect=settings.DATA_BACKEND_CONNECT_TIMEOUT, pool=settings.DATA_BACKEND_POOL_TIMEOUT),
+                    **kwargs
+                )
+            finally:
+                self.pool.in_flight -= 1
+
+    @asynccontextmanager
+    async def batch(self):
+        """Collect operations and send them as one round trip when the block exits.
+        
+        Operations are not sent if the block raises.
+        
+        Yields:
+            DatabaseBatch to queue operations on
+        """
+        batch = DatabaseBatch(self)
+        yield batch
+        await batch.execute()
+
+    async def _send_batch(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send operations to POST /batch, falling back to one request per operation
+        for backends that do not expose the batch endpoint.
+        
+        Returns:
+            One {"ok", "result"} or {"ok", "error"} entry per operation, in order
+        """
+        if self._batch_supported is not False:
+            response = await self._request(
+                "batch", "POST", "/batch",
+                json={"operations": operations}
+            )
+            if response.status_code != 404:
+                self._batch_supported = True
+                response.raise_for_status()
+                return response.json()["results"]
+            print("Data backend has no /batch endpoint, sending batched operations individually")
+            self._batch_supported = False
+
+        return await asyncio.gather(*(self._send_single(operation) for operation in operations))
+
+    async def _send_single(self, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one batch operation through its regular REST route."""
+        op = operation["op"]
+        collection = operation.get("collection")
+        routes = {
+            "insertOne": ("insert", "POST", f"/{collection}", {"json": operation.get("document")}),
+            "insertMany": ("insert", "POST", f"/{collection}/insertMany", {"json": {"documents": operation.get("documents")}}),
+            "findOne": ("find", "POST", f"/{collection}/findOne", {"json": _query_body(operation.get("query"), operation.get("projection"))}),
+            "find": ("find", "POST", f"/{collection}/find", {"json": _query_body(operation.get("query"), operation.get("projection"))}),
+            "updateOne": ("update", "PATCH", f"/{collection}", {"json": {"query": operation.get("query"), "update": operation.get("update")}}),
+            "updateMany": ("update", "PATCH", f"/{collection}/updateMany", {"json": {"updates": operation.get("updates")}}),
+            "deleteOne": ("delete", "DELETE", f"/{collection}", {"params": _delete_params(operation.get("query"))}),
+            "parse": ("parse", "POST", "/parse", {"json": {"code": operation.get("code")}}),
+        }
+        try:
+            kind, method, path, kwargs = routes[op]
+            response = await self._request(kind, method, path, **kwargs)
+            if op == "findOne" and response.status_code == 404:
+                return {"ok": True, "result": None}
+            response.raise_for_status()
+            return {"ok": True, "result": response.json()}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
 
     async def insert_one(self, collection: str, document: Dict[str, Any]) -> str:
         """Insert a single document into the specified collection."""
         try:
-            response = await self.client.post(
-                f"{self.base_url}/{collection}",
-                json=document
+            response = await self._request(
+                "insert", "POST", f"/{collection}",
+                json=_json_document(document)
             )
             result = response.json()
             return str(result.get("insertedId"))
@@ -168,10 +665,10 @@ class DatabaseService:
         """Insert multiple documents into the specified collection.
         Returns the number of documents inserted."""
         try:
-            response = await self.client.post(
-                f"{self.base_url}/{collection}/insertMany",
+            response = await self._request(
+                "insert", "POST", f"/{collection}/insertMany",
                 json={
-                    "documents": documents
+                    "documents": [_json_document(document) for document in documents]
                 }
             )
             result = response.json()
@@ -180,14 +677,18 @@ class DatabaseService:
             print(f"Error inserting multiple documents into {collection}: {str(e)}")
             return 0
     
-    async def find_one(self, collection: str, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Find a single document in the specified collection."""
+    async def find_one(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """Find a single document in the specified collection.
+        
+        Args:
+            collection: The collection to search
+            query: MongoDB query
+            projection: Optional MongoDB projection limiting the returned fields
+        """
         try:
-            response = await self.client.post(
-                f"{self.base_url}/{collection}/findOne",
-                json={
-                    "query": query
-                }
+            response = await self._request(
+                "find", "POST", f"/{collection}/findOne",
+                json=_query_body(query, projection)
             )
             data = response.json() if response.status_code == 200 else None
             return data
@@ -195,14 +696,18 @@ class DatabaseService:
             print(f"Error finding document in {collection}: {str(e)}")
             return None
 
-    async def find_many(self, collection: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Find multiple documents in the specified collection."""
+    async def find_many(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Find multiple documents in the specified collection.
+        
+        Args:
+            collection: The collection to search
+            query: MongoDB query
+            projection: Optional MongoDB projection limiting the returned fields
+        """
         try:
-            response = await self.client.post(
-                f"{self.base_url}/{collection}/find",
-                json={
-                    "query": query
-                }
+            response = await self._request(
+                "find", "POST", f"/{collection}/find",
+                json=_query_body(query, projection)
             )
             result = response.json()
             return result if response.status_code == 200 else []
@@ -213,8 +718,8 @@ class DatabaseService:
     async def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any]) -> bool:
         """Update a single document in the specified collection."""
         try:
-            response = await self.client.patch(
-                f"{self.base_url}/{collection}",
+            response = await self._request(
+                "update", "PATCH", f"/{collection}",
                 json={
                     "query": query,
                     "update": update
@@ -237,8 +742,8 @@ class DatabaseService:
             Number of documents modified
         """
         try:
-            response = await self.client.patch(
-                f"{self.base_url}/{collection}/updateMany",
+            response = await self._request(
+                "update", "PATCH", f"/{collection}/updateMany",
                 json={
                     "updates": updates
                 }
@@ -249,12 +754,63 @@ class DatabaseService:
             print(f"Error updating multiple documents in {collection}: {str(e)}")
             return 0
 
+    async def bulk_upsert(self, collection: str, documents: List[Dict[str, Any]], keys: Sequence[str]) -> int:
+        """Insert or update documents identified by their `keys` fields, in one bulk request.
+        
+        Writing the same documents again updates them in place, so the operation
+        is idempotent and never creates duplicates. Backends whose updateMany
+        route ignores the per-operation upsert flag (their result has no
+        upsertedCount) get the documents that do not exist yet inserted instead.
+        
+        Args:
+            collection: The collection to write to
+            documents: Full documents, each containing all `keys` fields
+            keys: Fields that identify a document, backed by a unique index
+            
+        Returns:
+            Number of documents inserted or modified
+            
+        Raises:
+            DatabaseWriteError: if the documents could not be written
+        """
+        if not documents:
+            return 0
+        try:
+            response = await self._request(
+                "update", "PATCH", f"/{collection}/updateMany",
+                json={
+                    "updates": _upsert_operations(documents, keys)
+                }
+            )
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            raise DatabaseWriteError(f"Error upserting documents into {collection}: {str(e)}") from e
+        written = result.get("modifiedCount", 0) + result.get("upsertedCount", 0)
+        if "upsertedCount" in result or written >= len(documents):
+            return written
+
+        # Upserts were not performed, insert the documents that do not exist yet
+        existing = await self.find_many(
+            collection,
+            {"$or": [{key: document[key] for key in keys} for document in documents]},
+            projection={"_id": 0, **{key: 1 for key in keys}}
+        )
+        existing_keys = {tuple(document.get(key) for key in keys) for document in existing}
+        missing = [document for document in documents if tuple(document[key] for key in keys) not in existing_keys]
+        if missing:
+            inserted = await self.insert_many(collection, missing)
+            if inserted < len(missing):
+                raise DatabaseWriteError(f"Only {inserted} of {len(missing)} new documents were inserted into {collection}")
+            written += inserted
+        return written
+
     async def delete_one(self, collection: str, query: Dict[str, Any]) -> bool:
         """Delete a single document from the specified collection."""
         try:
-            response = await self.client.delete(
-                f"{self.base_url}/{collection}",
-                params={"query": query}
+            response = await self._request(
+                "delete", "DELETE", f"/{collection}",
+                params=_delete_params(query)
             )
             result = response.json()
             return result.get("deletedCount", 0) > 0
@@ -279,7 +835,8 @@ class DatabaseService:
             session_id = await self.insert_one("sessions", new_session.dict())
             if not session_id:
                 raise Exception("Failed to create new session")
-            
+
+            self.session_states[session_id] = SessionState()
             return session_id
             
         except Exception as e:
@@ -307,6 +864,274 @@ class DatabaseService:
             print(f"Error updating session: {str(e)}")
             return False
 
+    async def build_session_delta(
+        self,
+        session_id: str,
+        userId: Optional[str],
+        messages: List[Dict[str, Any]],
+        codebase: List[Dict[str, Any]]
+    ) -> Optional[SessionDelta]:
+        """Compute what changed in a session since its last write.
+        
+        Only messages appended since the last write and files whose content hash
+        changed are included. Every SESSION_COMPACTION_INTERVAL deltas, or when
+        the history no longer extends what was stored, a full snapshot is
+        produced instead.
+        
+        Args:
+            session_id: The ID of the session
+            userId: The owner of the session
+            messages: The full, current message history
+            codebase: The full, current codebase as FileNode dicts
+            
+        Returns:
+            The delta to write, or None if nothing changed
+        """
+        state = self.session_states.get(session_id)
+        if state is None:
+            state = await self._load_session_state(session_id)
+            self.session_states[session_id] = state
+
+        file_hashes = {file["filePath"]: content_hash(file["fileContent"]) for file in codebase}
+        seq = state.seq + 1
+        compact = (
+            len(messages) < state.message_count
+            or state.deltas_since_snapshot + 1 >= settings.SESSION_COMPACTION_INTERVAL
+        )
+
+        if compact:
+            delta = SessionDelta(
+                sessionId=session_id,
+                userId=userId,
+                seq=seq,
+                snapshot={"messages": messages, "codebase": codebase}
+            )
+        else:
+            changed_files = [
+                SessionFileDelta(
+                    fileName=file["fileName"],
+                    filePath=file["filePath"],
+                    contentHash=file_hashes[file["filePath"]],
+                    fileContent=file["fileContent"]
+                )
+                for file in codebase
+                if state.file_hashes.get(file["filePath"]) != file_hashes[file["filePath"]]
+            ]
+            delta = SessionDelta(
+                sessionId=session_id,
+                userId=userId,
+                seq=seq,
+                messageStart=state.message_count,
+                messages=messages[state.message_count:],
+                files=changed_files,
+                deletedPaths=[path for path in state.file_hashes if path not in file_hashes]
+            )
+            if not (delta.messages or delta.files or delta.deletedPaths):
+                return None
+
+        # The tracking state only advances in _commit_session_state, once the delta is written.
+        # Deltas built before that overlap, which positioned messages make harmless.
+        return delta
+
+    def _commit_session_state(self, delta: SessionDelta):
+        """Advance the delta tracking state of a session past a delta that was written."""
+        session_id = delta.sessionId
+        state = self.session_states.get(session_id)
+        if delta.snapshot is not None:
+            self.session_states[session_id] = SessionState(
+                seq=delta.seq,
+                message_count=len(delta.snapshot["messages"]),
+                file_hashes={
+                    file["filePath"]: file.get("contentHash") or content_hash(file["fileContent"])
+                    for file in delta.snapshot["codebase"]
+                }
+            )
+            return
+        if state is None:
+            # Evicted, rebuilt from storage on the next delta
+            return
+        file_hashes = {path: key for path, key in state.file_hashes.items() if path not in delta.deletedPaths}
+        file_hashes.update({file.filePath: file.contentHash for file in delta.files})
+        start = delta.messageStart if delta.messageStart is not None else state.message_count
+        self.session_states[session_id] = SessionState(
+            seq=max(state.seq, delta.seq),
+            message_count=start + len(delta.messages),
+            file_hashes=file_hashes,
+            deltas_since_snapshot=state.deltas_since_snapshot + 1
+        )
+
+    async def _latest_session_seq(self, session_id: str) -> int:
+        """Highest seq stored for a session, in its snapshot or any of its deltas."""
+        session = await self.find_one("sessions", {"_id": session_id}, projection={"snapshotSeq": 1})
+        deltas = await self.find_many("sessionDeltas", {"sessionId": session_id}, projection={"seq": 1})
+        return max([(session or {}).get("snapshotSeq", 0)] + [delta.get("seq", 0) for delta in deltas])
+
+    async def _insert_session_deltas(self, deltas: List[SessionDelta], documents: List[Dict[str, Any]]):
+        """Insert delta documents keyed by (sessionId, seq), so a seq is only ever stored once.
+        
+        A delta whose seq another worker already used for the same session is
+        moved past the latest stored seq and inserted again.
+        
+        Raises:
+            DatabaseWriteError: if deltas are still missing after the retries
+        """
+        pending = list(zip(deltas, documents))
+        for _ in range(3):
+            for delta, document in pending:
+                document["seq"] = delta.seq
+                document["_id"] = f"{delta.sessionId}:{delta.seq}"
+            inserted = await self.insert_many("sessionDeltas", [document for _, document in pending])
+            if inserted == len(pending):
+                return
+            # Find out which inserts lost to an existing document and whether that was our own earlier attempt
+            stored = await self.find_many(
+                "sessionDeltas",
+                {"_id": {"$in": [document["_id"] for _, document in pending]}},
+                projection={"_id": 1, "deltaId": 1}
+            )
+            stored_ids = {document["_id"]: document.get("deltaId") for document in stored}
+            conflicts = []
+            for delta, document in pending:
+                if document["_id"] not in stored_ids:
+                    conflicts.append((delta, document))
+                elif stored_ids[document["_id"]] != delta.deltaId:
+                    delta.seq = await self._latest_session_seq(delta.sessionId) + 1
+                    conflicts.append((delta, document))
+            if not conflicts:
+                return
+            pending = conflicts
+        raise DatabaseWriteError(f"{len(pending)} session deltas were not written")
+
+    async def _prune_session_deltas(self, session_id: str, snapshot_seq: int):
+        """Delete the deltas a snapshot made obsolete. Failures only leave dead rows behind."""
+        obsolete = await self.find_many(
+            "sessionDeltas",
+            {"sessionId": session_id, "seq": {"$lte": snapshot_seq}},
+            projection={"_id": 1}
+        )
+        if not obsolete:
+            return
+        async with self.batch() as batch:
+            deletions = [batch.delete_one("sessionDeltas", {"_id": document["_id"]}) for document in obsolete]
+        failed = [deletion.error for deletion in deletions if not deletion.ok]
+        if failed:
+            print(f"Error pruning {len(failed)} deltas of session {session_id}: {failed[0]}")
+
+    async def write_session_deltas(self, deltas: List[SessionDelta]) -> int:
+        """Persist session deltas: plain deltas are appended in one insert, snapshots replace the session
+        and prune the deltas they cover. File contents and generated code are stored once in the blob
+        store and referenced by hash. The session tracking state advances only for written deltas.
+        
+        Returns:
+            Number of deltas written
+            
+        Raises:
+            DatabaseWriteError: if any delta or snapshot was not written, so the caller can retry
+        """
+        contents: Dict[str, str] = {}
+        appended = []
+        snapshots = []
+        for delta in deltas:
+            if delta.snapshot is None:
+                document = delta.model_dump(exclude={"snapshot"})
+                document["messages"] = [externalize_message(m, contents) for m in document["messages"]]
+                document["files"] = [externalize_file(f, contents) for f in document["files"]]
+                appended.append(document)
+            else:
+                snapshots.append((delta, {
+                    "messages": [externalize_message(m, contents) for m in delta.snapshot["messages"]],
+                    "codebase": [externalize_file(f, contents) for f in delta.snapshot["codebase"]],
+                    "snapshotSeq": delta.seq
+                }))
+
+        # Blobs first, so no stored session ever references a missing blob
+        if contents:
+            await self.blobs.put_many(contents.values())
+
+        written = 0
+        appended_deltas = [delta for delta in deltas if delta.snapshot is None]
+        if appended:
+            await self._insert_session_deltas(appended_deltas, appended)
+            for delta in appended_deltas:
+                self._commit_session_state(delta)
+            written += len(appended)
+
+        for delta, snapshot in snapshots:
+            if delta.userId:
+                snapshot["userId"] = delta.userId
+            # Never let an older snapshot overwrite a newer one written by another worker
+            newer_than_stored = {"$or": [{"snapshotSeq": {"$lt": delta.seq}}, {"snapshotSeq": {"$exists": False}}]}
+            if not await self.update_one("sessions", {"_id": delta.sessionId, **newer_than_stored}, {"$set": snapshot}):
+                # Nothing modified is fine when this or a newer snapshot is already stored
+                stored = await self.find_one("sessions", {"_id": delta.sessionId}, projection={"snapshotSeq": 1})
+                if not stored or stored.get("snapshotSeq", 0) < delta.seq:
+                    raise DatabaseWriteError(f"Snapshot {delta.seq} of session {delta.sessionId} was not written")
+            self._commit_session_state(delta)
+            await self._prune_session_deltas(delta.sessionId, delta.seq)
+            written += 1
+        return written
+
+    async def load_session(self, session_id: str) -> Optional[Session]:
+        """Reconstruct a session from its last snapshot plus the deltas written after it.
+        
+        Args:
+            session_id: The ID of the session to load
+            
+        Returns:
+            The reconstructed Session, or None if it does not exist
+        """
+        session = await self.find_one("sessions", {"_id": session_id})
+        if not session:
+            return None
+
+        snapshot_seq = session.get("snapshotSeq", 0)
+        messages = session.get("messages", [])
+        codebase = {file["filePath"]: file for file in session.get("codebase", [])}
+
+        deltas = await self.find_many(
+            "sessionDeltas",
+            {"sessionId": session_id, "seq": {"$gt": snapshot_seq}}
+        )
+        last_seq = snapshot_seq
+        for delta in sorted((SessionDelta(**d) for d in deltas), key=lambda d: d.seq):
+            messages, codebase = apply_session_delta(messages, codebase, delta)
+            last_seq = delta.seq
+
+        # Resolve blob references of files and generated steps in one lookup
+        steps = [step for message in messages for step in _message_steps(message) if step.get("contentHash")]
+        files = [file for file in codebase.values() if file.get("fileContent") is None and file.get("contentHash")]
+        blobs = await self.blobs.get_many(
+            [step["contentHash"] for step in steps] + [file["contentHash"] for file in files]
+        )
+        missing = {step["contentHash"] for step in steps} | {file["contentHash"] for file in files}
+        missing -= blobs.keys()
+        if missing:
+            print(f"Session {session_id} references {len(missing)} missing blobs, their contents are empty")
+        for step in steps:
+            step["content"] = blobs.get(step.pop("contentHash"), step.get("content", ""))
+        for file in files:
+            file["fileContent"] = blobs.get(file["contentHash"], "")
+
+        return Session(
+            userId=session.get("userId", ""),
+            messages=messages,
+            codebase=list(codebase.values()),
+            internalComponents=session.get("internalComponents", []),
+            npmPackages=session.get("npmPackages", []),
+            snapshotSeq=last_seq
+        )
+
+    async def _load_session_state(self, session_id: str) -> SessionState:
+        """Rebuild the delta tracking state of a session not seen by this process yet."""
+        session = await self.load_session(session_id)
+        if not session:
+            return SessionState()
+        return SessionState(
+            seq=session.snapshotSeq,
+            message_count=len(session.messages),
+            file_hashes={file.filePath: content_hash(file.fileContent) for file in session.codebase}
+        )
+
     async def get_missing_internal_components(
         self,
         component_paths: List[str],
@@ -332,9 +1157,15 @@ class DatabaseService:
             {
                 "componentPath": {"$in": component_paths},
                 "userId": userId
-            }
+            },
+            projection=COMPONENT_CODE_FIELDS
         )
         
+        # Component code is stored in the blob store, older documents still carry it inline
+        code_blobs = await self.blobs.get_many(
+            [component["codeHash"] for component in db_components if component.get("codeHash")]
+        )
+
         # Convert to FileNode objects
         file_nodes = []
         for component in db_components:
@@ -342,7 +1173,7 @@ class DatabaseService:
                 FileNode(
                     fileName=component["componentName"],
                     filePath=component["componentPath"],
-                    fileContent=component.get("code", ""),
+                    fileContent=code_blobs.get(component.get("codeHash"), component.get("code", "")),
                 )
             )
             
@@ -367,18 +1198,37 @@ class DatabaseService:
         
         if not component_paths:
             return components
-            
-        # Fetch components from database
-        db_components = await self.find_many(
-            "components",
-            {
-                "componentPath": {"$in": component_paths},
-                "userId": userId
-            }
-        )
+
+        # Serve cached component documents, only querying paths not seen since the last training
+        cached_components = {}
+        missing_paths = []
+        for path in dict.fromkeys(component_paths):
+            cached = self.cache.get(userId, "component", path)
+            if cached is ResourceCache.MISSING:
+                missing_paths.append(path)
+            else:
+                cached_components[path] = cached
+
+        if missing_paths:
+            # Fetch components from database
+            db_components = await self.find_many(
+                "components",
+                {
+                    "componentPath": {"$in": missing_paths},
+                    "userId": userId
+                },
+                projection=COMPONENT_SUMMARY_FIELDS
+            )
+            for component in db_components:
+                cached_components[component["componentPath"]] = component
+                # Unknown paths are not cached, they may be trained later
+                self.cache.set(userId, "component", component["componentPath"], component)
         
         # Create internal components with full details
-        for component in db_components:
+        for path in dict.fromkeys(component_paths):
+            component = cached_components.get(path)
+            if not component:
+                continue
             components.append(
                 InternalComponent(
                     path=component["componentPath"],
@@ -390,12 +1240,13 @@ class DatabaseService:
             
         return components
         
-    async def fetch_github_data(self, userId: str) -> Optional[Dict[str, Any]]:
+    async def fetch_github_data(self, userId: str, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
         """
         Fetch GitHub repository data for a user
         
         Args:
             userId: The user ID to fetch GitHub data for
+            projection: Optional MongoDB projection limiting the returned fields
             
         Returns:
             Dictionary containing GitHub repository data or None if not found
@@ -406,7 +1257,8 @@ class DatabaseService:
             {
                 "userId": userId,
                 "githubUrl": {"$exists": True}
-            }
+            },
+            projection=projection
         )
         
         return github_data
@@ -416,49 +1268,65 @@ class DatabaseService:
         
         response = requests.post(
             f"{self.base_url}/parse",
-            json={"code": code}
+            json={"code": code},
+            timeout=settings.DATA_BACKEND_OPERATION_TIMEOUTS.get("parse", 15.0)
         )
         return response.json()
     
     async def parse_component_code(self, code: str) -> Dict[str, Any]:
         """Parse component code to extract dependencies and other metadata"""
-        response = await self.client.post(
-                f"{self.base_url}/parse",
+        response = await self._request(
+                "parse", "POST", "/parse",
                 json={"code": code}
             )
         data = response.json()
         return data
     
-    async def get_github_resources(self, userId: str) -> tuple[List[str], Dict[str, List[str]]]:
+    async def get_github_resources(self, userId: str) -> tuple[List[Dict[str, str]], Dict[str, List[str]], Optional[Dict[str, Any]]]:
         """
-        Fetch GitHub resources (CSS files and dependencies) for a user
+        Fetch GitHub resources (CSS files, dependencies and design tokens) for a user
         
         Args:
-            database_service: Database service instance
             userId: User ID to fetch resources for
             
         Returns:
             Tuple containing:
-            - List of CSS files
+            - List of CSS files, only fetched when there is no design token digest
             - Dictionary of dependencies and devDependencies
+            - Design token digest computed at train time, or None for repos trained before it existed
         """
+        cached = self.cache.get(userId, "github")
+        if cached is not ResourceCache.MISSING:
+            return cached
+
         # Initialize empty return values
         css_files = []
         dependencies = {
             "dependencies": [],
             "devDependencies": []
         }
+        design_tokens = None
         
         # Fetch GitHub data
-        github_data = await database_service.fetch_github_data(userId)
+        github_data = await self.fetch_github_data(userId, projection=GITHUB_RESOURCE_FIELDS)
         
-        if github_data:
-            # Process CSS files
-            if github_data.get("cssFiles"):
+        # Projected documents without any of the fields are empty, but exist
+        if github_data is not None:
+            # Process design token digest
+            if github_data.get("designTokens"):
                 try:
-                    css_files = json.loads(github_data["cssFiles"])
+                    design_tokens = json.loads(github_data["designTokens"])
                 except json.JSONDecodeError:
                     pass
+
+            # Process CSS files of repos trained before the digest existed
+            if design_tokens is None:
+                css_data = await self.fetch_github_data(userId, projection=GITHUB_CSS_FIELDS)
+                if css_data and css_data.get("cssFiles"):
+                    try:
+                        css_files = json.loads(css_data["cssFiles"])
+                    except json.JSONDecodeError:
+                        pass
             
             # Process package.json data
             if github_data.get("packageJson"):
@@ -472,7 +1340,23 @@ class DatabaseService:
                 except json.JSONDecodeError:
                     pass
         
-        return css_files, dependencies
+        resources = (css_files, dependencies, design_tokens)
+        if github_data is not None:
+            # Users without a trained repository are not cached, training adds one later
+            self.cache.set(userId, "github", "", resources)
+        return resources
+
+def create_database_service() -> DatabaseService:
+    """Create the DatabaseService for the configured DATABASE_BACKEND ("node" or "mongodb").
+    
+    The MongoDB backend is imported lazily so motor is only loaded when it is used.
+    """
+    if settings.DATABASE_BACKEND == "mongodb":
+        from app.services.mongo_database_service import MongoDatabaseService
+        return MongoDatabaseService()
+    if settings.DATABASE_BACKEND != "node":
+        raise ValueError(f"Unknown DATABASE_BACKEND: {settings.DATABASE_BACKEND}")
+    return DatabaseService()
 
 # Create a singleton instance
-database_service = DatabaseService() 
\ No newline at end of file
+database_service = create_database_service() 
\ No newline at end of file
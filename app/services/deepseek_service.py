@@ -1,9 +1,11 @@
 from openai import OpenAI
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, Iterator, List, Union
 from pydantic import BaseModel
 from app.models.builder_steps import ReactResponse
 from app.lib.constants.model_config import SYSTEM_PROMPTS, DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE, DEFAULT_LLM_MODEL
 from langchain_openai import ChatOpenAI
+from app.services.outbound_governor import outbound_governor
+from app.services.openai_service import iter_chat_stream
 
 class ChatMessage(BaseModel):
     role: str
@@ -31,7 +33,8 @@ class DeepSeekService:
             
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url="https://api.deepseek.com"
+            base_url="https://api.deepseek.com",
+            max_retries=0
         )
         
         self.model_config = ModelConfig(
@@ -42,7 +45,9 @@ class DeepSeekService:
         
     def generate_content(self, prompt: str, model: Optional[str] = None) -> Dict[Any, Any]:
         model = model or self.model_config.model
-        response = self.client.chat.completions.create(
+        response = outbound_governor.call(
+            "deepseek",
+            self.client.chat.completions.create,
             model=model,
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPTS["react_generator"]},
@@ -58,7 +63,7 @@ class DeepSeekService:
             "raw_response": response
         }
     
-    def chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None) -> Dict[Any, Any]:
+    def chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None, timeout: Optional[float] = None) -> Dict[Any, Any]:
         model = model or self.model_config.model
         formatted_messages = [
             {"role": msg.role, "content": msg.content}
@@ -73,12 +78,15 @@ class DeepSeekService:
                 # "content": SYSTEM_PROMPTS["XML_SYSTEM_PROMPT"]
             })
         
-        response = self.client.beta.chat.completions.parse(
+        response = outbound_governor.call(
+            "deepseek",
+            self.client.beta.chat.completions.parse,
             model=model,
             messages=formatted_messages,
             max_tokens=self.model_config.max_tokens,
             temperature=self.model_config.temperature,
             # response_format=ReactResponse,
+            **({"timeout": timeout} if timeout else {})
         )
 
         return {
@@ -86,6 +94,31 @@ class DeepSeekService:
             "raw_response": response
         }
     
+    def stream_chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[Union[str, Dict[str, int]]]:
+        """Stream a chat completion, see iter_chat_stream for the items yielded."""
+        model = model or self.model_config.model
+        formatted_messages = [
+            {"role": msg.role, "content": msg.content}
+            for msg in messages
+        ]
+        if not any(msg.role == "system" for msg in messages):
+            formatted_messages.insert(0, {
+                "role": "system",
+                "content": SYSTEM_PROMPTS["react_generator"]
+            })
+        stream = outbound_governor.stream(
+            "deepseek",
+            self.client.chat.completions.create,
+            model=model,
+            messages=formatted_messages,
+            max_tokens=self.model_config.max_tokens,
+            temperature=self.model_config.temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            **({"timeout": timeout} if timeout else {})
+        )
+        return iter_chat_stream(stream)
+    
     def lc_chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None) -> Dict[Any, Any]:
         model = model or self.model_config.model
         formatted_messages = [
@@ -101,11 +134,11 @@ class DeepSeekService:
             })
         
         # Initialize the LLM with structured output
-        llm = ChatOpenAI(model=model, temperature=self.model_config.temperature)
+        llm = ChatOpenAI(model=model, temperature=self.model_config.temperature, max_retries=0)
         structured_llm = llm.with_structured_output(ReactResponse)
 
         # Invoke the structured LLM
-        response = structured_llm.invoke(formatted_messages)
+        response = outbound_governor.call("openai", structured_llm.invoke, formatted_messages)
 
         return {
             "text": response.text,
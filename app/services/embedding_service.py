@@ -1,19 +1,30 @@
+import threading
 from openai import OpenAI
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+from app.services.embedding_store import EmbeddingStore
+from app.services.outbound_governor import outbound_governor, http_response_info
 
 class EmbeddingService:
-    def __init__(self, api_key: str, model: str = "text-embedding-3-large"):
+    def __init__(self, api_key: str, model: str = "text-embedding-3-large", store: Optional[EmbeddingStore] = None):
         """
         Initialize the embedding service with the OpenAI API key and model.
         
         Args:
             api_key: OpenAI API key
             model: Embedding model to use, defaults to text-embedding-3-large
+            store: Optional store of previously computed embeddings, reused for identical texts
         """
         self.api_key = api_key
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        # Retries are left to the outbound governor, which also paces and limits calls
+        self.client = OpenAI(api_key=self.api_key, max_retries=0)
+        self.store = store
+        # Tokens spent on embeddings by this service, embeddings may be requested from several threads
+        self.tokens_used = 0
+        # Texts whose embedding was reused from the store or the same request instead of requested
+        self.embeddings_reused = 0
+        self._usage_lock = threading.Lock()
         
         # Dimensions mapping for different models
         self.dimensions = {
@@ -41,11 +52,20 @@ class EmbeddingService:
         Returns:
             List of embedding vectors
         """
-        response = self.client.embeddings.create(
+        raw_response = outbound_governor.call(
+            "openai",
+            self.client.embeddings.with_raw_response.create,
             input=texts,
-            model=self.model
+            model=self.model,
+            response_info=http_response_info
         )
+        response = raw_response.parse()
         
+        usage = getattr(response, "usage", None)
+        if usage:
+            with self._usage_lock:
+                self.tokens_used += usage.total_tokens or 0
+
         # Extract embeddings from response
         embeddings = [data.embedding for data in response.data]
         return embeddings
@@ -70,6 +90,7 @@ class EmbeddingService:
     ) -> List[Dict[str, Any]]:
         """
         Prepare data for upserting to Pinecone by adding embeddings.
+        Embeddings found in the store are reused, only new texts are sent to the API.
         
         Args:
             data: List of data dictionaries, each must have 'id' and a text field
@@ -81,8 +102,17 @@ class EmbeddingService:
         # Extract texts for embedding
         texts = [item[text_field] for item in data]
         
-        # Generate embeddings
-        embeddings = self.embed_texts(texts)
+        # Only embed texts that were never embedded with this model, each once
+        known = self.store.get_many(texts, self.model) if self.store else {}
+        new_texts = [text for text in dict.fromkeys(texts) if text not in known]
+        if new_texts:
+            new_embeddings = dict(zip(new_texts, self.embed_texts(new_texts)))
+            if self.store:
+                self.store.put_many(new_embeddings, self.model)
+            known.update(new_embeddings)
+        with self._usage_lock:
+            self.embeddings_reused += len(texts) - len(new_texts)
+        embeddings = [known[text] for text in texts]
         
         # Prepare vectors for Pinecone
         vectors = []
@@ -0,0 +1,117 @@
+import time
+import sqlite3
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List
+from app.core.config import get_settings
+from app.services.blob_service import blob_hash
+
+settings = get_settings()
+
+FLOAT32 = "float32"
+INT8 = "int8"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    dtype TEXT NOT NULL,
+    scale REAL NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def encode_vector(values: List[float], dtype: str) -> tuple[float, bytes]:
+    """
+    Pack an embedding as float32, or as int8 with one scale per vector.
+
+    Returns:
+        Tuple of (scale, bytes); the scale is 1.0 for float32
+    """
+    if dtype == INT8:
+        scale = max((abs(value) for value in values), default=0.0) / 127 or 1.0
+        return scale, array("b", (round(value / scale) for value in values)).tobytes()
+    return 1.0, array("f", values).tobytes()
+
+
+def decode_vector(data: bytes, dtype: str, scale: float) -> List[float]:
+    packed = array("b" if dtype == INT8 else "f")
+    packed.frombytes(data)
+    if dtype == INT8:
+        return [value * scale for value in packed]
+    return packed.tolist()
+
+
+class EmbeddingStore:
+    """
+    Local store of embedding vectors keyed by the SHA-256 of the model and the
+    embedded text, shared by every namespace and training worker process.
+
+    Vectors are stored as float32 (4 bytes per dimension) or, with
+    EMBEDDING_STORE_DTYPE="int8", quantized to 1 byte per dimension with a
+    per-vector scale. All methods are blocking, like the embedding API calls
+    they replace.
+    """
+
+    def __init__(self, path: str = settings.EMBEDDING_STORE_PATH, dtype: str = settings.EMBEDDING_STORE_DTYPE):
+        if dtype not in (FLOAT32, INT8):
+            raise ValueError(f"Unsupported embedding store dtype: {dtype}")
+        self.path = path
+        self.dtype = dtype
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            if not self._initialized:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.executescript(SCHEMA)
+                self._initialized = True
+            yield connection
+        finally:
+            connection.close()
+
+    def key(self, text: str, model: str) -> str:
+        return blob_hash(f"{model}\0{text}")
+
+    def get_many(self, texts: Iterable[str], model: str) -> Dict[str, List[float]]:
+        """
+        Look up stored embeddings.
+
+        Returns:
+            Dictionary mapping texts to their embedding; texts never embedded with `model` are omitted
+        """
+        keys = {self.key(text, model): text for text in texts}
+        if not keys:
+            return {}
+        found: Dict[str, List[float]] = {}
+        with self._connect() as connection:
+            placeholders = ", ".join("?" for _ in keys)
+            rows = connection.execute(
+                f"SELECT key, dtype, scale, vector FROM embeddings WHERE key IN ({placeholders})",
+                list(keys)
+            )
+            for key, dtype, scale, vector in rows:
+                found[keys[key]] = decode_vector(vector, dtype, scale)
+        return found
+
+    def put_many(self, embeddings: Dict[str, List[float]], model: str):
+        """Store embeddings keyed by the text they were computed from."""
+        rows = []
+        now = time.time()
+        for text, values in embeddings.items():
+            scale, vector = encode_vector(values, self.dtype)
+            rows.append((self.key(text, model), self.dtype, scale, vector, now))
+        if not rows:
+            return
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, dtype, scale, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+
+# Create a singleton instance
+embedding_store = EmbeddingStore()
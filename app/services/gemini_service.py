@@ -1,7 +1,8 @@
 from google import genai
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, Iterator, List, Union
 from google.genai import types
 from pydantic import BaseModel
+from app.services.outbound_governor import outbound_governor
 from app.models.builder_steps import ReactResponse
 from app.lib.constants.model_config import SYSTEM_PROMPTS, DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE, DEFAULT_LLM_MODEL, DEFAULT_EMBEDDING_MODEL
 
@@ -39,7 +40,9 @@ class GeminiService:
         
     def generate_content(self, prompt: str, model: Optional[str] = None) -> Dict[Any, Any]:
         model = model or self.model_config.model
-        response = self.client.models.generate_content(
+        response = outbound_governor.call(
+            "gemini",
+            self.client.models.generate_content,
             model=model,
             contents=prompt,
             config=types.GenerateContentConfig(
@@ -55,7 +58,7 @@ class GeminiService:
             "raw_response": response
         }
     
-    def chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None) -> Dict[Any, Any]:
+    def chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None, timeout: Optional[float] = None) -> Dict[Any, Any]:
         model = model or self.model_config.model
         formatted_messages = []
         for msg in messages:
@@ -64,7 +67,9 @@ class GeminiService:
                 "role": msg.role or "user"
             })
         
-        response = self.client.models.generate_content(
+        response = outbound_governor.call(
+            "gemini",
+            self.client.models.generate_content,
             model=model,
             contents=formatted_messages,
             config=types.GenerateContentConfig(
@@ -73,6 +78,7 @@ class GeminiService:
                 temperature=self.model_config.temperature,
                 response_mime_type='application/json',
                 response_schema=ReactResponse,
+                http_options=types.HttpOptions(timeout=int(timeout * 1000)) if timeout else None,
             ),
         )
 
@@ -81,6 +87,43 @@ class GeminiService:
             "raw_response": response
         }
     
+    def stream_chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[Union[str, Dict[str, int]]]:
+        """
+        Stream a chat completion: text deltas, then a {"input_tokens", "output_tokens"}
+        dict from the usage metadata. Closing the generator stops generation.
+        """
+        model = model or self.model_config.model
+        formatted_messages = [
+            {"parts": [{"text": msg.content}], "role": msg.role or "user"}
+            for msg in messages
+        ]
+        stream = outbound_governor.stream(
+            "gemini",
+            self.client.models.generate_content_stream,
+            model=model,
+            contents=formatted_messages,
+            config=types.GenerateContentConfig(
+                system_instruction=SYSTEM_PROMPTS["react_generator"],
+                max_output_tokens=self.model_config.max_tokens,
+                temperature=self.model_config.temperature,
+                response_mime_type='application/json',
+                response_schema=ReactResponse,
+                http_options=types.HttpOptions(timeout=int(timeout * 1000)) if timeout else None,
+            ),
+        )
+        usage = None
+        try:
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+                usage = getattr(chunk, "usage_metadata", None) or usage
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        if usage is not None:
+            yield {"input_tokens": usage.prompt_token_count or 0, "output_tokens": usage.candidates_token_count or 0}
+    
     def list_models(self) -> list[str]:
         """List available models."""
         models = self.client.models.list()
@@ -1,15 +1,31 @@
-from typing import Optional, List, Any, Dict, TypedDict
+from typing import Optional, List, Any, Dict, Iterator, TypedDict
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import json
 import base64
 import json
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.services.openai_service import OpenAIService, ChatMessage
 from app.core.config import get_settings
 from app.lib.constants.model_config import SYSTEM_PROMPTS
 from app.utils.llm_parser import parse_llm_response_to_model_list
 from app.services.database_service import database_service
+from app.services.blob_service import blob_hash
+from app.services.outbound_governor import outbound_governor, http_response_info
+
+# Instructions sent with each batch of React components to analyze
+COMPONENT_ANALYSIS_INSTRUCTIONS = (
+    "Analyze these React components and provide detailed information about them in JSON format. "
+    "The response should be a valid JSON object with a 'components' array containing component details. "
+    "Each component should have: description, inputProps (array of objects with name, type, description, required), "
+    "useCases (array of strings), and codeExamples (array of strings)."
+)
+# Changes whenever the analysis prompts change, so cached analyses of older prompts are not reused
+COMPONENT_ANALYSIS_PROMPT_VERSION = blob_hash(
+    SYSTEM_PROMPTS["COMPONENT_SYSTEM_PROMPT"] + COMPONENT_ANALYSIS_INSTRUCTIONS
+)[:16]
 
 class FetchedComponent(BaseModel):
     file: str
@@ -50,6 +66,13 @@ class CSSDetails(BaseModel):
     file_path: str
     metadata: str
 
+class DesignTokenDigest(BaseModel):
+    """Compact, deduplicated summary of the design tokens defined across a repository's CSS files."""
+    custom_properties: Dict[str, List[str]] = Field(default_factory=dict)
+    utility_classes: List[str] = Field(default_factory=list)
+    breakpoints: List[str] = Field(default_factory=list)
+    animations: List[str] = Field(default_factory=list)
+
 class PackageMetadata(BaseModel):
     file_type: str
     file_path: str
@@ -83,6 +106,9 @@ class FetchComponentsService:
         self.repo_link = repo_link
         self.access_token = access_token
         self.openai_service = OpenAIService(api_key=get_settings().OPENAI_API_KEY)
+        # LLM tokens spent analyzing components with this service, batches may be analyzed from several threads
+        self.token_usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = threading.Lock()
         
         if not self.repo_link:
             raise ValueError("GitHub Repository link is required")
@@ -130,100 +156,109 @@ class FetchComponentsService:
     def _process_component_batch(self, batch: List[FetchedComponent]) -> List[Component]:
         """Process a batch of components using OpenAI LLM."""
         try:
-            result_components: list[Component] = []
-            # Combine all component files with their paths for this batch
-            combined_content = "\n\n".join([
-                f"File: {comp.path}\n{comp.fileContent}" 
-                for comp in batch
-            ])
-
-            # Prepare messages for the LLM with a more direct prompt
-            messages = [
-                ChatMessage(role="system", content=SYSTEM_PROMPTS["COMPONENT_SYSTEM_PROMPT"]),
-                ChatMessage(
-                    role="user", 
-                    content=(
-                        f"Analyze these React components and provide detailed information about them in JSON format. "
-                        f"The response should be a valid JSON object with a 'components' array containing component details. "
-                        f"Each component should have: description, inputProps (array of objects with name, type, description, required), "
-                        f"useCases (array of strings), and codeExamples (array of strings).\n\n{combined_content}"
-                    )
-                )
-            ]
-
-            # Call OpenAI without function calling
-            response = self.openai_service.chat_completion(
-                messages=messages
-            )
-
-            # Parse the response into Component objects using our utility function
-            parsed_components = parse_llm_response_to_model_list(
-                text=response.get("text", ""),
-                model_class=LLMComponent,
-                list_key="components"
-            )
+            analyses = self.analyze_components(batch)
 
             # Update components with original file information
-            min_length = min(len(parsed_components), len(batch))
+            min_length = min(len(analyses), len(batch))
+            return [self.build_component(batch[i], analyses[i]) for i in range(min_length)]
             
-            dependency_list = {}
-            for i in range(min_length):
+        except Exception as e:
+            print(f"Error in _process_component_batch: {str(e)}")
+            raise RuntimeError(f"Error during component batch processing: {str(e)}")
 
-                parsed_data = database_service.parse_component_code_sync(batch[i].fileContent)
-                if parsed_data and "dependencies" in parsed_data:
-                    dependency_list[batch[i].path] = parsed_data["dependencies"]
-                else: 
-                    dependency_list[batch[i].path] = []
+    @property
+    def analysis_model(self) -> str:
+        """Model used to analyze components, part of the analysis cache key."""
+        return self.openai_service.model_config.model
 
-                component_data = parsed_components[i].model_dump()
+    def analyze_components(self, batch: List[FetchedComponent]) -> List[LLMComponent]:
+        """Analyze a batch of components with one LLM call, returning analyses in batch order."""
+        # Combine all component files with their paths for this batch
+        combined_content = "\n\n".join([
+            f"File: {comp.path}\n{comp.fileContent}" 
+            for comp in batch
+        ])
 
-                component_data["name"] = batch[i].file
-                component_data["path"] = batch[i].path  
-                component_data["code"] = batch[i].fileContent
-                component_data["dependencies"] = dependency_list[batch[i].path]
-                
-                result_components.append(Component(**component_data))
+        # Prepare messages for the LLM with a more direct prompt
+        messages = [
+            ChatMessage(role="system", content=SYSTEM_PROMPTS["COMPONENT_SYSTEM_PROMPT"]),
+            ChatMessage(role="user", content=f"{COMPONENT_ANALYSIS_INSTRUCTIONS}\n\n{combined_content}")
+        ]
 
-            
-            return result_components
-            
-        except Exception as e:
-            print(f"Error in _process_component_batch: {str(e)}")
-            raise RuntimeError(f"Error during component batch processing: {str(e)}")
+        # Call OpenAI without function calling
+        response = self.openai_service.chat_completion(
+            messages=messages
+        )
+        usage = getattr(response.get("raw_response"), "usage", None)
+        if usage:
+            with self._usage_lock:
+                self.token_usage["prompt_tokens"] += usage.prompt_tokens or 0
+                self.token_usage["completion_tokens"] += usage.completion_tokens or 0
+
+        # Parse the response into LLMComponent objects using our utility function
+        return parse_llm_response_to_model_list(
+            text=response.get("text", ""),
+            model_class=LLMComponent,
+            list_key="components"
+        )
+
+    def build_component(self, component: FetchedComponent, analysis: LLMComponent) -> Component:
+        """Combine a fetched component with its LLM analysis and the dependencies parsed from its code."""
+        parsed_data = database_service.parse_component_code_sync(component.fileContent)
+        dependencies = parsed_data["dependencies"] if parsed_data and "dependencies" in parsed_data else []
+
+        component_data = analysis.model_dump()
+        component_data["name"] = component.file
+        component_data["path"] = component.path
+        component_data["code"] = component.fileContent
+        component_data["dependencies"] = dependencies
+        return Component(**component_data)
 
     def fetch_directory_contents(self, path: str = "") -> list[FetchedComponent]:
         """Recursively fetch contents of a directory."""
+        return list(self.iter_directory_contents(path))
+
+    def iter_directory_contents(self, path: str = "", concurrency: int = 1) -> Iterator[FetchedComponent]:
+        """
+        Recursively fetch contents of a directory, yielding files as they are downloaded.
+        
+        Files of a directory are downloaded `concurrency` at a time and yielded in
+        listing order, so the sequence is the same as fetch_directory_contents.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            yield from self._iter_directory(path, executor)
+
+    def _iter_directory(self, path: str, executor: ThreadPoolExecutor) -> Iterator[FetchedComponent]:
         try:
             # GitHub API endpoint for repository contents
             api_url = f"https://api.github.com/repos/{self.owner}/{self.repo}/contents/{path}"
-            response = requests.get(api_url, headers=self.headers)
+            response = outbound_governor.call("github", requests.get, api_url, headers=self.headers, response_info=http_response_info)
             response.raise_for_status()
-            
-            fetchedComponents = []
-            
-            for item in response.json():
-                if item['type'] == 'file':
-                    # Get file content
-                    content_response = requests.get(item['download_url'], headers=self.headers)
-                    content_response.raise_for_status()
-                    
-                    fetchedComponents.append(FetchedComponent(
-                        file=item['name'],
-                        fileContent=content_response.text,
-                        path=self._modify_path_with_internal(item['path'])
-                    ))
-                elif item['type'] == 'dir':
-                    # Recursively fetch contents of subdirectories
-                    subdir_contents = self.fetch_directory_contents(item['path'])
-                    fetchedComponents.extend(subdir_contents)
-            
-            return fetchedComponents
-            
+            items = response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching contents for path {path}:", str(e))
             raise
-        except Exception as e:
-            print(f"Caught Exception for path {path}:", str(e))
+
+        def download(item: Dict[str, Any]) -> FetchedComponent:
+            content_response = outbound_governor.call(
+                "github", requests.get, item['download_url'], headers=self.headers, response_info=http_response_info
+            )
+            content_response.raise_for_status()
+            return FetchedComponent(
+                file=item['name'],
+                fileContent=content_response.text,
+                path=self._modify_path_with_internal(item['path'])
+            )
+
+        try:
+            files = [item for item in items if item['type'] == 'file']
+            yield from executor.map(download, files)
+            for item in items:
+                if item['type'] == 'dir':
+                    # Recursively fetch contents of subdirectories
+                    yield from self._iter_directory(item['path'], executor)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching contents for path {path}:", str(e))
             raise
 
     def extract_components(self):
@@ -293,6 +328,42 @@ class FetchComponentsService:
             metadata=metadata.model_dump_json()
         )
 
+    def build_design_token_digest(self, css_files: List[FetchedComponent]) -> DesignTokenDigest:
+        """
+        Build a design token digest from all CSS files of the repository.
+        Reuses parse_css_file for classes, media queries and animations and
+        additionally captures custom property values, deduplicating everything
+        across files so the prompt carries each token only once.
+        """
+        custom_properties: Dict[str, List[str]] = {}
+        utility_classes: Dict[str, None] = {}
+        breakpoints: Dict[str, None] = {}
+        animations: Dict[str, None] = {}
+
+        for css_file in css_files:
+            details = self.parse_css_file(css_file.file, css_file.fileContent, css_file.path)
+            metadata = CSSMetadata.model_validate_json(details.metadata)
+
+            for css_class in metadata.classes:
+                utility_classes.setdefault(css_class.name)
+            for media_query in metadata.media_queries:
+                breakpoints.setdefault(media_query)
+            for animation in metadata.animations:
+                animations.setdefault(animation)
+
+            for match in re.finditer(r'--([a-zA-Z0-9_-]+)\s*:\s*([^;}]+)', css_file.fileContent):
+                values = custom_properties.setdefault(match.group(1), [])
+                value = ' '.join(match.group(2).split())
+                if value and value not in values:
+                    values.append(value)
+
+        return DesignTokenDigest(
+            custom_properties=custom_properties,
+            utility_classes=list(utility_classes),
+            breakpoints=list(breakpoints),
+            animations=list(animations),
+        )
+
     def parse_package_json(self, file_name: str, file_content: str, file_path: str) -> PackageDetails:
         """
         Parse package.json content to extract meaningful information for Pinecone.
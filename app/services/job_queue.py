@@ -0,0 +1,339 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from cryptography.fernet import Fernet, InvalidToken
+from pydantic import BaseModel
+from app.core.config import get_settings
+
+settings = get_settings()
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    github_url TEXT NOT NULL,
+    access_token TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    checkpoint TEXT,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    not_before REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_repo
+    ON jobs (user_id, github_url) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, finished_at);
+"""
+
+
+def load_token_key(path: str = settings.TRAINING_TOKEN_KEY_PATH) -> bytes:
+    """The configured token key, or the host's generated key file, created on first use."""
+    if settings.TRAINING_TOKEN_KEY:
+        return settings.TRAINING_TOKEN_KEY.encode("ascii")
+    try:
+        with open(path, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    key = Fernet.generate_key()
+    try:
+        # O_EXCL so concurrent processes agree on the first key written
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "rb") as f:
+            return f.read().strip()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class TrainingJob(BaseModel):
+    id: str
+    user_id: str
+    github_url: str
+    access_token: Optional[str] = None
+    status: str
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    checkpoint: Dict[str, Any] = {}
+    progress: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    heartbeat_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "TrainingJob":
+        """Build a job from its row. The stored access token is encrypted and left out."""
+        data = dict(row)
+        data["access_token"] = None
+        data["checkpoint"] = json.loads(data["checkpoint"]) if data["checkpoint"] else {}
+        data["progress"] = json.loads(data["progress"]) if data.get("progress") else {}
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        return cls(**data)
+
+
+class TrainingJobQueue:
+    """
+    Durable queue of repository training jobs, stored in a local SQLite database
+    shared by the API process and the training worker processes.
+
+    - At most one queued or running job exists per (user_id, github_url);
+      enqueueing a duplicate returns the active job.
+    - Workers claim the oldest queued job of a user that has fewer than
+      `max_jobs_per_user` running jobs.
+    - Running jobs whose worker stopped heartbeating count as a failed attempt:
+      they are requeued with the same backoff and resume from their last
+      checkpoint, or fail for good once they used max_attempts.
+    - A new job for a repository whose last job failed can resume from that
+      job's checkpoint instead of starting over.
+    - Failed attempts are retried after an exponential backoff.
+    - GitHub access tokens are stored encrypted and only decrypted for the
+      worker that claims the job; they are erased once the job finishes.
+
+    All methods are blocking; the async wrappers run them in a thread.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.TRAINING_QUEUE_PATH,
+        max_jobs_per_user: int = settings.TRAINING_MAX_JOBS_PER_USER,
+        max_attempts: int = settings.TRAINING_MAX_ATTEMPTS,
+        stale_seconds: float = settings.TRAINING_JOB_STALE_SECONDS,
+        retry_backoff: float = settings.TRAINING_RETRY_BACKOFF,
+        token_key: Optional[bytes] = None,
+    ):
+        self.path = path
+        self.max_jobs_per_user = max_jobs_per_user
+        self.max_attempts = max_attempts
+        self.stale_seconds = stale_seconds
+        self.retry_backoff = retry_backoff
+        self._token_key = token_key
+        self._fernet: Optional[Fernet] = None
+        self._initialized = False
+
+    @property
+    def fernet(self) -> Fernet:
+        if self._fernet is None:
+            self._fernet = Fernet(self._token_key or load_token_key())
+        return self._fernet
+
+    def _encrypt_token(self, access_token: Optional[str]) -> Optional[str]:
+        return self.fernet.encrypt(access_token.encode("utf-8")).decode("ascii") if access_token else None
+
+    def _decrypt_token(self, stored: Optional[str]) -> Optional[str]:
+        if not stored:
+            return None
+        try:
+            return self.fernet.decrypt(stored.encode("ascii")).decode("utf-8")
+        except InvalidToken:
+            print("Could not decrypt a training job's access token, was TRAINING_TOKEN_KEY changed?")
+            return None
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds before a job that failed `attempts` times is retried."""
+        return min(settings.TRAINING_RETRY_BACKOFF_MAX, self.retry_backoff * 2 ** max(0, attempts - 1))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open an autocommit connection, creating the schema on first use in this process."""
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.executescript(SCHEMA)
+                self._initialized = True
+            yield connection
+        finally:
+            connection.close()
+
+    def enqueue(
+        self,
+        user_id: str,
+        github_url: str,
+        access_token: Optional[str] = None,
+        resume: bool = False
+    ) -> Tuple[TrainingJob, bool]:
+        """
+        Queue a training job, unless the same repository is already queued or running for the user.
+
+        Args:
+            resume: Start from the checkpoint and progress of the user's last failed job for the repository
+
+        Returns:
+            Tuple of (job, created) where created is False for a deduplicated request
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as connection:
+            checkpoint = progress = None
+            if resume:
+                failed = connection.execute(
+                    "SELECT checkpoint, progress FROM jobs WHERE user_id = ? AND github_url = ? AND status = ? ORDER BY finished_at DESC LIMIT 1",
+                    (user_id, github_url, FAILED)
+                ).fetchone()
+                if failed and failed["checkpoint"]:
+                    checkpoint = failed["checkpoint"]
+                    # Keep the counters, elapsed time restarts with the new job
+                    progress = json.dumps({**json.loads(failed["progress"] or "{}"), "started_at": None})
+            try:
+                connection.execute(
+                    """
+                    INSERT INTO jobs (id, user_id, github_url, access_token, status, checkpoint, progress, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (job_id, user_id, github_url, self._encrypt_token(access_token), QUEUED, checkpoint, progress, time.time())
+                )
+                created = True
+            except sqlite3.IntegrityError:
+                row = connection.execute(
+                    "SELECT id FROM jobs WHERE user_id = ? AND github_url = ? AND status IN (?, ?)",
+                    (user_id, github_url, *ACTIVE_STATUSES)
+                ).fetchone()
+                job_id = row["id"]
+                created = False
+            return self._get(connection, job_id), created
+
+    def claim(self, worker_id: str) -> Optional[TrainingJob]:
+        """Mark the next runnable job as running on `worker_id` and return it."""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs abandoned by a worker that died or hung count as failed attempts
+                stale = connection.execute(
+                    "SELECT id, attempts FROM jobs WHERE status = ? AND heartbeat_at < ?",
+                    (RUNNING, now - self.stale_seconds)
+                ).fetchall()
+                for job in stale:
+                    self._record_failure(connection, job["id"], job["attempts"], "Worker stopped heartbeating", now)
+                row = connection.execute(
+                    """
+                    SELECT id, access_token FROM jobs AS job
+                    WHERE status = ?
+                      AND (not_before IS NULL OR not_before <= ?)
+                      AND (SELECT COUNT(*) FROM jobs AS running
+                           WHERE running.user_id = job.user_id AND running.status = ?) < ?
+                    ORDER BY created_at
+                    LIMIT 1
+                    """,
+                    (QUEUED, now, RUNNING, self.max_jobs_per_user)
+                ).fetchone()
+                if row is None:
+                    connection.execute("COMMIT")
+                    return None
+                connection.execute(
+                    """
+                    UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1,
+                        started_at = COALESCE(started_at, ?), heartbeat_at = ?
+                    WHERE id = ?
+                    """,
+                    (RUNNING, worker_id, now, now, row["id"])
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            job = self._get(connection, row["id"])
+            job.access_token = self._decrypt_token(row["access_token"])
+            return job
+
+    def heartbeat(self, job_id: str):
+        with self._connect() as connection:
+            connection.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def save_checkpoint(self, job_id: str, checkpoint: Dict[str, Any], progress: Optional[Dict[str, Any]] = None):
+        """Persist where a job got to, so a retried or requeued job resumes from here, and its progress counters."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET checkpoint = ?, progress = COALESCE(?, progress), heartbeat_at = ? WHERE id = ?",
+                (json.dumps(checkpoint), json.dumps(progress) if progress is not None else None, time.time(), job_id)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, access_token = NULL, finished_at = ? WHERE id = ?",
+                (COMPLETED, json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str) -> bool:
+        """
+        Record a failed attempt. The job is requeued, not to run before its retry
+        delay has passed, until it has used max_attempts. A job that failed for
+        good has its access token erased.
+
+        Returns:
+            True if the job was requeued, False if it failed permanently
+        """
+        with self._connect() as connection:
+            job = self._get(connection, job_id)
+            return self._record_failure(connection, job_id, job.attempts if job else self.max_attempts, error, time.time())
+
+    def _record_failure(self, connection: sqlite3.Connection, job_id: str, attempts: int, error: str, now: float) -> bool:
+        """Requeue a job after its retry delay, or fail it for good once it has used max_attempts."""
+        retry = attempts < self.max_attempts
+        if retry:
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, not_before = ? WHERE id = ?",
+                (QUEUED, error, now + self.retry_delay(attempts), job_id)
+            )
+        else:
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, access_token = NULL, finished_at = ? WHERE id = ?",
+                (FAILED, error, now, job_id)
+            )
+        return retry
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        with self._connect() as connection:
+            return self._get(connection, job_id)
+
+    def finished_since(self, since: float) -> List[TrainingJob]:
+        """Jobs that completed or failed for good after `since`, oldest first."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND finished_at > ? ORDER BY finished_at",
+                (COMPLETED, FAILED, since)
+            ).fetchall()
+            return [TrainingJob.from_row(row) for row in rows]
+
+    def _get(self, connection: sqlite3.Connection, job_id: str) -> Optional[TrainingJob]:
+        row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return TrainingJob.from_row(row) if row else None
+
+    async def enqueue_async(
+        self,
+        user_id: str,
+        github_url: str,
+        access_token: Optional[str] = None,
+        resume: bool = False
+    ) -> Tuple[TrainingJob, bool]:
+        return await asyncio.to_thread(self.enqueue, user_id, github_url, access_token, resume)
+
+    async def get_async(self, job_id: str) -> Optional[TrainingJob]:
+        return await asyncio.to_thread(self.get, job_id)
+
+
+# Create a singleton instance
+training_job_queue = TrainingJobQueue()
@@ -0,0 +1,563 @@
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+from pydantic import BaseModel
+from app.core.config import get_settings
+from app.services.outbound_governor import outbound_governor
+from app.lib.constants.model_config import SYSTEM_PROMPTS
+
+settings = get_settings()
+
+FASTEST = "fastest"
+CHEAPEST = "cheapest"
+PRIMARY_WITH_HEDGE = "primary_with_hedge"
+POLICIES = (FASTEST, CHEAPEST, PRIMARY_WITH_HEDGE)
+
+
+class LLMTarget(BaseModel):
+    """A provider and model the router can send chat completions to, with its price per million tokens."""
+    provider: str
+    model: str
+    input_cost: float = 0.0
+    output_cost: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TargetStats:
+    """Rolling latency and error rate of one target over its last `window` calls."""
+
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.ttfts: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.cost = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, latency: Optional[float] = None, cost: float = 0.0):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok and latency is not None:
+                self.latencies.append(latency)
+            self.cost += cost
+
+    def record_cost(self, cost: float):
+        with self._lock:
+            self.cost += cost
+
+    def record_ttft(self, ttft: float):
+        with self._lock:
+            self.ttfts.append(ttft)
+
+    def p50(self) -> Optional[float]:
+        return percentile(list(self.latencies), 0.5)
+
+    def p95(self) -> Optional[float]:
+        return percentile(list(self.latencies), 0.95)
+
+    def p90_ttft(self) -> Optional[float]:
+        return percentile(list(self.ttfts), 0.9)
+
+    def error_rate(self) -> float:
+        outcomes = list(self.outcomes)
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95, p90_ttft = self.p50(), self.p95(), self.p90_ttft()
+        return {
+            "calls": len(self.outcomes),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "p90_ttft_seconds": round(p90_ttft, 3) if p90_ttft is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "cost": round(self.cost, 6),
+        }
+
+
+def token_usage(raw_response: Any) -> tuple[int, int]:
+    """(input, output) tokens reported by an OpenAI-compatible or Gemini response."""
+    usage = getattr(raw_response, "usage", None)
+    if usage is not None:
+        return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+    usage = getattr(raw_response, "usage_metadata", None)
+    if usage is not None:
+        return getattr(usage, "prompt_token_count", 0) or 0, getattr(usage, "candidates_token_count", 0) or 0
+    return 0, 0
+
+
+def response_cost(target: LLMTarget, response: Dict[str, Any]) -> float:
+    input_tokens, output_tokens = token_usage(response.get("raw_response"))
+    return (input_tokens * target.input_cost + output_tokens * target.output_cost) / 1_000_000
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, for streams cancelled before the provider reported usage."""
+    return len(text) // 4
+
+
+def message_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, BaseModel):
+        return content.model_dump_json()
+    return json.dumps(content, default=str)
+
+
+def with_system_prompt(messages: List[Any]) -> List[Any]:
+    """Messages with the generator's system prompt first, unless they bring their own,
+    so every provider and every hedge receives the same prompt."""
+    if any(message.role == "system" for message in messages):
+        return messages
+    from app.services.openai_service import ChatMessage
+    return [ChatMessage(role="system", content=SYSTEM_PROMPTS["react_generator"]), *messages]
+
+
+def gemini_messages(messages: List[Any]) -> List[Any]:
+    """Gemini only knows user and model turns."""
+    from app.services.gemini_service import ChatMessage
+    roles = {"assistant": "model", "system": "user"}
+    return [
+        ChatMessage(role=roles.get(message.role, message.role), content=message_text(message.content))
+        for message in messages
+    ]
+
+
+def default_service_factory(provider: str) -> Any:
+    """Create the chat service of a provider, or None when its API key is not configured."""
+    if provider == "openai" and settings.OPENAI_API_KEY:
+        from app.services.openai_service import OpenAIService
+        return OpenAIService(api_key=settings.OPENAI_API_KEY)
+    if provider == "deepseek" and settings.DEEPSEEK_API_KEY:
+        from app.services.deepseek_service import DeepSeekService
+        return DeepSeekService(api_key=settings.DEEPSEEK_API_KEY)
+    if provider == "gemini" and settings.GOOGLE_API_KEY:
+        from app.services.gemini_service import GeminiService
+        return GeminiService(api_key=settings.GOOGLE_API_KEY)
+    return None
+
+
+class StreamAttempt:
+    """
+    One streamed completion running in a worker thread. Chunks are handed to
+    the event loop as they arrive; `first_token` is set on the first text
+    delta and `task` resolves to the full text. abort() stops the worker at
+    its next chunk and closes the stream so the provider stops generating.
+    """
+
+    def __init__(self, target: LLMTarget, open_stream: Callable[[], Iterator[Any]]):
+        self.target = target
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.first_token = asyncio.Event()
+        self.parts: List[str] = []
+        self.usage: Optional[Dict[str, int]] = None
+        self._cancelled = threading.Event()
+        self.task = asyncio.create_task(self._consume(open_stream))
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def _produce(self, open_stream: Callable[[], Iterator[Any]], loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        try:
+            stream = open_stream()
+            try:
+                for item in stream:
+                    if self._cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            finally:
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+            loop.call_soon_threadsafe(queue.put_nowait, _END)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, _StreamError(e))
+
+    async def _consume(self, open_stream: Callable[[], Iterator[Any]]) -> str:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        loop.run_in_executor(None, self._produce, open_stream, loop, queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    return self.text
+                if isinstance(item, _StreamError):
+                    raise item.error
+                if isinstance(item, dict):
+                    self.usage = item
+                    continue
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - self.started
+                    self.first_token.set()
+                self.parts.append(item)
+        finally:
+            self._cancelled.set()
+
+    def abort(self):
+        self._cancelled.set()
+        self.task.cancel()
+
+    def cost(self, messages: List[Any]) -> float:
+        """Cost from the reported usage, or estimated from the text sent and received so far."""
+        if self.usage:
+            input_tokens, output_tokens = self.usage["input_tokens"], self.usage["output_tokens"]
+        else:
+            input_tokens = sum(estimate_tokens(message_text(message.content)) for message in messages)
+            output_tokens = estimate_tokens(self.text)
+        return (input_tokens * self.target.input_cost + output_tokens * self.target.output_cost) / 1_000_000
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()
+
+
+class LLMRouter:
+    """
+    One chat_completion interface over OpenAI, DeepSeek and Gemini.
+
+    The router keeps rolling p50/p95 latency, error rate and cost per target
+    and orders targets by policy:
+
+    - "fastest": healthy targets by p50 latency, untried targets first;
+    - "cheapest": healthy targets by token price;
+    - "primary_with_hedge": healthy targets in configured order, and when the
+      primary has not answered within its p95 latency a hedge request is sent
+      to the next target; the first answer wins.
+
+    A target is unhealthy while its error rate exceeds LLM_ROUTER_MAX_ERROR_RATE
+    or its provider's circuit breaker is open; unhealthy targets are only tried
+    last. Failures and per-attempt timeouts fall back to the next target.
+    The timeout is also passed to the provider SDK, so an abandoned attempt
+    (a lost hedge race or a timed-out call) cannot outlive it; what such
+    attempts still cost when they finish is reported as hedge_overhead_cost.
+
+    With hedging enabled (per request or LLM_ROUTER_STREAM_HEDGING) completions
+    are streamed instead: when the primary's first token is later than its
+    rolling p90 time-to-first-token, a second stream is started on the next
+    target (or the same one when it is the only target); whichever streams
+    first is kept and the other is cancelled. The hedge rate and the cost spent
+    on cancelled streams are reported in stats().
+    """
+
+    def __init__(
+        self,
+        targets: Optional[List[LLMTarget]] = None,
+        policy: str = settings.LLM_ROUTER_POLICY,
+        timeout: float = settings.LLM_ROUTER_TIMEOUT,
+        hedge_min_delay: float = settings.LLM_ROUTER_HEDGE_MIN_DELAY,
+        stream_hedging: bool = settings.LLM_ROUTER_STREAM_HEDGING,
+        service_factory: Callable[[str], Any] = default_service_factory
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown LLM routing policy: {policy}")
+        self.targets = targets if targets is not None else [LLMTarget(**target) for target in settings.LLM_ROUTER_TARGETS]
+        self.policy = policy
+        self.timeout = timeout
+        self.hedge_min_delay = hedge_min_delay
+        self.stream_hedging = stream_hedging
+        self.service_factory = service_factory
+        self._services: Dict[str, Any] = {}
+        self.stats_by_target = {target.name: TargetStats(settings.LLM_ROUTER_WINDOW) for target in self.targets}
+        self.counters = {"requests": 0, "fallbacks": 0, "hedges": 0, "hedge_wins": 0, "failures": 0, "abandoned": 0, "hedge_overhead_cost": 0.0}
+        self._counters_lock = threading.Lock()
+        self.stream_counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "cost": 0.0, "hedge_overhead_cost": 0.0}
+
+    def _service(self, provider: str) -> Any:
+        if provider not in self._services:
+            self._services[provider] = self.service_factory(provider)
+        return self._services[provider]
+
+    def is_healthy(self, target: LLMTarget) -> bool:
+        if self.stats_by_target[target.name].error_rate() > settings.LLM_ROUTER_MAX_ERROR_RATE:
+            return False
+        return not outbound_governor.provider(target.provider).stats()["circuit_open"]
+
+    def candidates(self, policy: str) -> List[LLMTarget]:
+        """Targets with a configured provider, in the order `policy` tries them."""
+        available = [target for target in self.targets if self._service(target.provider) is not None]
+        healthy = [target for target in available if self.is_healthy(target)]
+        if policy == FASTEST:
+            healthy.sort(key=lambda target: self.stats_by_target[target.name].p50() or 0.0)
+        elif policy == CHEAPEST:
+            healthy.sort(key=lambda target: target.input_cost + target.output_cost)
+        return healthy + [target for target in available if target not in healthy]
+
+    def hedge_delay(self, target: LLMTarget) -> float:
+        p95 = self.stats_by_target[target.name].p95()
+        return max(self.hedge_min_delay, p95 or self.timeout)
+
+    def ttft_hedge_delay(self, target: LLMTarget) -> Optional[float]:
+        """Seconds to wait for the first token before hedging, None until enough TTFTs were seen."""
+        stats = self.stats_by_target[target.name]
+        if len(stats.ttfts) < settings.LLM_ROUTER_TTFT_MIN_SAMPLES:
+            return None
+        return max(settings.LLM_ROUTER_TTFT_HEDGE_MIN_DELAY, stats.p90_ttft())
+
+    def _call(self, target: LLMTarget, messages: List[Any]) -> Dict[str, Any]:
+        service = self._service(target.provider)
+        messages = with_system_prompt(messages)
+        if target.provider == "gemini":
+            messages = gemini_messages(messages)
+        return service.chat_completion(messages=messages, model=target.model, timeout=self.timeout)
+
+    def _record_abandoned(self, target: LLMTarget, response: Dict[str, Any]):
+        """Account for a completion that finished after the router stopped waiting for it."""
+        cost = response_cost(target, response)
+        self.stats_by_target[target.name].record_cost(cost)
+        with self._counters_lock:
+            self.counters["hedge_overhead_cost"] += cost
+
+    async def _attempt(self, target: LLMTarget, messages: List[Any]) -> Dict[str, Any]:
+        """Call one target with the per-attempt timeout, recording its latency, errors and cost."""
+        stats = self.stats_by_target[target.name]
+        start = time.perf_counter()
+        # The worker thread cannot be cancelled, so whichever side sees the
+        # other finish last records the cost of an abandoned completion
+        lock = threading.Lock()
+        state: Dict[str, Any] = {"response": None, "abandoned": False}
+
+        def call() -> Dict[str, Any]:
+            response = self._call(target, messages)
+            with lock:
+                state["response"] = response
+                abandoned = state["abandoned"]
+            if abandoned:
+                self._record_abandoned(target, response)
+            return response
+
+        def abandon():
+            with self._counters_lock:
+                self.counters["abandoned"] += 1
+            with lock:
+                state["abandoned"] = True
+                response = state["response"]
+            if response is not None:
+                self._record_abandoned(target, response)
+
+        try:
+            response = await asyncio.wait_for(asyncio.to_thread(call), self.timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race, says nothing about the target
+            abandon()
+            raise
+        except BaseException as e:
+            if isinstance(e, asyncio.TimeoutError):
+                abandon()
+            stats.record(False)
+            print(f"LLM target {target.name} failed: {type(e).__name__}: {str(e)}")
+            raise
+        latency = time.perf_counter() - start
+        cost = response_cost(target, response)
+        stats.record(True, latency, cost)
+        return {**response, "provider": target.provider, "model": target.model, "latency": latency, "cost": cost}
+
+    def _open_stream(self, target: LLMTarget, messages: List[Any]) -> Iterator[Any]:
+        service = self._service(target.provider)
+        messages = with_system_prompt(messages)
+        if target.provider == "gemini":
+            messages = gemini_messages(messages)
+        return service.stream_chat_completion(messages=messages, model=target.model, timeout=self.timeout)
+
+    async def _stream_completion(self, candidates: List[LLMTarget], messages: List[Any]) -> Dict[str, Any]:
+        """Stream from the primary, hedging on a late first token and falling back on failures."""
+        self.stream_counters["requests"] += 1
+        remaining = list(candidates)
+        primary = candidates[0]
+        attempts: List[StreamAttempt] = []
+        errors: List[str] = []
+        hedge: Optional[StreamAttempt] = None
+        winner: Optional[StreamAttempt] = None
+
+        def launch(target: LLMTarget) -> StreamAttempt:
+            attempt = StreamAttempt(target, lambda: self._open_stream(target, messages))
+            attempts.append(attempt)
+            return attempt
+
+        def fail(attempt: StreamAttempt, error: BaseException):
+            attempts.remove(attempt)
+            self.stats_by_target[attempt.target.name].record(False)
+            errors.append(f"{attempt.target.name}: {type(error).__name__}: {error}")
+            print(f"LLM target {attempt.target.name} failed: {type(error).__name__}: {str(error)}")
+
+        launch(remaining.pop(0))
+        try:
+            while winner is None:
+                if not attempts:
+                    if not remaining:
+                        break
+                    self.counters["fallbacks"] += 1
+                    launch(remaining.pop(0))
+                delay = self.ttft_hedge_delay(primary) if hedge is None and len(attempts) == 1 else None
+                first_tokens = [asyncio.create_task(attempt.first_token.wait()) for attempt in attempts]
+                timeout = self.timeout - (time.perf_counter() - min(attempt.started for attempt in attempts))
+                if delay is not None:
+                    timeout = min(timeout, delay - (time.perf_counter() - attempts[0].started))
+                done, _ = await asyncio.wait(
+                    first_tokens + [attempt.task for attempt in attempts],
+                    timeout=max(0.0, timeout),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for waiter in first_tokens:
+                    waiter.cancel()
+                winner = next((attempt for attempt in attempts if attempt.first_token.is_set()), None)
+                if winner is not None:
+                    break
+                for attempt in list(attempts):
+                    if attempt.task.done():
+                        fail(attempt, attempt.task.exception() or RuntimeError("empty completion"))
+                if done:
+                    continue
+                expired = [attempt for attempt in attempts if time.perf_counter() - attempt.started >= self.timeout]
+                for attempt in expired:
+                    attempt.abort()
+                    fail(attempt, TimeoutError(f"no token within {self.timeout}s"))
+                if not expired and hedge is None:
+                    # First token later than usual, race a second stream
+                    self.counters["hedges"] += 1
+                    self.stream_counters["hedges"] += 1
+                    hedge = launch(remaining.pop(0) if remaining else primary)
+        finally:
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.abort()
+                    if winner is not None:
+                        # Tokens paid for by the stream that lost the race
+                        self.stream_counters["hedge_overhead_cost"] += attempt.cost(messages)
+
+        if winner is None:
+            self.counters["failures"] += 1
+            raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+        if winner is hedge:
+            self.counters["hedge_wins"] += 1
+            self.stream_counters["hedge_wins"] += 1
+        target = winner.target
+        stats = self.stats_by_target[target.name]
+        stats.record_ttft(winner.ttft)
+        try:
+            text = await asyncio.wait_for(winner.task, max(0.0, self.timeout - (time.perf_counter() - winner.started)))
+        except BaseException as e:
+            winner.abort()
+            stats.record(False)
+            self.counters["failures"] += 1
+            raise RuntimeError(f"LLM stream from {target.name} failed: {type(e).__name__}: {e}") from e
+        latency = time.perf_counter() - winner.started
+        cost = winner.cost(messages)
+        stats.record(True, latency, cost)
+        self.stream_counters["cost"] += cost
+        return {
+            "text": text,
+            "raw_response": winner.usage,
+            "provider": target.provider,
+            "model": target.model,
+            "latency": latency,
+            "ttft": winner.ttft,
+            "cost": cost,
+            "hedged": hedge is not None,
+        }
+
+    async def chat_completion(self, messages: List[Any], policy: Optional[str] = None, hedge: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Complete a chat with the first target that answers, following the routing policy.
+
+        Args:
+            messages: Chat messages with role and content
+            policy: Routing policy for this request, defaults to the router's
+            hedge: Stream and hedge on a late first token, defaults to LLM_ROUTER_STREAM_HEDGING
+
+        Returns:
+            Dictionary with text, raw_response, and the provider, model, latency and cost that answered
+
+        Raises:
+            RuntimeError: if every target failed
+        """
+        policy = policy or self.policy
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown LLM routing policy: {policy}")
+        self.counters["requests"] += 1
+        candidates = self.candidates(policy)
+        if not candidates:
+            raise RuntimeError("No LLM provider is configured")
+        if hedge if hedge is not None else self.stream_hedging:
+            return await self._stream_completion(candidates, messages)
+
+        remaining = list(candidates)
+        running: Dict[asyncio.Task, LLMTarget] = {}
+        errors: List[str] = []
+        hedged = False
+
+        def launch():
+            target = remaining.pop(0)
+            running[asyncio.create_task(self._attempt(target, messages))] = target
+
+        launch()
+        primary = candidates[0]
+        try:
+            while running:
+                can_hedge = policy == PRIMARY_WITH_HEDGE and not hedged and remaining and len(running) == 1
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay(primary) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is slower than usual, race it against the next target
+                    hedged = True
+                    self.counters["hedges"] += 1
+                    launch()
+                    continue
+                for task in done:
+                    target = running.pop(task)
+                    if task.exception() is None:
+                        if hedged and target is not primary:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    errors.append(f"{target.name}: {type(task.exception()).__name__}: {task.exception()}")
+                if not running and remaining:
+                    self.counters["fallbacks"] += 1
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        self.counters["failures"] += 1
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    def stats(self) -> Dict[str, Any]:
+        streamed = self.stream_counters
+        return {
+            "policy": self.policy,
+            **self.counters,
+            "hedge_overhead_cost": round(self.counters["hedge_overhead_cost"], 6),
+            "streaming": {
+                "requests": streamed["requests"],
+                "hedges": streamed["hedges"],
+                "hedge_wins": streamed["hedge_wins"],
+                "hedge_rate": round(streamed["hedges"] / streamed["requests"], 3) if streamed["requests"] else 0.0,
+                "cost": round(streamed["cost"], 6),
+                "hedge_overhead_cost": round(streamed["hedge_overhead_cost"], 6),
+                "cost_overhead": round(streamed["hedge_overhead_cost"] / streamed["cost"], 3) if streamed["cost"] else 0.0,
+            },
+            "targets": {name: stats.to_dict() for name, stats in self.stats_by_target.items()},
+        }
+
+
+# Create a singleton instance
+llm_router = LLMRouter()
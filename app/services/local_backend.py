@@ -0,0 +1,244 @@
+import re
+import json
+import copy
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+import httpx
+
+IMPORT_PATTERN = re.compile(r'''(?:import\s+(?:[\w*{}\s,]+\s+from\s+)?|require\(\s*)['"]([^'"]+)['"]''')
+
+
+def _get_field(document: Dict[str, Any], field: str) -> Any:
+    value: Any = document
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Evaluate the subset of MongoDB query operators used by this app."""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+            continue
+        value = _get_field(document, field)
+        if isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op == "$exists" and (value is not None) != bool(operand):
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$lte" and not (value is not None and value <= operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> Dict[str, Any]:
+    """Apply $set / $setOnInsert / $push / $inc updates to a document copy."""
+    document = copy.deepcopy(document)
+    if not any(key.startswith("$") for key in update):
+        update = {"$set": update}
+    for field, value in update.get("$set", {}).items():
+        document[field] = value
+    if inserting:
+        for field, value in update.get("$setOnInsert", {}).items():
+            document[field] = value
+    for field, value in update.get("$inc", {}).items():
+        document[field] = document.get(field, 0) + value
+    for field, value in update.get("$push", {}).items():
+        values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        document.setdefault(field, []).extend(values)
+    return document
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """Apply an inclusion or exclusion projection. `_id` is kept unless excluded."""
+    if not projection:
+        return document
+    include = [field for field, flag in projection.items() if flag and field != "_id"]
+    if include:
+        result = {field: document[field] for field in include if field in document}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    return {field: value for field, value in document.items() if projection.get(field, 1)}
+
+
+class LocalBackend:
+    """
+    In-memory stand-in for the Node.js data backend, implementing the REST
+    surface DatabaseService talks to. Meant for tests and local benchmarks:
+    plug it into an httpx client through LocalBackendTransport.
+    """
+
+    def __init__(self):
+        self.collections: Dict[str, List[Dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self.requests = 0
+
+    def _collection(self, name: str) -> List[Dict[str, Any]]:
+        return self.collections.setdefault(name, [])
+
+    def _new_id(self) -> str:
+        return f"{next(self._ids):024x}"
+
+    # Operations, shared by the REST routes and the /batch endpoint
+
+    def insert_one(self, collection: str, document: Dict[str, Any]) -> Dict[str, Any]:
+        document = copy.deepcopy(document)
+        document.setdefault("_id", self._new_id())
+        if any(existing["_id"] == document["_id"] for existing in self._collection(collection)):
+            raise ValueError(f"Duplicate key {document['_id']} in {collection}")
+        self._collection(collection).append(document)
+        return {"insertedId": document["_id"]}
+
+    def insert_many(self, collection: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Unordered insert: documents with a duplicate `_id` are skipped and not counted."""
+        ids = []
+        for document in documents:
+            try:
+                ids.append(self.insert_one(collection, document)["insertedId"])
+            except ValueError:
+                continue
+        return {"insertedCount": len(ids), "insertedIds": ids}
+
+    def find_one(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        for document in self._collection(collection):
+            if matches(document, query):
+                return project(copy.deepcopy(document), projection)
+        return None
+
+    def find(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        return [
+            project(copy.deepcopy(document), projection)
+            for document in self._collection(collection) if matches(document, query)
+        ]
+
+    def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> Dict[str, Any]:
+        documents = self._collection(collection)
+        for index, document in enumerate(documents):
+            if matches(document, query):
+                updated = apply_update(document, update)
+                documents[index] = updated
+                return {"matchedCount": 1, "modifiedCount": int(updated != document), "upsertedCount": 0}
+        if upsert:
+            seed = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            self.insert_one(collection, apply_update(seed, update, inserting=True))
+            return {"matchedCount": 0, "modifiedCount": 0, "upsertedCount": 1}
+        return {"matchedCount": 0, "modifiedCount": 0, "upsertedCount": 0}
+
+    def update_many(self, collection: str, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        totals = {"matchedCount": 0, "modifiedCount": 0, "upsertedCount": 0}
+        for operation in updates:
+            result = self.update_one(collection, operation["filter"], operation["update"], operation.get("upsert", False))
+            for key in totals:
+                totals[key] += result[key]
+        return totals
+
+    def delete_one(self, collection: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        documents = self._collection(collection)
+        for index, document in enumerate(documents):
+            if matches(document, query):
+                del documents[index]
+                return {"deletedCount": 1}
+        return {"deletedCount": 0}
+
+    def parse(self, code: str) -> Dict[str, Any]:
+        return {"dependencies": list(dict.fromkeys(IMPORT_PATTERN.findall(code)))}
+
+    def execute(self, operation: Dict[str, Any]) -> Any:
+        """Run one batch operation, as sent by DatabaseBatch."""
+        op = operation["op"]
+        collection = operation.get("collection", "")
+        if op == "insertOne":
+            return self.insert_one(collection, operation["document"])
+        if op == "insertMany":
+            return self.insert_many(collection, operation["documents"])
+        if op == "findOne":
+            return self.find_one(collection, operation["query"], operation.get("projection"))
+        if op == "find":
+            return self.find(collection, operation["query"], operation.get("projection"))
+        if op == "updateOne":
+            return self.update_one(collection, operation["query"], operation["update"])
+        if op == "updateMany":
+            return self.update_many(collection, operation["updates"])
+        if op == "deleteOne":
+            return self.delete_one(collection, operation["query"])
+        if op == "parse":
+            return self.parse(operation["code"])
+        raise ValueError(f"Unsupported batch operation: {op}")
+
+    # REST routing
+
+    def handle(self, method: str, path: str, body: Any, params: Dict[str, str]) -> Tuple[int, Any]:
+        self.requests += 1
+        parts = [part for part in path.split("/") if part]
+        if parts and parts[0] == "api":
+            parts = parts[1:]
+
+        if parts == ["health"]:
+            return 200, {"status": "ok"}
+        if parts == ["parse"] and method == "POST":
+            return 200, self.parse(body.get("code", ""))
+        if parts == ["batch"] and method == "POST":
+            results = []
+            for operation in body.get("operations", []):
+                try:
+                    results.append({"ok": True, "result": self.execute(operation)})
+                except Exception as e:
+                    results.append({"ok": False, "error": str(e)})
+            return 200, {"results": results}
+
+        if len(parts) == 1:
+            collection = parts[0]
+            if method == "POST":
+                try:
+                    return 200, self.insert_one(collection, body)
+                except ValueError as e:
+                    return 409, {"error": str(e)}
+            if method == "PATCH":
+                return 200, self.update_one(collection, body["query"], body["update"])
+            if method == "DELETE":
+                return 200, self.delete_one(collection, json.loads(params.get("query", "{}")))
+        if len(parts) == 2:
+            collection, action = parts
+            if action == "insertMany" and method == "POST":
+                return 200, self.insert_many(collection, body["documents"])
+            if action == "findOne" and method == "POST":
+                document = self.find_one(collection, body["query"], body.get("projection"))
+                return (200, document) if document is not None else (404, {"error": "Not found"})
+            if action == "find" and method == "POST":
+                return 200, self.find(collection, body["query"], body.get("projection"))
+            if action == "updateMany" and method == "PATCH":
+                return 200, self.update_many(collection, body["updates"])
+        return 404, {"error": f"No route for {method} {path}"}
+
+
+class LocalBackendTransport(httpx.AsyncBaseTransport):
+    """httpx transport serving requests from a LocalBackend instead of the network."""
+
+    def __init__(self, backend: Optional[LocalBackend] = None):
+        self.backend = backend or LocalBackend()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        content = await request.aread()
+        body = json.loads(content) if content else {}
+        params = {key: unquote(value) for key, value in request.url.params.items()}
+        status_code, payload = self.backend.handle(request.method, request.url.path, body, params)
+        return httpx.Response(status_code, json=payload, request=request)
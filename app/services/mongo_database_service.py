@@ -0,0 +1,323 @@
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Sequence
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.config import get_settings
+from app.services.database_service import DatabaseService, DatabaseWriteError, _BATCH_RESULTS, _upsert_operations
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Indexes backing the lookups DatabaseService performs on every request, with their options
+INDEXES = {
+    "components": [
+        ([("userId", ASCENDING), ("componentPath", ASCENDING)], {}),
+        # Key of component upserts, see COMPONENT_KEY_FIELDS
+        ([("userId", ASCENDING), ("githubUrl", ASCENDING), ("componentPath", ASCENDING)], {"unique": True}),
+    ],
+    "github": [([("userId", ASCENDING), ("githubUrl", ASCENDING)], {})],
+    "sessionDeltas": [([("sessionId", ASCENDING), ("seq", ASCENDING)], {})],
+}
+
+
+def to_object_id(value: Any) -> Any:
+    """Convert 24-character hex ids (as handed out by the REST backend) to ObjectId."""
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    if isinstance(value, list):
+        return [to_object_id(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_object_id(item) if key.startswith("$") else item for key, item in value.items()}
+    return value
+
+
+def prepare_query(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert `_id` conditions to ObjectId so string ids match stored documents."""
+    if "_id" not in query:
+        return query
+    return {**query, "_id": to_object_id(query["_id"])}
+
+
+def prepare_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a document for insertion, storing a client-minted string `_id` as ObjectId."""
+    document = dict(document)
+    if "_id" in document:
+        document["_id"] = to_object_id(document["_id"])
+    return document
+
+
+def serialize_document(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return ObjectId `_id`s as strings, like the REST backend's JSON responses."""
+    if document is not None and isinstance(document.get("_id"), ObjectId):
+        document["_id"] = str(document["_id"])
+    return document
+
+
+class MongoDatabaseService(DatabaseService):
+    """
+    DatabaseService talking to MongoDB directly through a pooled motor client,
+    instead of through the Node.js REST backend.
+
+    Only the storage primitives are overridden, so sessions, caching and blob
+    storage behave the same on both backends. Component code parsing is not a
+    database operation and is still served by the Node.js backend.
+    """
+
+    def __init__(self, mongo_client: Optional[AsyncIOMotorClient] = None, db_name: str = settings.MONGODB_DB_NAME):
+        super().__init__()
+        self._mongo_client = mongo_client
+        self.db_name = db_name
+        self._indexes_ready = False
+
+    @property
+    def mongo(self) -> AsyncIOMotorDatabase:
+        """The shared pooled database handle, created on first use if the app lifespan has not started it."""
+        if self._mongo_client is None:
+            self._mongo_client = AsyncIOMotorClient(
+                settings.MONGODB_URL,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            )
+        return self._mongo_client[self.db_name]
+
+    async def start(self, transport=None):
+        """Create the pooled clients for this worker and make sure the lookup indexes exist."""
+        await super().start(transport)
+        await self.ensure_indexes()
+
+    async def ensure_indexes(self):
+        """Create the indexes used by component, GitHub and session delta lookups.
+
+        Documents written before a unique index existed are deduplicated first.
+        Failing to create a unique index raises, since writes rely on it to stay
+        idempotent; other indexes only speed up reads and failures are logged.
+        """
+        if self._indexes_ready:
+            return
+        ready = True
+        for collection, indexes in INDEXES.items():
+            for keys, options in indexes:
+                try:
+                    if options.get("unique"):
+                        await self.remove_duplicates(collection, [field for field, _ in keys])
+                    await self.mongo[collection].create_index(keys, **options)
+                except Exception as e:
+                    if options.get("unique"):
+                        raise RuntimeError(f"Could not create unique index {keys} on {collection}: {str(e)}") from e
+                    logger.error(f"Error creating MongoDB index {keys} on {collection}: {str(e)}")
+                    ready = False
+        self._indexes_ready = ready
+
+    async def remove_duplicates(self, collection: str, fields: List[str]) -> int:
+        """Delete all but the most recently inserted document of each group sharing `fields`.
+
+        Returns:
+            Number of documents deleted
+        """
+        duplicates = self.mongo[collection].aggregate(
+            [
+                {"$group": {"_id": {field: f"${field}" for field in fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+            ],
+            allowDiskUse=True
+        )
+        obsolete = []
+        async for group in duplicates:
+            # ObjectIds grow with insertion time, keep the newest document
+            obsolete.extend(sorted(group["ids"])[:-1])
+        if not obsolete:
+            return 0
+        result = await self.mongo[collection].delete_many({"_id": {"$in": obsolete}})
+        logger.info(f"Removed {result.deleted_count} duplicate documents from {collection} before indexing {fields}")
+        return result.deleted_count
+
+    async def connect(self):
+        """Test the MongoDB connection."""
+        try:
+            await self.mongo.command("ping")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to MongoDB: {e}")
+            return False
+
+    async def close(self):
+        """Close the MongoDB and HTTP clients."""
+        if self._mongo_client is not None:
+            self._mongo_client.close()
+            self._mongo_client = None
+        await super().close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "mongodb",
+            "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+            "parse": super().pool_stats(),
+        }
+
+    async def insert_one(self, collection: str, document: Dict[str, Any]) -> str:
+        """Insert a single document into the specified collection."""
+        try:
+            result = await self.mongo[collection].insert_one(prepare_document(document))
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"Error inserting document into {collection}: {str(e)}")
+            return ""
+
+    async def insert_many(self, collection: str, documents: List[Dict[str, Any]]) -> int:
+        """Insert multiple documents into the specified collection.
+        Returns the number of documents inserted, which excludes duplicate keys."""
+        if not documents:
+            return 0
+        try:
+            return await self._insert_many(collection, documents)
+        except Exception as e:
+            logger.error(f"Error inserting multiple documents into {collection}: {str(e)}")
+            return 0
+
+    async def _insert_many(self, collection: str, documents: List[Dict[str, Any]]) -> int:
+        """Unordered insert, the documents that did not collide are inserted even when others did."""
+        try:
+            result = await self.mongo[collection].insert_many([prepare_document(document) for document in documents], ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            return e.details.get("nInserted", 0)
+
+    async def find_one(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """Find a single document in the specified collection."""
+        try:
+            document = await self.mongo[collection].find_one(prepare_query(query), projection)
+            return serialize_document(document)
+        except Exception as e:
+            logger.error(f"Error finding document in {collection}: {str(e)}")
+            return None
+
+    async def find_many(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Find multiple documents in the specified collection."""
+        try:
+            cursor = self.mongo[collection].find(prepare_query(query), projection)
+            return [serialize_document(document) async for document in cursor]
+        except Exception as e:
+            logger.error(f"Error finding documents in {collection}: {str(e)}")
+            return []
+
+    async def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any]) -> bool:
+        """Update a single document in the specified collection."""
+        try:
+            result = await self.mongo[collection].update_one(prepare_query(query), update)
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating document in {collection}: {str(e)}")
+            return False
+
+    async def update_many(self, collection: str, updates: List[Dict[str, Any]]) -> int:
+        """Update multiple documents with a single unordered bulk_write.
+
+        Args:
+            collection: The collection to update
+            updates: List of update operations, each containing 'filter' and 'update' keys
+
+        Returns:
+            Number of documents modified
+        """
+        if not updates:
+            return 0
+        try:
+            result = await self.mongo[collection].bulk_write(
+                [
+                    UpdateOne(prepare_query(update["filter"]), update["update"], upsert=update.get("upsert", False))
+                    for update in updates
+                ],
+                ordered=False
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error updating multiple documents in {collection}: {str(e)}")
+            return 0
+
+    async def bulk_upsert(self, collection: str, documents: List[Dict[str, Any]], keys: Sequence[str]) -> int:
+        """Insert or update documents identified by their `keys` fields with a single unordered bulk_write.
+
+        Returns:
+            Number of documents inserted or modified
+
+        Raises:
+            DatabaseWriteError: if the bulk write failed
+        """
+        if not documents:
+            return 0
+        try:
+            result = await self.mongo[collection].bulk_write(
+                [
+                    UpdateOne(prepare_query(operation["filter"]), operation["update"], upsert=True)
+                    for operation in _upsert_operations(documents, keys)
+                ],
+                ordered=False
+            )
+            return result.modified_count + result.upserted_count
+        except Exception as e:
+            raise DatabaseWriteError(f"Error upserting documents into {collection}: {str(e)}") from e
+
+    async def delete_one(self, collection: str, query: Dict[str, Any]) -> bool:
+        """Delete a single document from the specified collection."""
+        try:
+            result = await self.mongo[collection].delete_one(prepare_query(query))
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"Error deleting document from {collection}: {str(e)}")
+            return False
+
+    async def _send_batch(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run database operations concurrently on the motor pool, and send parse
+        operations to the Node.js backend as one batch."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        parse_indexes = [i for i, operation in enumerate(operations) if operation["op"] == "parse"]
+
+        async def parse_all():
+            if parse_indexes:
+                parsed = await super(MongoDatabaseService, self)._send_batch([operations[i] for i in parse_indexes])
+                for i, result in zip(parse_indexes, parsed):
+                    results[i] = result
+
+        async def run(i: int, operation: Dict[str, Any]):
+            try:
+                results[i] = {"ok": True, "result": await self._execute(operation)}
+            except Exception as e:
+                results[i] = {"ok": False, "error": str(e)}
+
+        await asyncio.gather(
+            parse_all(),
+            *(run(i, operation) for i, operation in enumerate(operations) if operation["op"] != "parse")
+        )
+        return results
+
+    async def _execute(self, operation: Dict[str, Any]) -> Any:
+        """Run one batch operation with motor, returning the REST backend's raw result shape."""
+        op = operation["op"]
+        if op not in _BATCH_RESULTS:
+            raise ValueError(f"Unsupported batch operation: {op}")
+        collection = self.mongo[operation["collection"]]
+        if op == "insertOne":
+            result = await collection.insert_one(prepare_document(operation["document"]))
+            return {"insertedId": str(result.inserted_id)}
+        if op == "insertMany":
+            return {"insertedCount": await self._insert_many(operation["collection"], operation["documents"])}
+        if op == "findOne":
+            return serialize_document(await collection.find_one(prepare_query(operation["query"]), operation.get("projection")))
+        if op == "find":
+            cursor = collection.find(prepare_query(operation["query"]), operation.get("projection"))
+            return [serialize_document(document) async for document in cursor]
+        if op == "updateOne":
+            result = await collection.update_one(prepare_query(operation["query"]), operation["update"])
+            return {"modifiedCount": result.modified_count}
+        if op == "updateMany":
+            result = await collection.bulk_write(
+                [UpdateOne(prepare_query(update["filter"]), update["update"], upsert=update.get("upsert", False)) for update in operation["updates"]],
+                ordered=False
+            )
+            return {"modifiedCount": result.modified_count}
+        result = await collection.delete_one(prepare_query(operation["query"]))
+        return {"deletedCount": result.deleted_count}
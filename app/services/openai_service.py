@@ -1,9 +1,31 @@
 from openai import OpenAI
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, Iterator, List, Union
 from pydantic import BaseModel
 from app.models.builder_steps import ReactResponse
 from app.lib.constants.model_config import SYSTEM_PROMPTS, DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE, DEFAULT_LLM_MODEL
 from langchain_openai import ChatOpenAI
+from app.services.outbound_governor import outbound_governor, http_response_info
+
+def iter_chat_stream(stream: Any) -> Iterator[Union[str, Dict[str, int]]]:
+    """
+    Text deltas of an OpenAI-compatible chat completion stream, followed by a
+    {"input_tokens", "output_tokens"} dict when the provider reports usage.
+    Closing the generator closes the stream, which stops generation.
+    """
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if getattr(chunk, "usage", None):
+                yield {"input_tokens": chunk.usage.prompt_tokens or 0, "output_tokens": chunk.usage.completion_tokens or 0}
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+def chat_messages(messages: List[Any]) -> List[Dict[str, Any]]:
+    """OpenAI-compatible messages, shared by the streamed and non-streamed completions."""
+    return [{"role": msg.role, "content": msg.content} for msg in messages]
 
 class ChatMessage(BaseModel):
     role: str
@@ -29,8 +51,10 @@ class OpenAIService:
         if not self.api_key:
             raise ValueError("OPENAI API key is required")
             
+        # Retries are left to the outbound governor, which also paces and limits calls
         self.client = OpenAI(
-            api_key=self.api_key
+            api_key=self.api_key,
+            max_retries=0
         )
         
         self.model_config = ModelConfig(
@@ -46,37 +70,29 @@ class OpenAIService:
         if system_prompt:
             messages.insert(0, {"role": "system", "content": system_prompt})
         
-        response = self.client.chat.completions.create(
+        raw_response = outbound_governor.call(
+            "openai",
+            self.client.chat.completions.with_raw_response.create,
             model=model,
             messages=messages,
             max_tokens=self.model_config.max_tokens,
             temperature=self.model_config.temperature,
             response_format={"type": "json_object"},
-            stream=False
+            stream=False,
+            response_info=http_response_info
         )
+        response = raw_response.parse()
         
         return {
             "text": response.choices[0].message.content,
             "raw_response": response
         }
     
-    def chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None, response_format: Optional[Dict[str, str]] = None, tools: Optional[List[Dict]] = None, tool_choice: Optional[Dict] = None) -> Dict[Any, Any]:
+    def chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None, response_format: Optional[Dict[str, str]] = None, tools: Optional[List[Dict]] = None, tool_choice: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict[Any, Any]:
         model = model or self.model_config.model
-        formatted_messages = [
-            {"role": msg.role, "content": msg.content}
-            for msg in messages
-        ]
-        
-        # Add system message if not present
-        # if not any(msg.role == "system" for msg in messages):
-        #     formatted_messages.insert(0, {
-        #         "role": "system",
-        #         "content": SYSTEM_PROMPTS["XML_SYSTEM_PROMPT"]
-        #     })
-        
         completion_args = {
             "model": model,
-            "messages": formatted_messages,
+            "messages": chat_messages(messages),
             "max_tokens": self.model_config.max_tokens,
             "temperature": self.model_config.temperature,
         }
@@ -90,13 +106,38 @@ class OpenAIService:
         if tool_choice:
             completion_args["tool_choice"] = tool_choice
 
-        response = self.client.chat.completions.create(**completion_args)
+        if timeout:
+            completion_args["timeout"] = timeout
+
+        raw_response = outbound_governor.call(
+            "openai",
+            self.client.chat.completions.with_raw_response.create,
+            response_info=http_response_info,
+            **completion_args
+        )
+        response = raw_response.parse()
 
         return {
             "text": response.choices[0].message.content,
             "raw_response": response
         }
     
+    def stream_chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[Union[str, Dict[str, int]]]:
+        """Stream a chat completion, see iter_chat_stream for the items yielded."""
+        model = model or self.model_config.model
+        stream = outbound_governor.stream(
+            "openai",
+            self.client.chat.completions.create,
+            model=model,
+            messages=chat_messages(messages),
+            max_tokens=self.model_config.max_tokens,
+            temperature=self.model_config.temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            **({"timeout": timeout} if timeout else {})
+        )
+        return iter_chat_stream(stream)
+    
     async def lc_chat_completion(self, messages: list[ChatMessage], model: Optional[str] = None) -> Dict[Any, Any]:
         model = model or self.model_config.model
         formatted_messages = [
@@ -112,11 +153,11 @@ class OpenAIService:
             })
         
         # Initialize the LLM with structured output
-        llm = ChatOpenAI(model=model, temperature=self.model_config.temperature)
+        llm = ChatOpenAI(model=model, temperature=self.model_config.temperature, max_retries=0)
         structured_llm = llm.with_structured_output(ReactResponse)
 
         # Invoke the structured LLM
-        response = await structured_llm.ainvoke(formatted_messages)
+        response = await outbound_governor.call_async("openai", structured_llm.ainvoke, formatted_messages)
 
         return {
             "text": response.text,
@@ -0,0 +1,377 @@
+import re
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterator, Mapping, Optional
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Default limits of providers missing from OUTBOUND_PROVIDER_LIMITS
+DEFAULT_LIMITS = {"rate": 10.0, "burst": 10.0, "concurrency": 4, "max_concurrency": 16}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class ThrottledResponse(Exception):
+    """A response object that signalled throttling or a server error, retried like an exception."""
+
+    def __init__(self, status: int, headers: Mapping[str, str], result: Any):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.headers = headers
+        self.result = result
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status carried by a provider SDK or requests exception, if any."""
+    for attribute in ("status_code", "status", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def error_headers(error: BaseException) -> Mapping[str, str]:
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    return headers or {}
+
+
+def is_throttled(status: Optional[int]) -> bool:
+    return status == 429
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Throttling, server errors, timeouts and dropped connections are worth retrying."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = error_status(error)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or "Timeout" in name or "Connection" in name
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse rate limit reset durations: "20", "1.5", "6m0s", "250ms"."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def header(headers: Mapping[str, str], name: str) -> Optional[str]:
+    return headers.get(name) or headers.get(name.title())
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After or rate limit reset headers."""
+    delay = parse_duration(header(headers, "retry-after"))
+    if delay is not None:
+        return delay
+    delay = parse_duration(header(headers, "x-ratelimit-reset-requests"))
+    if delay is not None:
+        return delay
+    reset = header(headers, "x-ratelimit-reset")
+    if reset and reset.isdigit():
+        # GitHub sends the reset time as a Unix timestamp
+        return max(0.0, int(reset) - time.time())
+    return None
+
+
+class ProviderGovernor:
+    """
+    Admission control for calls to one provider, shared by every thread and
+    event loop of the process:
+
+    - a token bucket caps the request rate;
+    - an AIMD limit on concurrent calls grows by one per limit's worth of
+      successes and halves on a 429 or when rate limit headers report the
+      quota is nearly used, so callers settle at the highest sustainable rate;
+    - Retry-After and rate limit reset headers pause the provider for everyone;
+    - a circuit breaker fails fast after consecutive errors and lets a single
+      trial call through once the cooldown has passed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        concurrency: int,
+        max_concurrency: int,
+        failure_threshold: int = settings.OUTBOUND_BREAKER_FAILURES,
+        cooldown: float = settings.OUTBOUND_BREAKER_COOLDOWN
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.limit = float(concurrency)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self.counters = {"calls": 0, "throttled": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    # Admission
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long to wait before the call may start."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def _try_enter(self) -> bool:
+        """Take a concurrency slot; raises CircuitOpenError while the breaker is open."""
+        with self._lock:
+            if self._opened_at is not None:
+                if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name} is unavailable, circuit breaker open")
+                # Half-open, let one trial call through
+                self._trial_running = True
+            if self._in_flight >= int(self.limit):
+                if self._trial_running and self._opened_at is not None:
+                    self._trial_running = False
+                return False
+            self._in_flight += 1
+            self.counters["calls"] += 1
+            return True
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        while not self._try_enter():
+            time.sleep(0.02)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        while not self._try_enter():
+            await asyncio.sleep(0.02)
+
+    # Feedback
+
+    def _decrease(self):
+        """Halve the concurrency limit, at most once per second so one burst of 429s counts once."""
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0:
+            self.limit = max(1.0, self.limit / 2)
+            self._last_decrease = now
+
+    def on_success(self, headers: Optional[Mapping[str, str]] = None):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+            remaining = header(headers or {}, "x-ratelimit-remaining-requests") or header(headers or {}, "x-ratelimit-remaining")
+            limit = header(headers or {}, "x-ratelimit-limit-requests") or header(headers or {}, "x-ratelimit-limit")
+            if remaining is not None and limit and remaining.isdigit() and limit.isdigit() and int(limit):
+                if int(remaining) == 0:
+                    self._paused_until = time.monotonic() + (retry_after(headers) or 1.0)
+                if int(remaining) < int(limit) * 0.1:
+                    self._decrease()
+                    return
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+    def on_error(self, error: BaseException):
+        with self._lock:
+            self._trial_running = False
+            status = error_status(error)
+            if is_throttled(status):
+                # Throttling means we are too fast, not that the provider is down
+                self.counters["throttled"] += 1
+                self._decrease()
+                delay = retry_after(error_headers(error))
+                if delay:
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                return
+            if not is_retryable(error):
+                # Client errors say nothing about the provider's health
+                return
+            self.counters["failures"] += 1
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    # Calls
+
+    def _check(self, result: Any, response_info: Optional[Callable[[Any], tuple]]) -> Mapping[str, str]:
+        """Raise ThrottledResponse for retryable responses, returning the response headers."""
+        if response_info is None:
+            return {}
+        status, headers = response_info(result)
+        if status == 403 and header(headers or {}, "x-ratelimit-remaining") == "0":
+            # GitHub reports an exhausted rate limit as 403
+            status = 429
+        if status is not None and (status in (408, 429) or status >= 500):
+            raise ThrottledResponse(status, headers, result)
+        return headers or {}
+
+    def _wait(self, retry_state) -> float:
+        """Jittered exponential backoff, but never shorter than the provider's Retry-After."""
+        self.counters["retries"] += 1
+        backoff = wait_random_exponential(multiplier=0.5, max=settings.OUTBOUND_BACKOFF_MAX)(retry_state)
+        error = retry_state.outcome.exception()
+        return max(backoff, retry_after(error_headers(error)) or 0.0)
+
+    def _retry_options(self) -> Dict[str, Any]:
+        return {
+            "retry": retry_if_exception(is_retryable),
+            "wait": self._wait,
+            "stop": stop_after_attempt(settings.OUTBOUND_MAX_ATTEMPTS),
+            "reraise": True,
+        }
+
+    def call(self, fn: Callable[..., Any], *args, response_info: Optional[Callable[[Any], tuple]] = None, **kwargs) -> Any:
+        """
+        Call a blocking provider function under this provider's limits, with retries.
+
+        Args:
+            fn: Function performing one provider request
+            response_info: Optional function returning (status, headers) of fn's result,
+                for clients that return error responses instead of raising
+
+        Raises:
+            CircuitOpenError: if the provider's circuit breaker is open
+        """
+        try:
+            for attempt in Retrying(**self._retry_options()):
+                with attempt:
+                    self.acquire()
+                    try:
+                        result = fn(*args, **kwargs)
+                        headers = self._check(result, response_info)
+                    except BaseException as e:
+                        self.on_error(e)
+                        raise
+                    finally:
+                        self._exit()
+                    self.on_success(headers)
+                    return result
+        except ThrottledResponse as e:
+            # Out of attempts, hand the last response to the caller as the client would have
+            return e.result
+
+    def stream(self, fn: Callable[..., Any], *args, **kwargs) -> Iterator[Any]:
+        """
+        Open a provider stream with retries and yield its items, holding a
+        concurrency slot until the stream is exhausted or closed, so long
+        generations count against the AIMD limit for as long as they run.
+        Closing the returned generator closes the provider stream.
+        """
+        stream = None
+        for attempt in Retrying(**self._retry_options()):
+            with attempt:
+                self.acquire()
+                try:
+                    stream = fn(*args, **kwargs)
+                except BaseException as e:
+                    self.on_error(e)
+                    self._exit()
+                    raise
+        try:
+            yield from stream
+            self.on_success()
+        except Exception as e:
+            self.on_error(e)
+            raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            self._exit()
+
+    async def call_async(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await a provider coroutine function under this provider's limits, with retries."""
+        async for attempt in AsyncRetrying(**self._retry_options()):
+            with attempt:
+                await self.acquire_async()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    self.on_error(e)
+                    raise
+                finally:
+                    self._exit()
+                self.on_success()
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self._in_flight,
+            "circuit_open": self._opened_at is not None,
+        }
+
+
+class OutboundGovernor:
+    """Per-provider governors for every outbound API call of this process."""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self.limits = limits if limits is not None else settings.OUTBOUND_PROVIDER_LIMITS
+        self._providers: Dict[str, ProviderGovernor] = {}
+        self._lock = threading.Lock()
+
+    def provider(self, name: str) -> ProviderGovernor:
+        with self._lock:
+            if name not in self._providers:
+                limits = {**DEFAULT_LIMITS, **self.limits.get(name, {})}
+                self._providers[name] = ProviderGovernor(
+                    name,
+                    rate=limits["rate"],
+                    burst=limits["burst"],
+                    concurrency=int(limits["concurrency"]),
+                    max_concurrency=int(limits["max_concurrency"])
+                )
+            return self._providers[name]
+
+    def call(self, provider: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return self.provider(provider).call(fn, *args, **kwargs)
+
+    async def call_async(self, provider: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        return await self.provider(provider).call_async(fn, *args, **kwargs)
+
+    def stream(self, provider: str, fn: Callable[..., Any], *args, **kwargs) -> Iterator[Any]:
+        return self.provider(provider).stream(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: provider.stats() for name, provider in self._providers.items()}
+
+
+def http_response_info(response: Any) -> tuple:
+    """(status, headers) of a requests response or an OpenAI raw response, for `response_info`."""
+    return getattr(response, "status_code", None), getattr(response, "headers", None) or {}
+
+
+# Create a singleton instance
+outbound_governor = OutboundGovernor()
@@ -1,13 +1,28 @@
 import os
 import asyncio
 import json
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Callable, Awaitable
 from pinecone import Pinecone
 from .ingestion_service import FetchComponentsService, ProcessedFile
 from .embedding_service import EmbeddingService
+from .embedding_store import embedding_store
+from .outbound_governor import outbound_governor
+from .training_progress import TrainingProgress, PER_COMPONENT_STAGES
+from app.core.config import get_settings
+from app.utils.pipeline import Pipeline
+from .blob_service import blob_hash
+from .analysis_cache import analysis_cache
 from app.lib.constants.model_config import DEFAULT_EMBEDDING_MODEL
 from .database_service import database_service, ComponentFile, CSSFile, PackageFile, DesignConfigFile
-from .database_service import Component, GithubRepo
+from .database_service import Component, GithubRepo, COMPONENT_KEY_FIELDS
+
+settings = get_settings()
+
+# React components analyzed per LLM call, and the unit of training checkpoints
+TRAINING_BATCH_SIZE = 10
+# Stages recorded per component in training checkpoints
+STORED = "stored"
+UPSERTED = "upserted"
 
 class PineconeService:
     def __init__(
@@ -26,7 +41,7 @@ class PineconeService:
         # Initialize embedding service if OpenAI API key is provided
         self.embedding_service = None
         if openai_api_key:
-            self.embedding_service = EmbeddingService(api_key=openai_api_key, model=embedding_model)
+            self.embedding_service = EmbeddingService(api_key=openai_api_key, model=embedding_model, store=embedding_store)
             # Get dimension from embedding model if not specified
             if dimension is None:
                 dimension = self.embedding_service.get_dimension()
@@ -52,7 +67,7 @@ class PineconeService:
             )
             self.index = self.pc.Index(self.index_name)
     
-    async def upsert_vectors(self, records: List[Dict[str, Any]], namespace: Optional[str] = None) -> Dict[str, Any]:
+    async def upsert_vectors(self, records: List[Dict[str, Any]], namespace: Optional[str] = None, progress: Optional[TrainingProgress] = None) -> Dict[str, Any]:
         """
         Upsert vectors to Pinecone.
         Only stores file paths in Pinecone - full component data is stored in MongoDB.
@@ -60,6 +75,7 @@ class PineconeService:
         Args:
             records: List of records containing component data
             namespace: Namespace to upsert vectors to
+            progress: Optional training progress to record embedding and upsert work on
             
         Returns:
             Result of upsert operation
@@ -76,8 +92,14 @@ class PineconeService:
                 }
                 pinecone_records.append(pinecone_record)
             
-            vectors = self.embedding_service.prepare_vectors_for_upsert(pinecone_records)
-            result = self.index.upsert(namespace=namespace or "", vectors=vectors)
+            progress = progress or TrainingProgress()
+            tokens_before = self.embedding_service.tokens_used
+            # Embedding and upsert calls block while rate limited or backing off, keep them off the event loop
+            with progress.track("embed", len(pinecone_records)):
+                vectors = await asyncio.to_thread(self.embedding_service.prepare_vectors_for_upsert, pinecone_records)
+            progress.add_tokens("embedding", self.embedding_service.tokens_used - tokens_before)
+            with progress.track("upsert", len(vectors)):
+                result = await asyncio.to_thread(outbound_governor.call, "pinecone", self.index.upsert, namespace=namespace or "", vectors=vectors)
             
         return result or {"upserted_count": 0}
     
@@ -109,94 +131,271 @@ class PineconeService:
         self, 
         github_url: str, 
         access_token: Optional[str] = None,
-        namespace: Optional[str] = None
+        namespace: Optional[str] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        on_checkpoint: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        progress: Optional[TrainingProgress] = None
     ) -> Dict[str, Any]:
+        """
+        Index a GitHub repository's components into MongoDB and Pinecone.
+        
+        Training is a pipeline of stages connected by bounded queues: files are
+        fetched, React components are grouped into batches and analyzed by the
+        LLM, written to MongoDB, embedded and upserted to Pinecone. Each stage
+        runs with its own concurrency from TRAINING_STAGE_CONCURRENCY, so the
+        network-bound stages overlap instead of waiting on each other.
+
+        The checkpoint records, per component path and content hash, whether the
+        component was analyzed and stored in MongoDB or also upserted to Pinecone.
+        A resumed run skips upserted components and only embeds stored ones, so
+        LLM analysis is never paid twice for an unchanged component.
+
+        Before batching, components are looked up in the analysis cache shared by
+        all users; only cache misses are batched for the LLM.
+        
+        Args:
+            github_url: Repository URL
+            access_token: Optional GitHub access token
+            namespace: Pinecone namespace, the user ID
+            checkpoint: Progress saved by a previous attempt; components already analyzed or upserted are skipped
+            on_checkpoint: Called with the updated checkpoint after each stage of every batch
+            progress: Optional per-stage counters, updated as training proceeds
+        """
+        checkpoint = dict(checkpoint or {})
+        progress = progress or TrainingProgress()
+        checkpoint_lock = asyncio.Lock()
+
+        # Per component path: content hash, last completed stage and, until upserted, the text to embed
+        component_checkpoints: Dict[str, Dict[str, Any]] = dict(checkpoint.get('components', {}))
+        # Checkpoints of earlier versions count whole batches by offset among the React components
+        completed_batches = set(checkpoint.get('completed_batches', []))
+        completed_batches.update(range(0, checkpoint.get('next_offset', 0), TRAINING_BATCH_SIZE))
+        content_hashes: Dict[str, str] = {}
+        # Analyses found in the shared analysis cache, by component path
+        cached_analyses: Dict[str, Any] = {}
+        counters = {
+            'total_processed': checkpoint.get('total_processed', 0),
+            'vectors_upserted': checkpoint.get('vectors_upserted', 0),
+            'analysis_cache_hits': checkpoint.get('analysis_cache_hits', 0),
+            'embeddings_reused': checkpoint.get('embeddings_reused', 0),
+        }
+
+        concurrency = settings.TRAINING_STAGE_CONCURRENCY
+        fetch_service = None
+        all_components: List[Any] = []
+        react_components: List[Any] = []
+        base_tokens = dict(progress.tokens)
+        embedding_tokens_start = self.embedding_service.tokens_used if self.embedding_service else 0
+        embeddings_reused_start = self.embedding_service.embeddings_reused if self.embedding_service else 0
+        base_embeddings_reused = counters['embeddings_reused']
+
+        def sync_usage():
+            # Services count usage across concurrent batches, progress and counters add it to previous attempts
+            progress.tokens["analysis_prompt"] = base_tokens["analysis_prompt"] + fetch_service.token_usage["prompt_tokens"]
+            progress.tokens["analysis_completion"] = base_tokens["analysis_completion"] + fetch_service.token_usage["completion_tokens"]
+            if self.embedding_service:
+                progress.tokens["embedding"] = base_tokens["embedding"] + self.embedding_service.tokens_used - embedding_tokens_start
+                counters['embeddings_reused'] = base_embeddings_reused + self.embedding_service.embeddings_reused - embeddings_reused_start
+
+        async def save_checkpoint(**updates):
+            async with checkpoint_lock:
+                sync_usage()
+                checkpoint.update(counters)
+                checkpoint.update(updates)
+                # Copy, other batches keep updating the component checkpoints while this one is saved
+                checkpoint['components'] = dict(component_checkpoints)
+                if on_checkpoint:
+                    await on_checkpoint(dict(checkpoint))
+
+        def completed_stage(component: Any, index: Optional[int] = None) -> Optional[str]:
+            """Last stage a previous attempt completed for this component, if its content is unchanged."""
+            if index is not None and index // TRAINING_BATCH_SIZE * TRAINING_BATCH_SIZE in completed_batches:
+                return UPSERTED
+            entry = component_checkpoints.get(component.path)
+            if entry and entry['hash'] == content_hashes[component.path]:
+                return entry['stage']
+            return None
+
+        async def fetch_batches():
+            """Fetch repository files, yielding React component batches that still need indexing."""
+            files = fetch_service.iter_directory_contents(concurrency=concurrency.get("fetch", 1))
+            # Components waiting for the analysis cache lookup
+            lookup: List[Any] = []
+            # Components to analyze with the LLM, and components with an analysis already
+            batch: List[Any] = []
+            ready: List[Any] = []
+
+            async def resolve(components: List[Any]):
+                """Split components into LLM batches and ready batches. Only cache misses need the LLM."""
+                nonlocal batch, ready
+                unanalyzed = [component for component in components if completed_stage(component) != STORED]
+                hits = await analysis_cache.get_many([component.fileContent for component in unanalyzed], fetch_service.analysis_model)
+                unanalyzed_paths = {component.path for component in unanalyzed}
+                for component in components:
+                    if component.path in unanalyzed_paths and component.fileContent in hits:
+                        cached_analyses[component.path] = hits[component.fileContent]
+                        counters['analysis_cache_hits'] += 1
+                    if component.path in unanalyzed_paths and component.fileContent not in hits:
+                        batch.append(component)
+                        if len(batch) == TRAINING_BATCH_SIZE:
+                            yield batch
+                            batch = []
+                    else:
+                        ready.append(component)
+                        if len(ready) == TRAINING_BATCH_SIZE:
+                            yield ready
+                            ready = []
+
+            # Every attempt fetches the whole repository again
+            progress.stages["fetch"]["count"] = 0
+            while True:
+                with progress.track("fetch"):
+                    component = await asyncio.to_thread(next, files, None)
+                if component is None:
+                    break
+                progress.stages["fetch"]["count"] += 1
+                all_components.append(component)
+                if not fetch_service.filter_components_by_type([component])['react_components']:
+                    continue
+                content_hashes[component.path] = blob_hash(component.fileContent)
+                react_components.append(component)
+                if completed_stage(component, len(react_components) - 1) == UPSERTED:
+                    continue
+                lookup.append(component)
+                if len(lookup) == TRAINING_BATCH_SIZE:
+                    async for full_batch in resolve(lookup):
+                        yield full_batch
+                    lookup = []
+            progress.set_total("fetch", len(all_components))
+            for stage in PER_COMPONENT_STAGES:
+                progress.set_total(stage, len(react_components))
+            async for full_batch in resolve(lookup):
+                yield full_batch
+            for remaining in (batch, ready):
+                if remaining:
+                    yield remaining
+
+            # Save non-React components directly to MongoDB without parsing
+            if not checkpoint.get('non_react_saved'):
+                filtered_components = fetch_service.filter_components_by_type(all_components)
+                await self._save_non_react_components_to_db(filtered_components, namespace, github_url, fetch_service)
+                await save_checkpoint(non_react_saved=True)
+
+        async def analyze(batch):
+            # Components stored by a previous attempt only need embedding again
+            stored_texts = {
+                component.path: component_checkpoints[component.path]['text']
+                for component in batch
+                if component_checkpoints.get(component.path, {}).get('stage') == STORED
+                and component_checkpoints[component.path]['hash'] == content_hashes[component.path]
+            }
+            cached = [component for component in batch if component.path not in stored_texts and component.path in cached_analyses]
+            pending = [component for component in batch if component.path not in stored_texts and component.path not in cached_analyses]
+
+            def analyze_batch():
+                # Analyze cache misses with one LLM call, in batch order
+                analyses = fetch_service.analyze_components(pending) if pending else []
+                analyzed = list(zip(pending, analyses)) + [(component, cached_analyses[component.path]) for component in cached]
+                parsed = [fetch_service.build_component(component, analysis) for component, analysis in analyzed]
+                return parsed, {component.fileContent: analysis for component, analysis in zip(pending, analyses)}
+
+            parsed_components = []
+            if pending or cached:
+                with progress.track("analyze", len(pending) + len(cached)):
+                    parsed_components, new_analyses = await asyncio.to_thread(analyze_batch)
+                    await analysis_cache.put_many(new_analyses, fetch_service.analysis_model)
+            return batch, parsed_components, stored_texts
+
+        async def store(item):
+            batch, parsed_components, stored_texts = item
+            if not namespace:
+                return batch, []
+            with progress.track("store", len(parsed_components)):
+                # Store component code once in the blob store, documents reference it by hash
+                code_hashes = await database_service.blobs.put_many([parsed.code for parsed in parsed_components])
+
+                # Full component documents, written in one idempotent upsert per batch
+                documents = []
+                for parsed, code_hash in zip(parsed_components, code_hashes):
+                    document = Component(
+                        userId=namespace,
+                        githubUrl=github_url,
+                        componentName=parsed.name,
+                        componentPath=parsed.path,
+                        indexingStatus=True,
+                        description=parsed.description,
+                        useCase=' '.join(parsed.useCases) if parsed.useCases else '',
+                        codeSamples=parsed.codeExamples,
+                        dependencies=parsed.dependencies if hasattr(parsed, 'dependencies') else [],
+                        importPath=parsed.importPath if hasattr(parsed, 'importPath') else ''
+                    ).model_dump()
+                    document['inputProps'] = json.dumps(parsed.inputProps) if hasattr(parsed, 'inputProps') else ''
+                    document['codeHash'] = code_hash
+                    documents.append(document)
+
+                if documents:
+                    await database_service.bulk_upsert('components', documents, COMPONENT_KEY_FIELDS)
+
+            # Text to embed for each component (minimal info for vector search)
+            texts = dict(stored_texts)
+            for parsed in parsed_components:
+                texts[parsed.path] = f"{parsed.name} {parsed.description} {' '.join(parsed.useCases)}"
+                if parsed.path in content_hashes:
+                    component_checkpoints[parsed.path] = {
+                        'hash': content_hashes[parsed.path],
+                        'stage': STORED,
+                        'text': texts[parsed.path]
+                    }
+            if parsed_components:
+                await save_checkpoint()
+
+            # Create Pinecone records, file path as ID
+            pinecone_records = [{'id': path, 'text': text, 'user_id': namespace} for path, text in texts.items()]
+            return batch, pinecone_records
+
+        async def embed(item):
+            batch, pinecone_records = item
+            vectors = []
+            if self.embedding_service and pinecone_records:
+                with progress.track("embed", len(pinecone_records)):
+                    vectors = await asyncio.to_thread(
+                        self.embedding_service.prepare_vectors_for_upsert,
+                        [{'id': record['id'], 'text': record['text']} for record in pinecone_records]
+                    )
+            return batch, pinecone_records, vectors
+
+        async def upsert(item):
+            batch, pinecone_records, vectors = item
+            # Upsert vectors to Pinecone
+            if vectors:
+                with progress.track("upsert", len(vectors)):
+                    await asyncio.to_thread(outbound_governor.call, "pinecone", self.index.upsert, namespace=namespace or "", vectors=vectors)
+            for record in pinecone_records:
+                if record['id'] in content_hashes:
+                    component_checkpoints[record['id']] = {'hash': content_hashes[record['id']], 'stage': UPSERTED}
+            counters['total_processed'] += len(batch)
+            counters['vectors_upserted'] += len(vectors)
+            await save_checkpoint()
+
         try:
             # Initialize the fetch service
             fetch_service = FetchComponentsService(github_url, access_token)
-            
-            # Extract all components first
-            all_components = fetch_service.extract_components()
-            
-            # Filter components by type
-            filtered_components = fetch_service.filter_components_by_type(all_components)
-            
-            # Save non-React components directly to MongoDB without parsing
-            await self._save_non_react_components_to_db(filtered_components, namespace, github_url)
-            
-            # Process React components in batches
-            react_components = filtered_components['react_components']
-            total_react_components = len(react_components)
-            total_processed = 0
-            BATCH_SIZE = 10
-            
-            total_vectors_upserted = 0
-            
-            # Process React components in batches
-            for i in range(0, total_react_components, BATCH_SIZE):
-                batch = react_components[i:i+BATCH_SIZE]
-                batch_size = len(batch)
-                
-                # Parse this batch of React components
-                parsed_components = fetch_service.parse_components(batch)
-                
-                # Create Pinecone records (minimal info for vector search)
-                pinecone_records = []
-                # Create list to store MongoDB updates
-                mongo_updates = []
-                
-                for parsed in parsed_components:
-                    # Prepare MongoDB update operation for this component
-                    filter_query = {
-                        'userId': namespace,
-                        'componentPath': parsed.path,
-                        'githubUrl': github_url
-                    }
-                    
-                    update_operation = {
-                        '$set': {
-                            'indexingStatus': True,
-                            'description': parsed.description,
-                            'useCase': ' '.join(parsed.useCases) if parsed.useCases else '',
-                            'codeSamples': parsed.codeExamples,
-                            'dependencies': parsed.dependencies if hasattr(parsed, 'dependencies') else [],
-                            'importPath': parsed.importPath if hasattr(parsed, 'importPath') else '',
-                            'inputProps': json.dumps(parsed.inputProps) if hasattr(parsed, 'inputProps') else '',
-                            'code': parsed.code if hasattr(parsed,'code') else ''
-                        }
-                    }
-                    
-                    # Add to batch updates
-                    mongo_updates.append({
-                        'filter': filter_query,
-                        'update': update_operation
-                    })
-                    
-                    # Create a minimal record for Pinecone
-                    pinecone_record = {
-                        'id': parsed.path,  # file path as ID
-                        'text': f"{parsed.name} {parsed.description} {' '.join(parsed.useCases)}",  # text for embedding
-                        'user_id': namespace
-                    }
-                    pinecone_records.append(pinecone_record)
-                
-                # Batch update MongoDB components
-                if namespace and mongo_updates:
-                    await database_service.update_many('components', mongo_updates)
-                
-                # Upsert vectors to Pinecone
-                if namespace and pinecone_records:
-                    await self.upsert_vectors(pinecone_records, namespace)
-                    total_vectors_upserted += len(pinecone_records)
-                
-                # Update total processed count
-                total_processed += batch_size
+
+            pipeline = Pipeline(queue_size=settings.TRAINING_PIPELINE_QUEUE_SIZE)
+            pipeline.stage("analyze", analyze, concurrency=concurrency.get("analyze", 1))
+            pipeline.stage("store", store, concurrency=concurrency.get("store", 1))
+            pipeline.stage("embed", embed, concurrency=concurrency.get("embed", 1))
+            pipeline.stage("upsert", upsert, concurrency=concurrency.get("upsert", 1))
+            await pipeline.run(fetch_batches())
+            sync_usage()
             
             # Return statistics about the operation
             return {
                 'total_components': len(all_components),
-                'total_react_components': total_react_components,
-                'vectors_upserted': total_vectors_upserted,
+                'total_react_components': len(react_components),
+                'vectors_upserted': counters['vectors_upserted'],
+                'analysis_cache_hits': counters['analysis_cache_hits'],
+                'embeddings_reused': counters['embeddings_reused'],
                 'namespace': namespace,
                 'user_id': namespace
             }
@@ -208,12 +407,13 @@ class PineconeService:
                 'namespace': namespace,
                 'user_id': namespace
             }
-        
+
     async def _save_non_react_components_to_db(
         self, 
         filtered_components: Dict[str, List], 
         user_id: Optional[str] = None,
         github_url: Optional[str] = None,
+        fetch_service: Optional[FetchComponentsService] = None,
     ):
         """Save non-React components to MongoDB without parsing, updating the github collection."""
         if not user_id or not github_url:
@@ -263,6 +463,11 @@ class PineconeService:
                 'content': component.fileContent
             })
             
+        # Precompute the design token digest used in prompts instead of raw CSS
+        design_tokens = None
+        if fetch_service and filtered_components.get('css_files'):
+            design_tokens = fetch_service.build_design_token_digest(filtered_components['css_files'])
+
         # Collect React component paths
         for component in filtered_components.get('react_components', []):
             react_component_paths.append(component.path)
@@ -275,6 +480,7 @@ class PineconeService:
             componentList=react_component_paths,
             packageJson=json.dumps(package_json_data) if package_json_data else None,
             cssFiles=json.dumps(css_files_data) if css_files_data else None,
+            designTokens=design_tokens.model_dump_json() if design_tokens else None,
             designConfigFiles=json.dumps(design_config_data) if design_config_data else None
         )
         
@@ -293,25 +499,7 @@ class PineconeService:
         # if not result:
         #     await database_service.insert_one('github', github_repo.model_dump(exclude_none=True))
             
-        # Initialize components in the components table
-        components_to_insert = []
-         
-        # Initialize React components
-        for component in filtered_components.get('react_components', []):
-            # Extract component name from path
-            component = Component(
-                userId=user_id,
-                githubUrl=github_url,
-                componentName=component.file,
-                componentPath=component.path,
-                indexingStatus=False  # Initialize as not indexed
-            )
-            components_to_insert.append(component.model_dump())
-            
-        # Insert all components
-        if components_to_insert:
-            await database_service.insert_many('components', components_to_insert)
-    
+
     def query(
         self,
         query_text: str,
@@ -320,13 +508,21 @@ class PineconeService:
         filter: Optional[Dict[str, Any]] = None,
         include_metadata: bool = True
     ) -> Dict[str, Any]:
+        """
+        Find the components closest to a query text.
+
+        Blocking: the embedding and Pinecone calls wait out rate limits and
+        retries, so async callers run it with asyncio.to_thread.
+        """
         # Generate embedding for query if embedding service is available
         query_vector = None
         if self.embedding_service:
             query_vector = self.embedding_service.embed_text(query_text)
             
             # Execute vector query
-            results = self.index.query(
+            results = outbound_governor.call(
+                "pinecone",
+                self.index.query,
                 namespace=namespace,
                 vector=query_vector,
                 top_k=top_k,
@@ -335,7 +531,9 @@ class PineconeService:
             )
         else:
             # Use text-based query if no embedding service
-            results = self.index.search_records(
+            results = outbound_governor.call(
+                "pinecone",
+                self.index.search_records,
                 namespace=namespace,
                 query={
                     "inputs": {
@@ -371,10 +569,10 @@ class PineconeService:
     ) -> Dict[str, Any]:
 
         if delete_all:
-            return self.index.delete_all(namespace=namespace or "")
+            return outbound_governor.call("pinecone", self.index.delete_all, namespace=namespace or "")
         elif ids:
-            return self.index.delete(ids=ids, namespace=namespace or "")
+            return outbound_governor.call("pinecone", self.index.delete, ids=ids, namespace=namespace or "")
         elif filter:
-            return self.index.delete(filter=filter, namespace=namespace or "")
+            return outbound_governor.call("pinecone", self.index.delete, filter=filter, namespace=namespace or "")
         else:
             raise ValueError("Must provide either ids, delete_all=True, or a filter") 
\ No newline at end of file
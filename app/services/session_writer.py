@@ -0,0 +1,142 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.services.database_service import database_service, DatabaseService, SessionDelta
+
+
+class SessionWriter:
+    """
+    Write-behind queue for session deltas.
+
+    Requests enqueue their session delta and return immediately; a background
+    worker flushes pending sessions in batches. Deltas for a session that is
+    still waiting to be flushed are coalesced into one.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseService = database_service,
+        max_pending: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 0.05,
+        shutdown_attempts: int = 3,
+    ):
+        self.db = db
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.shutdown_attempts = shutdown_attempts
+        self.pending: "OrderedDict[str, SessionDelta]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.dropped = 0
+
+    async def start(self):
+        """Start the background flush worker."""
+        if self._worker and not self._worker.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker after durably flushing everything still pending."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        attempts = 0
+        while self.pending:
+            if await self._flush_batch():
+                attempts = 0
+                continue
+            attempts += 1
+            if attempts >= self.shutdown_attempts:
+                print(f"SessionWriter: dropping {len(self.pending)} session deltas after {attempts} failed shutdown flushes")
+                self.dropped += len(self.pending)
+                self.pending.clear()
+                break
+            await asyncio.sleep(0.5 * attempts)
+
+    async def enqueue(self, delta: SessionDelta):
+        """
+        Queue a session delta for a write-behind flush.
+
+        Waits only when the queue is full and the session is not already pending.
+        Falls back to a direct write when the worker is not running.
+        """
+        session_id = delta.sessionId
+        if not self._worker:
+            await self.db.write_session_deltas([delta])
+            return
+
+        if session_id in self.pending:
+            self.pending[session_id] = self.pending[session_id].merge(delta)
+            self.coalesced += 1
+            return
+
+        async with self._space:
+            await self._space.wait_for(lambda: len(self.pending) < self.max_pending)
+            if session_id in self.pending:
+                self.pending[session_id] = self.pending[session_id].merge(delta)
+                self.coalesced += 1
+            else:
+                self.pending[session_id] = delta
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Give concurrent requests a moment to coalesce into the same batch
+            await asyncio.sleep(self.flush_interval)
+            while self.pending:
+                if not await self._flush_batch():
+                    await asyncio.sleep(1)
+
+    async def _flush_batch(self) -> bool:
+        """Write up to batch_size pending session deltas, requeueing them if the write fails."""
+        batch = []
+        while self.pending and len(batch) < self.batch_size:
+            batch.append(self.pending.popitem(last=False))
+
+        if self._space:
+            async with self._space:
+                self._space.notify_all()
+
+        try:
+            await self.db.write_session_deltas([delta for _, delta in batch])
+            self.flushed += len(batch)
+            return True
+        except Exception as e:
+            print(f"SessionWriter: error flushing {len(batch)} sessions: {str(e)}")
+            self.failed += len(batch)
+            # Requeue the failed deltas underneath anything newer for the same session
+            for session_id, delta in reversed(batch):
+                if session_id in self.pending:
+                    self.pending[session_id] = delta.merge(self.pending[session_id])
+                else:
+                    self.pending[session_id] = delta
+                self.pending.move_to_end(session_id, last=False)
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self.pending),
+            "max_pending": self.max_pending,
+            "flushed": self.flushed,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+# Create a singleton instance
+session_writer = SessionWriter()
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Stages of repository training, in pipeline order
+STAGES = ("fetch", "analyze", "store", "embed", "upsert")
+# Stages every React component goes through after fetching
+PER_COMPONENT_STAGES = ("analyze", "store", "embed", "upsert")
+
+
+class TrainingProgress:
+    """
+    Per-stage counters of a training job: items processed, expected totals and
+    the time spent in each stage, plus LLM and embedding token usage.
+
+    Progress is persisted with the job's checkpoints, so a resumed job keeps
+    counting from where the previous attempt stopped.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.stages: Dict[str, Dict[str, float]] = {
+            stage: {"count": 0, "total": 0, "seconds": 0.0, **data.get("stages", {}).get(stage, {})}
+            for stage in STAGES
+        }
+        self.tokens: Dict[str, int] = {
+            "analysis_prompt": 0,
+            "analysis_completion": 0,
+            "embedding": 0,
+            **data.get("tokens", {}),
+        }
+        self.started_at: float = data.get("started_at") or time.time()
+
+    def set_total(self, stage: str, total: int):
+        self.stages[stage]["total"] = total
+
+    @contextmanager
+    def track(self, stage: str, count: int = 0) -> Iterator[None]:
+        """Time a block of work in `stage`, crediting `count` processed items when it succeeds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage]["seconds"] += time.perf_counter() - start
+        self.stages[stage]["count"] += count
+
+    def add_tokens(self, kind: str, tokens: int):
+        self.tokens[kind] = self.tokens.get(kind, 0) + tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Raw counters, as persisted."""
+        return {"stages": self.stages, "tokens": self.tokens, "started_at": self.started_at}
+
+    @classmethod
+    def report(cls, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Progress report with per-stage throughput and an ETA.
+
+        Returns:
+            Dictionary with, per stage, count, total, seconds and rate (items/s of
+            time spent in that stage); token usage; elapsed seconds and the
+            estimated seconds remaining, or None before any component was upserted.
+        """
+        progress = cls(data)
+        stages = {}
+        for stage, counters in progress.stages.items():
+            stages[stage] = {
+                "count": int(counters["count"]),
+                "total": int(counters["total"]),
+                "seconds": round(counters["seconds"], 2),
+                "rate": round(counters["count"] / counters["seconds"], 3) if counters["seconds"] else None,
+            }
+
+        # Stages overlap, so the ETA uses the rate at which components leave the
+        # pipeline rather than the sum of the time spent in each stage
+        elapsed = time.time() - progress.started_at
+        remaining = max(0, stages["analyze"]["total"] - stages["upsert"]["count"])
+        completed = stages["upsert"]["count"]
+        eta = round(remaining * elapsed / completed, 1) if completed and elapsed > 0 else None
+        if not stages["analyze"]["total"]:
+            # Components not fetched yet, nothing to estimate from
+            eta = None
+        elif not remaining:
+            eta = 0
+
+        return {
+            "stages": stages,
+            "tokens": {**progress.tokens, "total": sum(progress.tokens.values())},
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta,
+        }
@@ -0,0 +1,190 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from typing import Any, Dict, List, Optional
+from app.core.config import get_settings
+from app.api.dependencies import get_pinecone_service
+from app.services.database_service import database_service
+from app.services.job_queue import TrainingJob, TrainingJobQueue, training_job_queue
+from app.services.training_progress import TrainingProgress
+
+settings = get_settings()
+
+
+async def set_indexing_status(job: TrainingJob, status: str):
+    """Set the indexing status of the job's github document, creating it on the first attempt."""
+    query = {"userId": job.user_id, "githubUrl": job.github_url}
+    if await database_service.update_one("github", query, {"$set": {"indexingStatus": status}}):
+        return
+    # Nothing modified: either the status is already set or the document does not exist yet.
+    # Retries of a job run one after another, so checking first cannot race with itself.
+    if await database_service.find_one("github", query, projection={"_id": 1}) is None:
+        await database_service.insert_one("github", {**query, "indexingStatus": status})
+
+
+async def run_training_job(job: TrainingJob, queue: TrainingJobQueue) -> Dict[str, Any]:
+    """
+    Index the job's repository, checkpointing after every stage of every batch.
+
+    Raises:
+        RuntimeError: if training reported an error
+    """
+    # Record the repository as being indexed, also when resuming after it was marked as failed
+    await set_indexing_status(job, "IN_PROGRESS")
+
+    progress = TrainingProgress(job.progress)
+
+    async def on_checkpoint(checkpoint: Dict[str, Any]):
+        await asyncio.to_thread(queue.save_checkpoint, job.id, checkpoint, progress.to_dict())
+
+    pinecone_service = get_pinecone_service(settings)
+    result = await pinecone_service.train_github_url(
+        github_url=job.github_url,
+        access_token=job.access_token,
+        namespace=job.user_id,
+        checkpoint=job.checkpoint,
+        on_checkpoint=on_checkpoint,
+        progress=progress
+    )
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    print(f"Training completed: {result['total_components']} components indexed")
+
+    await set_indexing_status(job, "COMPLETED")
+    return result
+
+
+class Heartbeat:
+    """
+    Keeps a running job's heartbeat fresh from a thread, so jobs blocked in
+    synchronous GitHub or OpenAI calls are not mistaken for abandoned ones.
+    """
+
+    def __init__(self, queue: TrainingJobQueue, job_id: str, interval: float):
+        self.queue = queue
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.job_id)
+            except Exception as e:
+                print(f"Training heartbeat failed for job {self.job_id}: {str(e)}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+async def work(worker_id: str, queue: TrainingJobQueue, stop: Optional[Any] = None):
+    """Claim and run training jobs until `stop` is set."""
+    await database_service.start()
+    try:
+        while not (stop and stop.is_set()):
+            job = await asyncio.to_thread(queue.claim, worker_id)
+            if job is None:
+                await asyncio.sleep(settings.TRAINING_POLL_INTERVAL)
+                continue
+
+            print(f"Worker {worker_id} running training job {job.id} ({job.github_url}), attempt {job.attempts}")
+            with Heartbeat(queue, job.id, interval=queue.stale_seconds / 4):
+                try:
+                    result = await run_training_job(job, queue)
+                    await asyncio.to_thread(queue.complete, job.id, result)
+                except Exception as e:
+                    print(f"Error in training job {job.id}: {str(e)}")
+                    requeued = await asyncio.to_thread(queue.fail, job.id, str(e))
+                    if not requeued:
+                        await set_indexing_status(job, "ERROR")
+    finally:
+        await database_service.close()
+
+
+def worker_main(worker_id: str, queue_path: str, stop: Any):
+    """Entry point of a training worker process."""
+    asyncio.run(work(worker_id, TrainingJobQueue(path=queue_path), stop))
+
+
+class TrainingWorkerPool:
+    """
+    Training worker processes started with the API, plus a watcher in the API
+    process that drops cached resources of users whose training completed.
+
+    Training runs outside the API's event loop, so its blocking GitHub,
+    OpenAI and Pinecone calls do not affect request latency.
+    """
+
+    def __init__(self, queue: TrainingJobQueue = training_job_queue, processes: int = settings.TRAINING_WORKER_PROCESSES):
+        self.queue = queue
+        self.processes = processes
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = None
+        self._workers: List[multiprocessing.Process] = []
+        self._watcher: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._stop = self._context.Event()
+        for index in range(self.processes):
+            worker = self._context.Process(
+                target=worker_main,
+                args=(f"{os.getpid()}-{index}", self.queue.path, self._stop),
+                name=f"training-worker-{index}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        self._watcher = asyncio.create_task(self._watch_completions())
+
+    async def stop(self, timeout: float = 10.0):
+        """Ask workers to stop after their current job; jobs still running are resumed later from their checkpoint."""
+        if self._watcher:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+        if self._stop:
+            self._stop.set()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            await asyncio.to_thread(worker.join, max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+    async def _watch_completions(self):
+        since = time.time()
+        while True:
+            await asyncio.sleep(settings.TRAINING_POLL_INTERVAL)
+            try:
+                for job in await asyncio.to_thread(self.queue.finished_since, since):
+                    # Completed and failed jobs both change trained data, drop cached resources and components for this user
+                    database_service.invalidate_user_cache(job.user_id)
+                    since = max(since, job.finished_at)
+            except Exception as e:
+                print(f"Error watching training jobs: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "alive": sum(worker.is_alive() for worker in self._workers),
+        }
+
+
+# Create a singleton instance
+training_worker_pool = TrainingWorkerPool()
+
+
+if __name__ == "__main__":
+    # Run a standalone worker, for deployments that set TRAINING_WORKER_PROCESSES=0 on the API
+    asyncio.run(work(f"{os.getpid()}", training_job_queue))
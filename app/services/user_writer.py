@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from app.services.database_service import database_service, DatabaseService
+
+
+def mint_user_id() -> str:
+    """Generate a user ID in-process, in the same ObjectId format the database would assign."""
+    return str(ObjectId())
+
+
+class UserWriter:
+    """
+    Deferred creation of anonymous users.
+
+    User IDs are minted in-process and handed to the client immediately; the
+    user documents are written by a background worker in batches, so requests
+    never wait on the insert.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseService = database_service,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: List[Dict[str, Any]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.minted = 0
+        self.flushed = 0
+        self.failed = 0
+
+    async def start(self):
+        """Start the background flush worker."""
+        if self._worker and not self._worker.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker after flushing every pending user."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self.pending:
+            if not await self._flush_batch():
+                print(f"UserWriter: dropping {len(self.pending)} users after failed shutdown flush")
+                self.pending.clear()
+
+    async def create_user(self) -> str:
+        """
+        Mint a new user ID and queue the user document for a background write.
+
+        Falls back to a direct write when the worker is not running.
+        """
+        user_id = mint_user_id()
+        self.minted += 1
+        # Same _id type as users created by the database
+        document = {"_id": ObjectId(user_id), "created_at": str(datetime.now(timezone.utc))}
+        if not self._worker:
+            await self.db.insert_one("users", document)
+            return user_id
+
+        self.pending.append(document)
+        self._wakeup.set()
+        return user_id
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Collect users minted over the interval into one write
+            await asyncio.sleep(self.flush_interval)
+            while self.pending:
+                if not await self._flush_batch():
+                    await asyncio.sleep(1)
+
+    async def _flush_batch(self) -> bool:
+        """Write up to batch_size pending users."""
+        batch = self.pending[:self.batch_size]
+        del self.pending[:self.batch_size]
+        inserted = await self.db.insert_many("users", batch)
+        if inserted == 0:
+            # Nothing was written, retry the whole batch on the next flush
+            self.pending[:0] = batch
+            return False
+        if inserted < len(batch):
+            print(f"UserWriter: only {inserted} of {len(batch)} users were written")
+            self.failed += len(batch) - inserted
+        self.flushed += inserted
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self.pending),
+            "minted": self.minted,
+            "flushed": self.flushed,
+            "failed": self.failed,
+        }
+
+
+# Create a singleton instance
+user_writer = UserWriter()
@@ -0,0 +1,251 @@
+import re
+import posixpath
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from pydantic import BaseModel, Field
+from app.models.component import FileNode
+from app.lib.constants.model_config import DEFAULT_CONTEXT_MAX_FILES, DEFAULT_CONTEXT_MAX_CHARS
+
+IMPORT_PATTERN = re.compile(
+    r'''(?:import\s+(?:[\w*{}\s,]+\s+from\s+)?|export\s+[\w*{}\s,]+\s+from\s+|require\(\s*|import\(\s*)['"]([^'"]+)['"]'''
+)
+EXPORT_PATTERN = re.compile(
+    r'^\s*export\s+(?:default\s+)?(?:async\s+)?(?:function\*?|const|let|class|interface|type|enum)\s+[^\n]*',
+    re.MULTILINE
+)
+TOKEN_PATTERN = re.compile(r'[A-Za-z][A-Za-z0-9]*')
+CAMEL_PATTERN = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+RESOLVE_EXTENSIONS = ('', '.tsx', '.ts', '.jsx', '.js', '/index.tsx', '/index.ts', '/index.jsx', '/index.js')
+PINNED_FILE_NAMES = ('App.tsx', 'App.jsx', 'main.tsx', 'main.jsx', 'package.json')
+STOP_WORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'into', 'make', 'add', 'use',
+    'create', 'please', 'should', 'want', 'page', 'component', 'components', 'new', 'can',
+    'import', 'export', 'default', 'const', 'return', 'react', 'props', 'function', 'type',
+}
+MAX_SIGNATURE_LENGTH = 160
+
+
+class CodebaseSelection(BaseModel):
+    """Result of ranking a codebase against a user query."""
+    files: List[FileNode] = Field(default_factory=list)
+    summary: Optional[str] = None
+    scores: Dict[str, float] = Field(default_factory=dict)
+
+
+def _tokenize(text: str) -> Set[str]:
+    """Split text into lowercase word tokens, breaking camelCase and PascalCase identifiers."""
+    tokens = set()
+    for word in TOKEN_PATTERN.findall(text):
+        tokens.add(word.lower())
+        for part in CAMEL_PATTERN.findall(word):
+            tokens.add(part.lower())
+    return {token for token in tokens if len(token) >= 3 and token not in STOP_WORDS}
+
+
+def _normalize_path(path: str) -> str:
+    """Normalize a codebase path so '@/' aliases and leading slashes resolve to 'src/' paths."""
+    if path.startswith('@/'):
+        path = 'src/' + path[2:]
+    return posixpath.normpath(path.lstrip('/'))
+
+
+def extract_export_signatures(content: str) -> List[str]:
+    """Extract one-line export signatures (functions, consts, classes, types) from a source file."""
+    signatures = []
+    for match in EXPORT_PATTERN.finditer(content):
+        signature = match.group(0).strip()
+        for terminator in (' {', '=>', ' = '):
+            index = signature.find(terminator)
+            if index > 0:
+                signature = signature[:index].rstrip()
+                break
+        if len(signature) > MAX_SIGNATURE_LENGTH:
+            signature = signature[:MAX_SIGNATURE_LENGTH] + '...'
+        signatures.append(signature)
+    return list(dict.fromkeys(signatures))
+
+
+def extract_recent_edits(conversation: Iterable[Any]) -> Dict[str, int]:
+    """
+    Collect the file paths touched by assistant turns in the conversation.
+
+    Returns:
+        Mapping of normalized file path to recency rank (0 is the most recent turn)
+    """
+    recent: Dict[str, int] = {}
+    assistant_turns = [msg for msg in conversation if getattr(msg, 'role', None) == 'assistant']
+    for rank, message in enumerate(reversed(assistant_turns)):
+        content = message.content
+        if hasattr(content, 'model_dump'):
+            content = content.model_dump()
+        if not isinstance(content, dict):
+            continue
+        for step in content.get('steps', []) or []:
+            path = step.get('path') if isinstance(step, dict) else getattr(step, 'path', None)
+            if path:
+                recent.setdefault(_normalize_path(path), rank)
+    return recent
+
+
+class CodebaseSelector:
+    """
+    Ranks codebase files by relevance to the current query so that only the
+    relevant slice is sent verbatim to the LLM. The score combines lexical
+    overlap with the query, proximity in the import graph to the strongest
+    lexical matches and recently edited files, and recency of edits in the
+    conversation. Remaining files are summarized as a file tree with their
+    export signatures.
+    """
+
+    def __init__(
+        self,
+        max_files: int = DEFAULT_CONTEXT_MAX_FILES,
+        max_chars: int = DEFAULT_CONTEXT_MAX_CHARS,
+        lexical_weight: float = 1.0,
+        graph_weight: float = 0.6,
+        recency_weight: float = 0.8,
+    ):
+        self.max_files = max_files
+        self.max_chars = max_chars
+        self.lexical_weight = lexical_weight
+        self.graph_weight = graph_weight
+        self.recency_weight = recency_weight
+
+    def select(
+        self,
+        query: str,
+        codebase: List[FileNode],
+        conversation: Optional[Iterable[Any]] = None,
+    ) -> CodebaseSelection:
+        """
+        Select the files to include verbatim and summarize the rest.
+
+        Args:
+            query: The current user query
+            codebase: Files of the generated project
+            conversation: Previous conversation turns, used to find recent edits
+
+        Returns:
+            CodebaseSelection with the verbatim files (in original order), a summary
+            of the omitted files and the per-file relevance scores
+        """
+        if not codebase:
+            return CodebaseSelection()
+
+        total_chars = sum(len(file.fileContent) for file in codebase)
+        if len(codebase) <= self.max_files and total_chars <= self.max_chars:
+            return CodebaseSelection(files=list(codebase))
+
+        paths = [_normalize_path(file.filePath) for file in codebase]
+        scores = self._score(query, codebase, paths, extract_recent_edits(conversation or []))
+
+        ranked = sorted(range(len(codebase)), key=lambda i: scores[paths[i]], reverse=True)
+        selected: Set[int] = set()
+        budget = self.max_chars
+        for index in ranked:
+            if len(selected) >= self.max_files:
+                break
+            size = len(codebase[index].fileContent)
+            pinned = codebase[index].fileName in PINNED_FILE_NAMES
+            if size > budget and not (pinned and not selected):
+                continue
+            if scores[paths[index]] <= 0 and not pinned:
+                continue
+            selected.add(index)
+            budget -= size
+
+        omitted = [i for i in range(len(codebase)) if i not in selected]
+        return CodebaseSelection(
+            files=[codebase[i] for i in sorted(selected)],
+            summary=self._summarize([codebase[i] for i in omitted]) if omitted else None,
+            scores=scores,
+        )
+
+    def _score(
+        self,
+        query: str,
+        codebase: List[FileNode],
+        paths: List[str],
+        recent_edits: Dict[str, int],
+    ) -> Dict[str, float]:
+        """Compute the combined relevance score for every file path."""
+        query_tokens = _tokenize(query)
+        lexical: Dict[str, float] = {}
+        for file, path in zip(codebase, paths):
+            if not query_tokens:
+                lexical[path] = 0.0
+                continue
+            path_hits = len(query_tokens & _tokenize(path))
+            content_hits = len(query_tokens & _tokenize(file.fileContent))
+            lexical[path] = (2 * path_hits + content_hits) / (3 * len(query_tokens))
+
+        recency = {path: 1.0 / (1 + rank) for path, rank in recent_edits.items()}
+
+        # Seeds for graph proximity: strongest lexical matches plus recently edited files
+        seeds = {path for path, score in lexical.items() if score > 0}
+        seeds.update(path for path in recency if path in lexical)
+        distances = self._graph_distances(self._build_import_graph(codebase, paths), seeds)
+
+        scores = {}
+        for file, path in zip(codebase, paths):
+            proximity = 1.0 / (1 + distances[path]) if path in distances else 0.0
+            pinned = 0.05 if file.fileName in PINNED_FILE_NAMES else 0.0
+            scores[path] = (
+                self.lexical_weight * lexical[path]
+                + self.graph_weight * proximity
+                + self.recency_weight * recency.get(path, 0.0)
+                + pinned
+            )
+        return scores
+
+    def _build_import_graph(self, codebase: List[FileNode], paths: List[str]) -> Dict[str, Set[str]]:
+        """Build an undirected graph of local imports between codebase files."""
+        known = set(paths)
+        graph: Dict[str, Set[str]] = {path: set() for path in paths}
+        for file, path in zip(codebase, paths):
+            directory = posixpath.dirname(path)
+            for specifier in IMPORT_PATTERN.findall(file.fileContent):
+                if specifier.startswith('.'):
+                    base = posixpath.normpath(posixpath.join(directory, specifier))
+                elif specifier.startswith('@/') or specifier.startswith('src/'):
+                    base = _normalize_path(specifier)
+                else:
+                    continue
+                target = next((base + ext for ext in RESOLVE_EXTENSIONS if base + ext in known), None)
+                if target and target != path:
+                    graph[path].add(target)
+                    graph[target].add(path)
+        return graph
+
+    def _graph_distances(self, graph: Dict[str, Set[str]], seeds: Set[str]) -> Dict[str, int]:
+        """Breadth-first distance from the nearest seed file to every reachable file."""
+        distances = {seed: 0 for seed in seeds}
+        queue = deque(seeds)
+        while queue:
+            current = queue.popleft()
+            for neighbour in graph.get(current, ()):
+                if neighbour not in distances:
+                    distances[neighbour] = distances[current] + 1
+                    queue.append(neighbour)
+        return distances
+
+    def _summarize(self, files: List[FileNode]) -> str:
+        """Render omitted files as a compact tree with their export signatures."""
+        lines = []
+        for file in sorted(files, key=lambda f: f.filePath):
+            signatures = extract_export_signatures(file.fileContent)
+            if signatures:
+                lines.append(f"- {file.filePath}: {'; '.join(signatures)}")
+            else:
+                lines.append(f"- {file.filePath}")
+        return "\n".join(lines)
+
+
+def select_codebase_context(
+    query: str,
+    codebase: List[FileNode],
+    conversation: Optional[Iterable[Any]] = None,
+) -> Tuple[List[FileNode], Optional[str]]:
+    """Convenience wrapper returning the verbatim files and the summary of the rest."""
+    selection = CodebaseSelector().select(query, codebase, conversation)
+    return selection.files, selection.summary
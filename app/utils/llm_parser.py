@@ -146,23 +146,31 @@ async def process_react_steps_for_internal_components(
     missing_dependencies = []
 
     if react_response and react_response.steps:
-        for step in react_response.steps:
-            if step.path == package_json_file.filePath:
-                package_json_file.fileContent = step.content
-            if step.content:
-                # Parse component code to extract dependencies
-                parsed_data = await database_service.parse_component_code(step.content)
-                
-                if parsed_data and "dependencies" in parsed_data:
-                    # Find missing internal components
-                    for dep in parsed_data["dependencies"]:
-                        if '/ui/internal/' in dep and dep not in existing_internal_components:
-                            # Extract the component name after 'internal/' and construct the full path
-                            component_name = dep.split('/ui/internal/')[-1]
-                            full_path = f"src/components/ui/internal/{component_name}.tsx"
+        # Parse every step's code in one round trip to the data backend
+        async with database_service.batch() as batch:
+            parsed_steps = []
+            for step in react_response.steps:
+                if package_json_file and step.path == package_json_file.filePath:
+                    package_json_file.fileContent = step.content
+                if step.content:
+                    parsed_steps.append(batch.parse_component_code(step.content))
+
+        for parsed in parsed_steps:
+            if not parsed.ok:
+                print(f"Error parsing component code: {parsed.error}")
+                continue
+            parsed_data = parsed.result
+            if parsed_data and "dependencies" in parsed_data:
+                # Find missing internal components
+                for dep in parsed_data["dependencies"]:
+                    if '/ui/internal/' in dep and dep not in existing_internal_components:
+                        # Extract the component name after 'internal/' and construct the full path
+                        component_name = dep.split('/ui/internal/')[-1]
+                        full_path = f"src/components/ui/internal/{component_name}.tsx"
+                        if full_path not in missing_component_paths:
                             missing_component_paths.append(full_path)
-                        # else:
-                        #     missing_dependencies.append(dep)
+                    # else:
+                    #     missing_dependencies.append(dep)
     
     # Only make a database call if there are missing components
     if missing_component_paths:
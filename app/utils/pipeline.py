@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    Chain of async stages connected by bounded queues.
+
+    Each stage runs `concurrency` workers that take an item from the stage's
+    input queue and pass the returned result to the next stage; returning None
+    drops the item. Bounded queues give backpressure: a slow stage stalls the
+    stages feeding it instead of letting work pile up in memory, and the total
+    time approaches that of the slowest stage rather than the sum of all stages.
+
+    Example:
+        pipeline = Pipeline(queue_size=4)
+        pipeline.stage("analyze", analyze, concurrency=3)
+        pipeline.stage("upsert", upsert, concurrency=2)
+        await pipeline.run(fetch_batches())
+    """
+
+    def __init__(self, queue_size: int = 4):
+        self.queue_size = queue_size
+        self._stages: List[tuple[str, Callable[[Any], Awaitable[Any]], int]] = []
+        self.processed: Dict[str, int] = {}
+        self.max_queue_depth: Dict[str, int] = {}
+
+    def stage(self, name: str, fn: Callable[[Any], Awaitable[Any]], concurrency: int = 1) -> "Pipeline":
+        """Append a stage running `concurrency` workers of `fn`."""
+        self._stages.append((name, fn, max(1, concurrency)))
+        self.processed[name] = 0
+        self.max_queue_depth[name] = 0
+        return self
+
+    async def run(self, source: AsyncIterable[Any]):
+        """
+        Feed items from `source` through all stages until every item is processed.
+
+        Raises:
+            The first exception raised by the source or a stage; all other work is cancelled.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self._stages]
+
+        async def put(index: int, item: Any):
+            await queues[index].put(item)
+            name = self._stages[index][0]
+            self.max_queue_depth[name] = max(self.max_queue_depth[name], queues[index].qsize())
+
+        async def feed():
+            async for item in source:
+                await put(0, item)
+            for _ in range(self._stages[0][2]):
+                await queues[0].put(_DONE)
+
+        async def worker(index: int):
+            name, fn, _ = self._stages[index]
+            while True:
+                item = await queues[index].get()
+                if item is _DONE:
+                    return
+                result = await fn(item)
+                self.processed[name] += 1
+                if result is not None and index + 1 < len(self._stages):
+                    await put(index + 1, result)
+
+        async def run_stage(index: int):
+            await asyncio.gather(*(worker(index) for _ in range(self._stages[index][2])))
+            # Close the next stage once every worker of this one has finished
+            if index + 1 < len(self._stages):
+                for _ in range(self._stages[index + 1][2]):
+                    await queues[index + 1].put(_DONE)
+
+        tasks = [asyncio.create_task(feed())]
+        tasks.extend(asyncio.create_task(run_stage(index)) for index in range(len(self._stages)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
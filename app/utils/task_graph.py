@@ -0,0 +1,79 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class TaskGraph:
+    """
+    Minimal dependency-aware runner for async stages.
+
+    Each stage is an async callable that receives the results of the stages it
+    depends on as keyword arguments. Stages without a dependency path between
+    them run concurrently, so the total latency is the longest chain rather
+    than the sum of all stages.
+
+    Example:
+        graph = TaskGraph()
+        graph.add("search", search)
+        graph.add("components", fetch, depends_on=["search"])  # called as fetch(search=...)
+        results = await graph.run()
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, tuple[Callable[..., Awaitable[Any]], List[str]]] = {}
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], depends_on: Optional[List[str]] = None) -> "TaskGraph":
+        """
+        Register a stage. Dependencies must be registered before the stage itself,
+        and the stage is called with their results as keyword arguments named
+        after them.
+        """
+        depends_on = depends_on or []
+        unknown = [dep for dep in depends_on if dep not in self._stages]
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {', '.join(unknown)}")
+        try:
+            inspect.signature(fn).bind(**{dep: None for dep in depends_on})
+        except TypeError:
+            raise ValueError(f"Stage '{name}' must accept its dependencies as keyword arguments: {', '.join(depends_on)}")
+        self._stages[name] = (fn, depends_on)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run all stages, starting each one as soon as its dependencies finish.
+
+        Returns:
+            Mapping of stage name to its result. Per-stage durations in milliseconds
+            (excluding time spent waiting on dependencies) are stored in `timings`,
+            with the wall-clock total under "total".
+        """
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str) -> Any:
+            fn, depends_on = self._stages[name]
+            dependency_results = {dep: await tasks[dep] for dep in depends_on}
+            stage_start = time.perf_counter()
+            try:
+                return await fn(**dependency_results)
+            finally:
+                self.timings[name] = round((time.perf_counter() - stage_start) * 1000, 2)
+
+        for name in self._stages:
+            tasks[name] = asyncio.create_task(run_stage(name))
+
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            # Stop the remaining stages and wait for their cleanup before re-raising
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+
+        return dict(zip(tasks.keys(), results))
@@ -0,0 +1,19 @@
+import pytest
+from cachetools import LRUCache
+from httpx import AsyncClient
+from app.services.database_service import DatabaseService, ResourceCache
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+
+
+@pytest.fixture
+def backend() -> LocalBackend:
+    return LocalBackend()
+
+
+@pytest.fixture
+def db(backend: LocalBackend) -> DatabaseService:
+    """DatabaseService served by the in-memory backend, with its own caches."""
+    db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+    db.cache = ResourceCache(maxsize=64)
+    db.session_states = LRUCache(maxsize=64)
+    return db
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from cachetools import LRUCache
+from app.services import analysis_cache as analysis_cache_module
+from app.services.analysis_cache import AnalysisCache
+from app.services.ingestion_service import LLMComponent
+
+CONTENT = "export const Button = () => null"
+ANALYSIS = LLMComponent(description="A button", inputProps=[], useCases=["Forms"], codeExamples=["<Button />"])
+
+
+@pytest.fixture
+def cache(db, monkeypatch) -> AnalysisCache:
+    monkeypatch.setattr(analysis_cache_module, "database_service", db)
+    return AnalysisCache(cache=LRUCache(maxsize=64))
+
+
+def test_key_depends_on_prompt_version_model_and_content(cache, monkeypatch):
+    key = cache.key(CONTENT, "model-a")
+
+    assert cache.key(CONTENT, "model-a") == key
+    assert cache.key(CONTENT, "model-b") != key
+    assert cache.key(CONTENT + " ", "model-a") != key
+    monkeypatch.setattr(analysis_cache_module, "COMPONENT_ANALYSIS_PROMPT_VERSION", "next")
+    assert cache.key(CONTENT, "model-a") != key
+
+
+def test_analyses_are_shared_through_storage_for_the_same_model_only(cache, backend):
+    async def run():
+        await cache.put_many({CONTENT: ANALYSIS}, "model-a")
+        # Another process, with nothing in memory
+        other = AnalysisCache(cache=LRUCache(maxsize=64))
+        return await other.get_many([CONTENT], "model-a"), await other.get_many([CONTENT], "model-b")
+
+    same_model, other_model = asyncio.run(run())
+
+    assert same_model == {CONTENT: ANALYSIS}
+    assert other_model == {}
+    assert len(backend.collections["componentAnalyses"]) == 1
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from cachetools import LRUCache
+from httpx import AsyncClient
+from app.services.blob_service import BlobStore, BlobWriteError, DatabaseBlobBackend, blob_hash
+from app.services.database_service import DatabaseService
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+
+
+class ShortInsertBackend(LocalBackend):
+    """Local backend that drops blob inserts while `failing` is set, reporting fewer inserted."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+
+    def insert_many(self, collection, documents):
+        if collection == "blobs" and self.failing:
+            return super().insert_many(collection, documents[:1])
+        return super().insert_many(collection, documents)
+
+
+def make_store(backend: LocalBackend) -> BlobStore:
+    db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+    return BlobStore(DatabaseBlobBackend(db), cache=LRUCache(maxsize=16))
+
+
+def test_short_put_raises_and_caches_only_stored_blobs():
+    async def run():
+        backend = ShortInsertBackend()
+        store = make_store(backend)
+        with pytest.raises(BlobWriteError) as error:
+            await store.put_many(["first", "second"])
+
+        assert error.value.missing == [blob_hash("second")]
+        assert blob_hash("first") in store.cache
+        assert blob_hash("second") not in store.cache
+
+        # Not cached, so the next put retries it
+        backend.failing = False
+        await store.put_many(["second"])
+        store.cache.clear()
+        assert await store.get(blob_hash("second")) == "second"
+
+    asyncio.run(run())
+
+
+def test_blob_stored_by_another_writer_counts_as_stored():
+    async def run():
+        backend = LocalBackend()
+        writer_a, writer_b = make_store(backend), make_store(backend)
+
+        class Racing(DatabaseBlobBackend):
+            async def put_many(self, blobs):
+                # The other writer stores the blob between our existence check and our insert
+                await writer_a.put_many(["shared"])
+                return await super().put_many(blobs)
+
+        writer_b.backend = Racing(writer_b.backend.db)
+        await writer_b.put_many(["shared"])
+
+        assert blob_hash("shared") in writer_b.cache
+        assert len(backend.collections["blobs"]) == 1
+
+    asyncio.run(run())
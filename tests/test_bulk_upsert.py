@@ -0,0 +1,42 @@
+import asyncio
+from httpx import AsyncClient
+from app.services.database_service import COMPONENT_KEY_FIELDS, DatabaseService
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+
+
+class NoUpsertBackend(LocalBackend):
+    """A REST backend whose updateMany route ignores upsert flags and reports modifiedCount only."""
+
+    def update_many(self, collection, updates):
+        result = super().update_many(collection, [{**update, "upsert": False} for update in updates])
+        return {"modifiedCount": result["modifiedCount"]}
+
+
+def component(path: str, description: str) -> dict:
+    return {"userId": "user-1", "githubUrl": "https://github.com/o/r", "componentPath": path, "description": description}
+
+
+def test_bulk_upsert_inserts_when_backend_ignores_upsert():
+    async def run():
+        backend = NoUpsertBackend()
+        db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+        await db.bulk_upsert("components", [component("a.tsx", "v1"), component("b.tsx", "v1")], COMPONENT_KEY_FIELDS)
+        await db.bulk_upsert("components", [component("a.tsx", "v2"), component("c.tsx", "v1")], COMPONENT_KEY_FIELDS)
+
+        stored = {doc["componentPath"]: doc["description"] for doc in backend.collections["components"]}
+        assert stored == {"a.tsx": "v2", "b.tsx": "v1", "c.tsx": "v1"}
+        assert len(backend.collections["components"]) == 3
+
+    asyncio.run(run())
+
+
+def test_bulk_upsert_is_idempotent():
+    async def run():
+        backend = LocalBackend()
+        db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+        documents = [component("a.tsx", "v1"), component("b.tsx", "v1")]
+        assert await db.bulk_upsert("components", documents, COMPONENT_KEY_FIELDS) == 2
+        await db.bulk_upsert("components", documents, COMPONENT_KEY_FIELDS)
+        assert len(backend.collections["components"]) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+from app.models.component import FileNode
+from app.utils.codebase_selector import CodebaseSelector, extract_export_signatures
+
+
+def file_node(path: str, content: str) -> FileNode:
+    return FileNode(fileName=path.split("/")[-1], filePath=path, fileContent=content)
+
+
+CODEBASE = [
+    file_node("src/App.tsx", "import { Navbar } from './components/Navbar'\nexport default function App() {}"),
+    file_node("src/components/Navbar.tsx", "import { Logo } from './Logo'\nexport function Navbar() { return null }"),
+    file_node("src/components/Logo.tsx", "export const Logo = () => null"),
+    file_node("src/components/Footer.tsx", "export function Footer() { return null }"),
+    file_node("src/lib/pricing.ts", "export const prices = [1, 2, 3]"),
+]
+
+
+def test_small_codebase_is_sent_whole():
+    selection = CodebaseSelector().select("Change the navbar", CODEBASE)
+
+    assert selection.files == CODEBASE
+    assert selection.summary is None
+
+
+def test_relevant_files_kept_and_rest_summarized():
+    selection = CodebaseSelector(max_files=3).select("Change the navbar colour", CODEBASE)
+
+    kept = [file.filePath for file in selection.files]
+    assert "src/components/Navbar.tsx" in kept
+    # Import neighbours of the lexical match rank above unrelated files
+    assert "src/components/Logo.tsx" in kept
+    assert "src/lib/pricing.ts" not in kept
+    assert "src/lib/pricing.ts" in selection.summary
+    assert "export const prices" in selection.summary
+
+
+def test_export_signatures_drop_bodies():
+    content = "export default function Page({ id }: Props) {\n  return null\n}\nexport const Value = 1"
+
+    assert extract_export_signatures(content) == ["export default function Page({ id }: Props)", "export const Value"]
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from cachetools import LRUCache
+from httpx import AsyncClient
+from app.models.component import FileNode
+from app.services.codebase_store import CodebaseStore, CodebaseVersionMismatch
+from app.services.database_service import DatabaseService
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+
+
+def make_db(backend: LocalBackend) -> DatabaseService:
+    db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+    db.session_states = LRUCache(maxsize=64)
+    return db
+
+
+CODEBASE = [
+    FileNode(fileName="App.tsx", filePath="src/App.tsx", fileContent="export default 1"),
+    FileNode(fileName="util.ts", filePath="src/util.ts", fileContent="export const x = 1"),
+]
+
+
+def test_other_worker_rebuilds_the_same_version_from_storage():
+    backend = LocalBackend()
+
+    async def run():
+        db = make_db(backend)
+        session_id = await db.get_or_create_session("user-1")
+        delta = await db.build_session_delta(
+            session_id=session_id, userId="user-1", messages=[], codebase=[file.model_dump() for file in CODEBASE]
+        )
+        await db.write_session_deltas([delta])
+        version = CodebaseStore(db).put(session_id, CODEBASE)
+
+        # A second worker holds nothing in memory for the session
+        other = CodebaseStore(make_db(backend))
+        patch = [FileNode(fileName="util.ts", filePath="src/util.ts", fileContent="export const x = 2")]
+        resolved = await other.resolve(session_id, version, patch, deleted_paths=["src/App.tsx"])
+        with pytest.raises(CodebaseVersionMismatch):
+            await other.resolve(session_id, "stale", [], [])
+        return resolved
+
+    resolved = asyncio.run(run())
+    assert [(file.filePath, file.fileContent) for file in resolved] == [("src/util.ts", "export const x = 2")]
+
+
+def test_version_ignores_file_order():
+    store = CodebaseStore(make_db(LocalBackend()))
+    assert store.put("a", CODEBASE) == store.put("b", list(reversed(CODEBASE)))
@@ -0,0 +1,45 @@
+from app.models.component import FileNode, InternalComponent
+from app.models.context import Context, component_fragment
+
+CODEBASE = [
+    FileNode(fileName="App.tsx", filePath="src/App.tsx", fileContent="export default App"),
+    FileNode(fileName="util.ts", filePath="src/util.ts", fileContent="export const x = 1"),
+]
+
+
+def test_codebase_message_matches_concatenated_files():
+    messages = Context(user_query="Add a page", codebase=CODEBASE).construct_messages()
+
+    expected = "REPOSITORY CONTEXT - Current codebase structure and files that must be considered for maintaining consistency:\n"
+    for file in CODEBASE:
+        expected += f"{{ fileName: {file.fileName}, filePath: {file.filePath}, fileContent: {file.fileContent} }} \n\n"
+    assert [message.role for message in messages] == ["system", "user", "user"]
+    assert messages[1].content == expected
+    assert messages[-1].content == "Add a page"
+
+
+def test_design_token_digest_replaces_raw_css():
+    context = Context(
+        user_query="Add a page",
+        css_tokens={"digest": {"utility_classes": ["btn"]}, "files": [{"path": "a.css", "content": ".a {}"}]},
+    )
+    contents = [message.content for message in context.construct_messages()]
+
+    assert any("UTILITY CLASSES: btn" in content for content in contents)
+    assert not any(".a {}" in content for content in contents)
+
+
+def test_component_fragment_lists_only_present_fields():
+    component = InternalComponent(path="src/ui/Button.tsx", name="Button", inputProps="label: string", codeSamples=["<Button />"])
+
+    fragment = component_fragment(component)
+
+    assert fragment == (
+        "COMPONENT: Button\n"
+        "IMPORT PATH (MUST use exactly as shown): @/ui/Button.tsx\n"
+        "PROPS SPECIFICATION (use these exact prop names and types):\n"
+        "label: string\n"
+        "IMPLEMENTATION EXAMPLES:\n"
+        "Example 1:\n<Button />\n"
+        "\n---\n\n"
+    )
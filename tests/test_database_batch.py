@@ -0,0 +1,17 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.parametrize("batch_supported", [True, False])
+def test_batched_delete_matches_direct_delete(db, backend, batch_supported):
+    backend.collections["sessions"] = [{"_id": "a", "userId": "user-1"}, {"_id": "b", "userId": "user-1"}]
+    # Without /batch support operations are sent through their regular routes
+    db._batch_supported = None if batch_supported else False
+
+    async def run():
+        async with db.batch() as batch:
+            deleted = batch.delete_one("sessions", {"_id": "a"})
+        return deleted.value(), await db.delete_one("sessions", {"_id": "b"})
+
+    assert asyncio.run(run()) == (True, True)
+    assert backend.collections["sessions"] == []
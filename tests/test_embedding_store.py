@@ -0,0 +1,29 @@
+import pytest
+from app.services.embedding_store import EmbeddingStore, FLOAT32, INT8, decode_vector, encode_vector
+
+VECTOR = [0.5, -0.25, 0.0, 0.125, -1.0]
+
+
+def test_int8_round_trip_stays_within_one_quantization_step():
+    scale, data = encode_vector(VECTOR, INT8)
+
+    assert len(data) == len(VECTOR)
+    decoded = decode_vector(data, INT8, scale)
+    assert decoded == pytest.approx(VECTOR, abs=scale / 2)
+
+
+def test_zero_vector_round_trips_as_int8():
+    scale, data = encode_vector([0.0, 0.0], INT8)
+    assert decode_vector(data, INT8, scale) == [0.0, 0.0]
+
+
+@pytest.mark.parametrize("dtype", [FLOAT32, INT8])
+def test_store_round_trip_is_keyed_on_model_and_text(tmp_path, dtype):
+    store = EmbeddingStore(path=str(tmp_path / "embeddings.db"), dtype=dtype)
+    store.put_many({"Button": VECTOR}, "model-a")
+
+    found = store.get_many(["Button", "Card"], "model-a")
+
+    assert list(found) == ["Button"]
+    assert found["Button"] == pytest.approx(VECTOR, abs=1 / 127 if dtype == INT8 else 1e-7)
+    assert store.get_many(["Button"], "model-b") == {}
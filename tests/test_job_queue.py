@@ -0,0 +1,103 @@
+import asyncio
+import sqlite3
+from cryptography.fernet import Fernet
+from httpx import AsyncClient
+from app.services import training_worker
+from app.services.database_service import DatabaseService
+from app.services.job_queue import COMPLETED, FAILED, QUEUED, TrainingJobQueue
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+
+
+def make_queue(tmp_path, **kwargs) -> TrainingJobQueue:
+    return TrainingJobQueue(path=str(tmp_path / "jobs.db"), token_key=Fernet.generate_key(), **kwargs)
+
+
+def stored_token(queue: TrainingJobQueue, job_id: str):
+    with sqlite3.connect(queue.path) as connection:
+        return connection.execute("SELECT access_token FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+def test_access_token_is_encrypted_and_erased_when_done(tmp_path):
+    queue = make_queue(tmp_path)
+    job, _ = queue.enqueue("user-1", "https://github.com/o/r", access_token="ghp_secret")
+    assert job.access_token is None
+    assert "ghp_secret" not in stored_token(queue, job.id)
+
+    claimed = queue.claim("worker-1")
+    assert claimed.access_token == "ghp_secret"
+
+    queue.complete(job.id, {"total_components": 1})
+    assert queue.get(job.id).status == COMPLETED
+    assert stored_token(queue, job.id) is None
+
+
+def test_failed_job_waits_for_backoff_and_erases_token_for_good(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2, retry_backoff=60)
+    job, _ = queue.enqueue("user-1", "https://github.com/o/r", access_token="ghp_secret")
+
+    queue.claim("worker-1")
+    assert queue.fail(job.id, "boom")
+    assert queue.get(job.id).status == QUEUED
+    assert queue.claim("worker-1") is None  # still backing off
+
+    with sqlite3.connect(queue.path) as connection:
+        connection.execute("UPDATE jobs SET not_before = 0 WHERE id = ?", (job.id,))
+    assert queue.claim("worker-1").attempts == 2
+    assert not queue.fail(job.id, "boom again")
+    assert queue.get(job.id).status == FAILED
+    assert stored_token(queue, job.id) is None
+
+
+def test_retry_delay_grows_with_attempts(tmp_path):
+    queue = make_queue(tmp_path, retry_backoff=10)
+    assert [queue.retry_delay(attempts) for attempts in (1, 2, 3)] == [10, 20, 40]
+
+
+def test_retried_job_does_not_duplicate_github_document(tmp_path, monkeypatch):
+    backend = LocalBackend()
+    db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+    monkeypatch.setattr(training_worker, "database_service", db)
+    queue = make_queue(tmp_path)
+    job, _ = queue.enqueue("user-1", "https://github.com/o/r")
+
+    async def run():
+        for status in ("IN_PROGRESS", "IN_PROGRESS", "ERROR", "IN_PROGRESS"):
+            await training_worker.set_indexing_status(job, status)
+
+    asyncio.run(run())
+    documents = backend.collections["github"]
+    assert len(documents) == 1
+    assert documents[0]["indexingStatus"] == "IN_PROGRESS"
+
+
+def test_finished_since_reports_completed_and_failed_jobs(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    completed, _ = queue.enqueue("user-1", "https://github.com/o/a")
+    failed, _ = queue.enqueue("user-2", "https://github.com/o/b")
+    queue.claim("worker-1")
+    queue.claim("worker-1")
+    queue.complete(completed.id, {})
+    queue.fail(failed.id, "boom")
+
+    assert {job.user_id for job in queue.finished_since(0)} == {"user-1", "user-2"}
+
+
+def test_job_abandoned_by_its_worker_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=3, stale_seconds=30, retry_backoff=60)
+    job, _ = queue.enqueue("user-1", "https://github.com/o/r", access_token="ghp_secret")
+
+    def run(sql: str):
+        with sqlite3.connect(queue.path) as connection:
+            connection.execute(sql, (job.id,))
+
+    for attempt in range(1, 4):
+        run("UPDATE jobs SET not_before = NULL WHERE id = ?")
+        assert queue.claim("worker-1").attempts == attempt
+        run("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?")
+        # The next claim notices the expired heartbeat, and the job backs off
+        assert queue.claim("worker-2") is None
+        assert queue.get(job.id).status == (QUEUED if attempt < 3 else FAILED)
+
+    assert stored_token(queue, job.id) is None
+    run("UPDATE jobs SET not_before = NULL WHERE id = ?")
+    assert queue.claim("worker-1") is None
@@ -0,0 +1,114 @@
+import time
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.services import llm_router as router_module
+from app.services.llm_router import LLMRouter, LLMTarget, CHEAPEST, PRIMARY_WITH_HEDGE
+from app.services.openai_service import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="Build a button")]
+
+
+class FakeService:
+    """Chat service answering after `delay` seconds, or raising `error`."""
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.timeouts = []
+        self.prompts = []
+
+    def chat_completion(self, messages, model=None, timeout=None):
+        self.timeouts.append(timeout)
+        self.prompts.append([(message.role, message.content) for message in messages])
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        usage = SimpleNamespace(prompt_tokens=1_000_000, completion_tokens=0)
+        return {"text": self.name, "raw_response": SimpleNamespace(usage=usage)}
+
+    def stream_chat_completion(self, messages, model=None, timeout=None):
+        self.timeouts.append(timeout)
+        self.prompts.append([(message.role, message.content) for message in messages])
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        yield self.name
+        yield {"input_tokens": 1_000_000, "output_tokens": 0}
+
+
+def make_router(services, policy=PRIMARY_WITH_HEDGE, timeout=2.0):
+    targets = [
+        LLMTarget(provider="openai", model="primary", input_cost=2.0),
+        LLMTarget(provider="deepseek", model="secondary", input_cost=1.0),
+    ]
+    return LLMRouter(
+        targets=targets,
+        policy=policy,
+        timeout=timeout,
+        hedge_min_delay=0.05,
+        stream_hedging=False,
+        service_factory=services.get
+    )
+
+
+def test_failed_primary_falls_back_to_next_target():
+    services = {"openai": FakeService("primary", error=RuntimeError("boom")), "deepseek": FakeService("secondary")}
+    router = make_router(services)
+
+    response = asyncio.run(router.chat_completion(MESSAGES))
+
+    assert response["text"] == "secondary"
+    assert router.counters["fallbacks"] == 1
+    assert router.stats()["targets"]["openai/primary"]["error_rate"] == 1.0
+    # The per-attempt timeout reaches the SDK call
+    assert services["openai"].timeouts == [2.0]
+
+
+def test_cheapest_policy_tries_lowest_price_first():
+    services = {"openai": FakeService("primary"), "deepseek": FakeService("secondary")}
+    router = make_router(services, policy=CHEAPEST)
+
+    response = asyncio.run(router.chat_completion(MESSAGES))
+
+    assert response["text"] == "secondary"
+    assert services["openai"].timeouts == []
+
+
+def test_slow_primary_is_hedged_and_loser_cost_recorded():
+    services = {"openai": FakeService("primary", delay=0.4), "deepseek": FakeService("secondary")}
+    router = make_router(services)
+    router.stats_by_target["openai/primary"].record(True, 0.01)
+
+    async def run():
+        response = await router.chat_completion(MESSAGES)
+        # Let the abandoned primary finish in its worker thread
+        await asyncio.sleep(0.6)
+        return response
+
+    response = asyncio.run(run())
+
+    assert response["text"] == "secondary"
+    assert router.counters["hedges"] == 1
+    assert router.counters["hedge_wins"] == 1
+    assert router.counters["abandoned"] == 1
+    assert router.stats()["hedge_overhead_cost"] == pytest.approx(2.0)
+
+
+def test_late_first_token_hedges_stream(monkeypatch):
+    monkeypatch.setattr(router_module.settings, "LLM_ROUTER_TTFT_MIN_SAMPLES", 1)
+    monkeypatch.setattr(router_module.settings, "LLM_ROUTER_TTFT_HEDGE_MIN_DELAY", 0.05)
+    services = {"openai": FakeService("primary", delay=0.4), "deepseek": FakeService("secondary")}
+    router = make_router(services)
+    router.stats_by_target["openai/primary"].record_ttft(0.01)
+
+    response = asyncio.run(router.chat_completion(MESSAGES, hedge=True))
+
+    assert response["text"] == "secondary"
+    assert response["hedged"]
+    assert router.stats()["streaming"]["hedge_wins"] == 1
+    # Both streams are bounded by the timeout and get the same prompt, system prompt included
+    assert services["openai"].timeouts == services["deepseek"].timeouts == [2.0]
+    assert services["openai"].prompts == services["deepseek"].prompts
+    assert services["openai"].prompts[0][0][0] == "system"
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from app.api import middleware
+from app.api.middleware import UserIdMiddleware
+from app.services.user_writer import UserWriter
+
+
+class FakeUserWriter:
+    def __init__(self):
+        self.created = 0
+
+    async def create_user(self) -> str:
+        self.created += 1
+        return f"{self.created:024x}"
+
+
+@pytest.mark.parametrize("method, path, mints", [
+    ("POST", "/api/query/generate", True),
+    ("POST", "/api/train/github", True),
+    ("GET", "/api/train/jobs/abc", False),
+    ("GET", "/api/train/jobs/abc/events", False),
+    ("OPTIONS", "/api/query/generate", False),
+])
+def test_only_routes_creating_user_state_mint_users(monkeypatch, method, path, mints):
+    writer = FakeUserWriter()
+    monkeypatch.setattr(middleware, "user_writer", writer)
+    seen_headers = {}
+
+    async def app(scope, receive, send):
+        seen_headers.update(dict(scope["headers"]))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": method, "path": path, "headers": []}
+    asyncio.run(UserIdMiddleware(app)(scope, None, send))
+
+    assert writer.created == (1 if mints else 0)
+    assert (b"userid" in seen_headers) == mints
+
+
+def test_minted_user_is_written_with_its_id(db, backend):
+    user_id = asyncio.run(UserWriter(db=db).create_user())
+
+    # The REST backend receives the ObjectId as its hex string
+    assert backend.collections["users"][0]["_id"] == user_id
+    assert backend.collections["users"][0]["created_at"].endswith("+00:00")
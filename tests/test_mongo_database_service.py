@@ -0,0 +1,27 @@
+import asyncio
+from pymongo.errors import BulkWriteError
+from app.services.mongo_database_service import MongoDatabaseService
+
+
+class DuplicateKeyCollection:
+    """insert_many that rejects documents whose _id was already inserted."""
+
+    def __init__(self, existing):
+        self.ids = set(existing)
+
+    async def insert_many(self, documents, ordered=True):
+        new = [document for document in documents if document["_id"] not in self.ids]
+        self.ids.update(document["_id"] for document in new)
+        if len(new) < len(documents):
+            raise BulkWriteError({"nInserted": len(new), "writeErrors": [{"code": 11000}]})
+        return type("InsertManyResult", (), {"inserted_ids": [document["_id"] for document in new]})()
+
+
+def test_insert_many_counts_documents_inserted_around_duplicates():
+    collection = DuplicateKeyCollection(existing=["a"])
+    db = MongoDatabaseService(mongo_client={"test": {"components": collection}}, db_name="test")
+
+    inserted = asyncio.run(db.insert_many("components", [{"_id": "a"}, {"_id": "b"}, {"_id": "c"}]))
+
+    assert inserted == 2
+    assert collection.ids == {"a", "b", "c"}
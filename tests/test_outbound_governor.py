@@ -0,0 +1,65 @@
+import pytest
+from app.services.outbound_governor import ProviderGovernor
+
+
+def make_governor(**kwargs) -> ProviderGovernor:
+    options = {"rate": 1000.0, "burst": 1000.0, "concurrency": 2, "max_concurrency": 4, **kwargs}
+    return ProviderGovernor("test", **options)
+
+
+class FakeStream:
+    def __init__(self, items):
+        self.items = items
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_holds_slot_until_closed():
+    governor = make_governor()
+    provider_stream = FakeStream(["a", "b", "c"])
+    stream = governor.stream(lambda: provider_stream)
+
+    assert next(stream) == "a"
+    assert governor.stats()["in_flight"] == 1
+    stream.close()
+    assert governor.stats()["in_flight"] == 0
+    assert provider_stream.closed
+
+
+def test_exhausted_stream_releases_slot():
+    governor = make_governor()
+    assert list(governor.stream(lambda: FakeStream([1, 2]))) == [1, 2]
+    assert governor.stats()["in_flight"] == 0
+
+
+def test_stream_open_is_retried():
+    governor = make_governor()
+    attempts = []
+
+    def open_stream():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return FakeStream(["ok"])
+
+    assert list(governor.stream(open_stream)) == ["ok"]
+    assert len(attempts) == 2
+    assert governor.stats()["in_flight"] == 0
+
+
+def test_call_does_not_retry_client_errors():
+    governor = make_governor()
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        governor.call(bad_request)
+    assert len(calls) == 1
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from app.utils.pipeline import Pipeline
+
+
+async def numbers(count: int):
+    for number in range(count):
+        yield number
+
+
+def test_items_flow_through_every_stage():
+    results = []
+
+    async def double(item):
+        await asyncio.sleep(0)
+        return item * 2
+
+    async def drop_odd(item):
+        return item if item % 4 == 0 else None
+
+    async def collect(item):
+        results.append(item)
+
+    pipeline = Pipeline(queue_size=2).stage("double", double, concurrency=3).stage("filter", drop_odd).stage("collect", collect)
+
+    asyncio.run(pipeline.run(numbers(10)))
+
+    assert sorted(results) == [0, 4, 8, 12, 16]
+    assert pipeline.processed == {"double": 10, "filter": 10, "collect": 5}
+    # Bounded queues never hold more than queue_size items
+    assert max(pipeline.max_queue_depth.values()) <= 2
+
+
+def test_stage_error_propagates_and_cancels_other_stages():
+    async def fail(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return item
+
+    async def slow(item):
+        await asyncio.sleep(10)
+
+    pipeline = Pipeline().stage("fail", fail).stage("slow", slow)
+
+    with pytest.raises(ValueError, match="bad item"):
+        asyncio.run(asyncio.wait_for(pipeline.run(numbers(10)), timeout=2))
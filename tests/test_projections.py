@@ -0,0 +1,69 @@
+import asyncio
+from app.services.database_service import COMPONENT_CODE_FIELDS, COMPONENT_SUMMARY_FIELDS
+
+
+def component(path: str, **fields):
+    return {
+        "userId": "user-1",
+        "componentPath": path,
+        "componentName": path.split("/")[-1],
+        "inputProps": "label: string",
+        "useCase": "Buttons",
+        "codeSamples": ["<Button />"],
+        "code": "export const Button = () => null",
+        **fields,
+    }
+
+
+def recorded_projections(backend) -> list:
+    projections = []
+    find = backend.find
+
+    def recording_find(collection, query, projection=None):
+        projections.append((collection, projection))
+        return find(collection, query, projection)
+
+    backend.find = recording_find
+    return projections
+
+
+def test_component_summaries_are_projected(db, backend):
+    backend.collections["components"] = [component("src/Button.tsx")]
+    projections = recorded_projections(backend)
+
+    components = asyncio.run(db.fetch_components_by_paths(["src/Button.tsx"], "user-1"))
+
+    assert projections == [("components", COMPONENT_SUMMARY_FIELDS)]
+    assert [(c.path, c.name, c.inputProps, c.useCase, c.codeSamples) for c in components] == [
+        ("src/Button.tsx", "Button.tsx", "label: string", "Buttons", [])
+    ]
+
+
+def test_component_code_is_projected_and_read_from_blobs_or_inline(db, backend):
+    async def run():
+        code_hash, = await db.blobs.put_many(["export const Card = () => null"])
+        backend.collections["components"] = [
+            component("src/Button.tsx"),
+            component("src/Card.tsx", code=None, codeHash=code_hash),
+        ]
+        projections = recorded_projections(backend)
+        return projections, await db.get_missing_internal_components(["src/Button.tsx", "src/Card.tsx"], "user-1")
+
+    projections, file_nodes = asyncio.run(run())
+
+    assert ("components", COMPONENT_CODE_FIELDS) in projections
+    assert {node.filePath: node.fileContent for node in file_nodes} == {
+        "src/Button.tsx": "export const Button = () => null",
+        "src/Card.tsx": "export const Card = () => null",
+    }
+
+
+def test_batched_find_applies_projection(db, backend):
+    backend.collections["components"] = [component("src/Button.tsx")]
+
+    async def run():
+        async with db.batch() as batch:
+            found = batch.find_one("components", {"componentPath": "src/Button.tsx"}, projection={"_id": 0, "componentName": 1})
+        return found.value()
+
+    assert asyncio.run(run()) == {"componentName": "Button.tsx"}
@@ -0,0 +1,86 @@
+import asyncio
+from httpx import AsyncClient
+from app.services.database_service import DatabaseService, ResourceCache
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+
+
+def make_db(backend: LocalBackend) -> DatabaseService:
+    db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+    db.cache = ResourceCache(maxsize=64)
+    return db
+
+
+def component(path: str):
+    return {"userId": "user-1", "componentPath": path, "componentName": path.split("/")[-1], "useCase": "", "inputProps": ""}
+
+
+def test_cached_values_are_copies():
+    backend = LocalBackend()
+    backend.collections["github"] = [{"userId": "user-1", "githubUrl": "https://github.com/o/r", "cssFiles": "[]", "packageJson": '{"dependencies": "react"}'}]
+    db = make_db(backend)
+
+    async def run():
+        _, dependencies, _ = await db.get_github_resources("user-1")
+        dependencies["dependencies"].append("mutated")
+        _, dependencies, _ = await db.get_github_resources("user-1")
+        return dependencies
+
+    assert asyncio.run(run())["dependencies"] == ["react"]
+    assert db.cache.hits == 1
+
+
+def test_missing_components_are_not_cached():
+    backend = LocalBackend()
+    backend.collections["components"] = [component("src/Button.tsx")]
+    db = make_db(backend)
+
+    async def run():
+        first = await db.fetch_components_by_paths(["src/Button.tsx", "src/Card.tsx"], "user-1")
+        # Card is trained later, without a cache invalidation
+        backend.collections["components"].append(component("src/Card.tsx"))
+        second = await db.fetch_components_by_paths(["src/Button.tsx", "src/Card.tsx"], "user-1")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert [c.path for c in first] == ["src/Button.tsx"]
+    assert [c.path for c in second] == ["src/Button.tsx", "src/Card.tsx"]
+
+
+def github_document(**fields):
+    return {"userId": "user-1", "githubUrl": "https://github.com/o/r", "cssFiles": '[{"path": "a.css", "content": ".a {}"}]', **fields}
+
+
+def recorded_projections(db: DatabaseService) -> list:
+    projections = []
+    find_one = db.find_one
+
+    async def recording_find_one(collection, query, projection=None):
+        projections.append(projection)
+        return await find_one(collection, query, projection)
+
+    db.find_one = recording_find_one
+    return projections
+
+
+def test_design_token_digest_path_never_reads_css_files():
+    backend = LocalBackend()
+    backend.collections["github"] = [github_document(designTokens='{"utility_classes": ["btn"]}')]
+    db = make_db(backend)
+    projections = recorded_projections(db)
+
+    css_files, _, design_tokens = asyncio.run(db.get_github_resources("user-1"))
+
+    assert design_tokens == {"utility_classes": ["btn"]}
+    assert css_files == []
+    assert all("cssFiles" not in projection for projection in projections)
+
+
+def test_repos_without_a_digest_fall_back_to_css_files():
+    backend = LocalBackend()
+    backend.collections["github"] = [github_document()]
+    db = make_db(backend)
+
+    css_files, _, design_tokens = asyncio.run(db.get_github_resources("user-1"))
+
+    assert design_tokens is None
+    assert css_files == [{"path": "a.css", "content": ".a {}"}]
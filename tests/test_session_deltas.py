@@ -0,0 +1,122 @@
+import asyncio
+from cachetools import LRUCache
+from httpx import AsyncClient
+from app.core.config import get_settings
+from app.services.database_service import DatabaseService
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+from app.services.session_writer import SessionWriter
+
+settings = get_settings()
+
+
+def make_db(backend: LocalBackend) -> DatabaseService:
+    db = DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+    # Each instance plays a separate worker process
+    db.session_states = LRUCache(maxsize=64)
+    return db
+
+
+def conversation(count: int):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"} for i in range(count)]
+
+
+def codebase(version: int):
+    return [
+        {"fileName": "App.tsx", "filePath": "src/App.tsx", "fileContent": f"export default {version}"},
+        {"fileName": "util.ts", "filePath": "src/util.ts", "fileContent": "export const x = 1"},
+    ]
+
+
+async def save(db: DatabaseService, session_id: str, messages, files):
+    delta = await db.build_session_delta(session_id=session_id, userId="user-1", messages=messages, codebase=files)
+    if delta:
+        await db.write_session_deltas([delta])
+    return delta
+
+
+def test_deltas_round_trip_through_load_session():
+    async def run():
+        db = make_db(LocalBackend())
+        session_id = await db.get_or_create_session("user-1")
+        for turn in range(1, 4):
+            await save(db, session_id, conversation(2 * turn), codebase(turn))
+
+        session = await db.load_session(session_id)
+        assert [m.content for m in session.messages] == [m["content"] for m in conversation(6)]
+        assert {f.filePath: f.fileContent for f in session.codebase}["src/App.tsx"] == "export default 3"
+        assert session.snapshotSeq == 3
+
+    asyncio.run(run())
+
+
+def test_overlapping_deltas_merge_without_duplicates():
+    async def run():
+        backend = LocalBackend()
+        db = make_db(backend)
+        session_id = await db.get_or_create_session("user-1")
+        # Both built before either is written, as with a busy write-behind queue
+        first = await db.build_session_delta(session_id=session_id, userId="user-1", messages=conversation(2), codebase=codebase(1))
+        second = await db.build_session_delta(session_id=session_id, userId="user-1", messages=conversation(4), codebase=codebase(2))
+        writer = SessionWriter(db=db)
+        writer.pending[session_id] = first.merge(second)
+        assert await writer._flush_batch()
+
+        session = await db.load_session(session_id)
+        assert [m.content for m in session.messages] == [m["content"] for m in conversation(4)]
+        assert len(backend.collections["sessionDeltas"]) == 1
+
+    asyncio.run(run())
+
+
+def test_compaction_snapshots_and_prunes_deltas(monkeypatch):
+    async def run():
+        monkeypatch.setattr(settings, "SESSION_COMPACTION_INTERVAL", 3)
+        backend = LocalBackend()
+        db = make_db(backend)
+        session_id = await db.get_or_create_session("user-1")
+        for turn in range(1, 5):
+            await save(db, session_id, conversation(2 * turn), codebase(turn))
+
+        stored = backend.collections["sessions"][0]
+        assert stored["snapshotSeq"] == 3
+        assert [delta["seq"] for delta in backend.collections["sessionDeltas"]] == [4]
+        session = await db.load_session(session_id)
+        assert [m.content for m in session.messages] == [m["content"] for m in conversation(8)]
+        assert {f.filePath: f.fileContent for f in session.codebase}["src/App.tsx"] == "export default 4"
+
+    asyncio.run(run())
+
+
+def test_failed_write_is_sent_again_with_the_next_delta():
+    async def run():
+        backend = LocalBackend()
+        db = make_db(backend)
+        session_id = await db.get_or_create_session("user-1")
+        lost = await db.build_session_delta(session_id=session_id, userId="user-1", messages=conversation(2), codebase=codebase(1))
+        assert lost is not None  # never written
+
+        await save(db, session_id, conversation(4), codebase(2))
+        session = await db.load_session(session_id)
+        assert [m.content for m in session.messages] == [m["content"] for m in conversation(4)]
+
+    asyncio.run(run())
+
+
+def test_workers_sharing_a_session_do_not_reuse_seqs():
+    async def run():
+        backend = LocalBackend()
+        worker_a, worker_b = make_db(backend), make_db(backend)
+        session_id = await worker_a.get_or_create_session("user-1")
+        await save(worker_a, session_id, conversation(2), codebase(1))
+        # Worker B saw the session before A's write and builds on the same seq
+        worker_b.session_states[session_id] = await worker_b._load_session_state(session_id)
+        worker_b.session_states[session_id].seq = 0
+        worker_b.session_states[session_id].message_count = 0
+        await save(worker_b, session_id, conversation(4), codebase(2))
+
+        seqs = sorted(delta["seq"] for delta in backend.collections["sessionDeltas"])
+        assert seqs == [1, 2]
+        session = await worker_a.load_session(session_id)
+        assert [m.content for m in session.messages] == [m["content"] for m in conversation(4)]
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from app.services.database_service import DatabaseService, DatabaseWriteError
+from app.services.local_backend import LocalBackend, LocalBackendTransport
+from app.services.session_writer import SessionWriter
+
+
+class FlakyBackend(LocalBackend):
+    """Local backend whose session delta inserts fail while `failing` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+
+    def insert_many(self, collection, documents):
+        if collection == "sessionDeltas" and self.failing:
+            return {"insertedCount": 0}
+        return super().insert_many(collection, documents)
+
+
+def make_db(backend: LocalBackend) -> DatabaseService:
+    return DatabaseService(client=AsyncClient(transport=LocalBackendTransport(backend), base_url="http://backend"))
+
+
+async def new_session_delta(db: DatabaseService, content: str = "hello"):
+    session_id = await db.get_or_create_session("user-1")
+    delta = await db.build_session_delta(
+        session_id=session_id,
+        userId="user-1",
+        messages=[{"role": "user", "content": content}],
+        codebase=[{"fileName": "App.tsx", "filePath": "src/App.tsx", "fileContent": "export default 1"}],
+    )
+    return session_id, delta
+
+
+def test_short_insert_raises():
+    async def run():
+        db = make_db(FlakyBackend())
+        _, delta = await new_session_delta(db)
+        with pytest.raises(DatabaseWriteError):
+            await db.write_session_deltas([delta])
+
+    asyncio.run(run())
+
+
+def test_failed_flush_is_requeued_and_retried():
+    async def run():
+        backend = FlakyBackend()
+        db = make_db(backend)
+        writer = SessionWriter(db=db, flush_interval=0)
+        session_id, delta = await new_session_delta(db)
+        writer.pending[session_id] = delta
+
+        assert not await writer._flush_batch()
+        assert writer.failed == 1
+        assert session_id in writer.pending
+
+        backend.failing = False
+        assert await writer._flush_batch()
+        assert writer.flushed == 1
+        session = await db.load_session(session_id)
+        assert [message.content for message in session.messages] == ["hello"]
+
+    asyncio.run(run())
+
+
+def test_shutdown_counts_dropped_deltas():
+    async def run():
+        db = make_db(FlakyBackend())
+        writer = SessionWriter(db=db, shutdown_attempts=1)
+        session_id, delta = await new_session_delta(db)
+        writer.pending[session_id] = delta
+
+        await writer.stop()
+        assert writer.dropped == 1
+        assert not writer.pending
+
+    asyncio.run(run())
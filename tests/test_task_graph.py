@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from app.utils.task_graph import TaskGraph
+
+
+def test_dependent_stage_receives_results_by_stage_name():
+    async def search():
+        return {"matches": [{"id": "Button.tsx"}]}
+
+    async def components(vector_search):
+        return [match["id"] for match in vector_search["matches"]]
+
+    graph = TaskGraph()
+    graph.add("vector_search", search)
+    graph.add("components", components, depends_on=["vector_search"])
+    results = asyncio.run(graph.run())
+
+    assert results["components"] == ["Button.tsx"]
+    assert set(graph.timings) == {"vector_search", "components", "total"}
+
+
+def test_independent_stages_run_concurrently():
+    async def slow():
+        await asyncio.sleep(0.2)
+        return True
+
+    graph = TaskGraph()
+    graph.add("a", slow)
+    graph.add("b", slow)
+    asyncio.run(graph.run())
+
+    assert graph.timings["total"] < 350
+
+
+def test_unknown_dependency_is_rejected():
+    async def stage(missing):
+        return missing
+
+    with pytest.raises(ValueError):
+        TaskGraph().add("stage", stage, depends_on=["missing"])
+
+
+def test_failing_stage_propagates():
+    async def fail():
+        raise RuntimeError("search down")
+
+    async def after(search):
+        return search
+
+    graph = TaskGraph()
+    graph.add("search", fail)
+    graph.add("after", after, depends_on=["search"])
+    with pytest.raises(RuntimeError):
+        asyncio.run(graph.run())
+
+
+def test_stage_must_accept_dependency_names():
+    async def search():
+        return {}
+
+    async def components(search):
+        return search
+
+    graph = TaskGraph().add("vector_search", search)
+    with pytest.raises(ValueError):
+        graph.add("components", components, depends_on=["vector_search"])
+
+
+def test_failing_stage_cancels_and_awaits_siblings():
+    cleaned_up = []
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            await asyncio.sleep(0.01)
+            cleaned_up.append(True)
+
+    graph = TaskGraph()
+    graph.add("failing", failing)
+    graph.add("slow", slow)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await graph.run()
+        # Siblings finished their cleanup before run() raised
+        return list(cleaned_up)
+
+    assert asyncio.run(run()) == [True]
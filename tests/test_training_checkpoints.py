@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from cachetools import LRUCache
+from app.services import analysis_cache as analysis_cache_module
+from app.services import pinecone_service as pinecone_module
+from app.services.analysis_cache import AnalysisCache
+from app.services.blob_service import blob_hash
+from app.services.ingestion_service import LLMComponent
+from app.services.pinecone_service import PineconeService, STORED, UPSERTED
+
+
+def react_component(name: str, content: str = None):
+    return SimpleNamespace(path=f"src/{name}.tsx", fileContent=content or f"export const {name} = () => null")
+
+
+class FakeFetchService:
+    """Repository of React components whose analyses are recorded instead of sent to an LLM."""
+
+    analysis_model = "fake-model"
+
+    def __init__(self, components):
+        self.components = components
+        self.analyzed = []
+        self.token_usage = {"prompt_tokens": 0, "completion_tokens": 0}
+
+    def iter_directory_contents(self, concurrency=1):
+        return iter(self.components)
+
+    def filter_components_by_type(self, components):
+        return {"react_components": list(components)}
+
+    def analyze_components(self, components):
+        self.analyzed.extend(component.path for component in components)
+        return [LLMComponent(description=component.path, inputProps=[], useCases=[], codeExamples=[]) for component in components]
+
+    def build_component(self, component, analysis):
+        name = component.path.split("/")[-1]
+        return SimpleNamespace(
+            name=name, path=component.path, code=component.fileContent, description=analysis.description,
+            inputProps=[], useCases=[], codeExamples=[], dependencies=[], importPath=""
+        )
+
+
+class FakeIndex:
+    def __init__(self):
+        self.upserted = []
+
+    def upsert(self, namespace, vectors):
+        self.upserted.extend(vector["id"] for vector in vectors)
+
+
+class FakeEmbeddingService:
+    tokens_used = 0
+    embeddings_reused = 0
+
+    def __init__(self):
+        self.texts = {}
+
+    def prepare_vectors_for_upsert(self, records):
+        self.texts.update({record["id"]: record["text"] for record in records})
+        return [{"id": record["id"], "values": [0.0]} for record in records]
+
+
+@pytest.fixture
+def train(db, monkeypatch):
+    """Run train_github_url over `components` from `checkpoint`, returning the fakes it used."""
+    monkeypatch.setattr(pinecone_module, "database_service", db)
+    monkeypatch.setattr(analysis_cache_module, "database_service", db)
+    monkeypatch.setattr(pinecone_module, "analysis_cache", AnalysisCache(cache=LRUCache(maxsize=64)))
+
+    def run(components, checkpoint):
+        fetch_service = FakeFetchService(components)
+        monkeypatch.setattr(pinecone_module, "FetchComponentsService", lambda github_url, access_token: fetch_service)
+        service = PineconeService.__new__(PineconeService)
+        service.index = FakeIndex()
+        service.embedding_service = FakeEmbeddingService()
+
+        async def skip_non_react(*args, **kwargs):
+            pass
+
+        service._save_non_react_components_to_db = skip_non_react
+        result = asyncio.run(service.train_github_url("https://github.com/o/r", namespace="user-1", checkpoint=checkpoint))
+        assert "error" not in result
+        return fetch_service, service
+
+    return run
+
+
+def test_resume_skips_upserted_and_reembeds_stored_components(train):
+    upserted, stored, edited, new = (react_component(name) for name in ("Upserted", "Stored", "Edited", "New"))
+    checkpoint = {"components": {
+        upserted.path: {"hash": blob_hash(upserted.fileContent), "stage": UPSERTED},
+        stored.path: {"hash": blob_hash(stored.fileContent), "stage": STORED, "text": "Stored text"},
+        edited.path: {"hash": blob_hash("old content"), "stage": UPSERTED},
+    }}
+
+    fetch_service, service = train([upserted, stored, edited, new], checkpoint)
+
+    assert sorted(fetch_service.analyzed) == [edited.path, new.path]
+    assert sorted(service.index.upserted) == [edited.path, new.path, stored.path]
+    assert service.embedding_service.texts[stored.path] == "Stored text"
+
+
+@pytest.mark.parametrize("legacy_checkpoint", [{"completed_batches": [0]}, {"next_offset": 10}])
+def test_legacy_batch_offsets_are_honoured(train, legacy_checkpoint):
+    components = [react_component(f"Component{i}") for i in range(12)]
+
+    fetch_service, service = train(components, legacy_checkpoint)
+
+    assert sorted(fetch_service.analyzed) == sorted(component.path for component in components[10:])
+    assert sorted(service.index.upserted) == sorted(component.path for component in components[10:])
@@ -0,0 +1,30 @@
+import time
+import pytest
+from app.services.training_progress import TrainingProgress
+
+
+def test_report_rates_and_eta_from_upserted_components():
+    progress = TrainingProgress({"started_at": time.time() - 10})
+    progress.set_total("analyze", 40)
+    progress.stages["analyze"].update(count=20, seconds=4.0)
+    progress.stages["upsert"].update(count=10, seconds=2.0)
+    progress.add_tokens("embedding", 100)
+
+    report = TrainingProgress.report(progress.to_dict())
+
+    assert report["stages"]["analyze"]["rate"] == 5.0
+    assert report["stages"]["embed"]["rate"] is None
+    # 10 of 40 components upserted in ~10s leaves ~30s
+    assert report["eta_seconds"] == pytest.approx(30, abs=1)
+    assert report["tokens"]["total"] == 100
+
+
+def test_eta_unknown_before_fetch_and_zero_when_done():
+    assert TrainingProgress.report(None)["eta_seconds"] is None
+
+    progress = TrainingProgress()
+    progress.set_total("analyze", 5)
+    with progress.track("upsert", count=5):
+        pass
+
+    assert TrainingProgress.report(progress.to_dict())["eta_seconds"] == 0